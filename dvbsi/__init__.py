@@ -1,5 +1,6 @@
 __version__ = "0.3.0"
 
+from .section import *
 from .mpeg_section import *
 from .mpeg_descriptor import *
 from .dvb_section import *
@@ -7,6 +8,13 @@ from .dvb_table import *
 from .dvb_descriptor import *
 from .dvb_types import *
 from .crc32 import *
+from .descriptor_cache import *
+from .records import *
+from .ts import *
+from .ts_index import *
+from .eit_store import *
+from .section_log import *
+from .parse_pool import *
 
 SECTION_MAP = {
     STAG_PROGRAM_ASSOCIATION:                    PatSection,
@@ -81,3 +89,8 @@ DESCRIPTOR_MAP = {
     DTAG_LOCAL_TIME_OFFSET:  LocalTimeOffsetDescriptor,
 }
 
+DESCRIPTOR_CACHE = DescriptorCache(DESCRIPTOR_MAP)
+
+def decode_descriptor(raw_dsc, parser=None):
+    """Decode raw_dsc into typed descriptor through DESCRIPTOR_CACHE."""
+    return DESCRIPTOR_CACHE.decode(raw_dsc, parser)
@@ -87,11 +87,90 @@ _CRC32TBL = (
         0xbcb4666d, 0xb8757bda, 0xb5365d03, 0xb1f740b4
 )
 
+import struct
+
+try:
+    import zlib
+except ImportError:
+    zlib = None
+
+
 CRC32_INIT = ~0
 
-def crc32(buf, crc = CRC32_INIT):
-    """Calculate a CRC32 over a piece of data."""
+
+def _make_slice_tables(num_slices):
+    tables = [_CRC32TBL]
+    for n in range(1, num_slices):
+        prev = tables[n - 1]
+        tables.append(tuple(((prev[i] << 8) & 0xffffffff) ^
+                            _CRC32TBL[prev[i] >> 24] for i in range(256)))
+    return tables
+
+# slicing-by-8 tables: _CRC32TBL_S[n][i] is the crc of byte i followed by
+# n zero bytes.
+_CRC32TBL_S = _make_slice_tables(8)
+_SLICE8 = struct.Struct(">II")
+
+# bit-reversal tables used to run the MSB-first DVB crc through zlib, which
+# implements the reflected (LSB-first) variant of the same polynomial.
+_BITREV8 = bytes(int('{:08b}'.format(i)[::-1], 2) for i in range(256))
+
+def _bitrev32(val):
+    return ((_BITREV8[val & 0xff] << 24) |
+            (_BITREV8[(val >> 8) & 0xff] << 16) |
+            (_BITREV8[(val >> 16) & 0xff] << 8) |
+            _BITREV8[(val >> 24) & 0xff])
+
+
+def crc32_bytewise(buf, crc = CRC32_INIT):
+    """Calculate a CRC32 over a piece of data, one byte at a time."""
     for byte in buf:
         index = ((crc>>24) ^ (byte)) & 0xff
         crc = ((crc<<8) & 0xffffffff) ^ _CRC32TBL[index]
     return crc
+
+def crc32_slicing(buf, crc = CRC32_INIT):
+    """Calculate a CRC32 over a piece of data, eight bytes at a time."""
+    buf_len = len(buf)
+    if (buf_len == 0):
+        return crc
+    t0, t1, t2, t3, t4, t5, t6, t7 = _CRC32TBL_S
+    crc &= 0xffffffff
+    end = buf_len - buf_len % 8
+    for hi, lo in _SLICE8.iter_unpack(memoryview(buf)[:end]):
+        hi ^= crc
+        crc = (t7[hi >> 24] ^ t6[(hi >> 16) & 0xff] ^
+               t5[(hi >> 8) & 0xff] ^ t4[hi & 0xff] ^
+               t3[lo >> 24] ^ t2[(lo >> 16) & 0xff] ^
+               t1[(lo >> 8) & 0xff] ^ t0[lo & 0xff])
+    for i in range(end, buf_len):
+        crc = ((crc << 8) & 0xffffffff) ^ t0[(crc >> 24) ^ buf[i]]
+    return crc
+
+def crc32_zlib(buf, crc = CRC32_INIT):
+    """Calculate a CRC32 over a piece of data using zlib.
+
+    zlib computes the reflected crc, so the input bytes and the crc register
+    are bit-reversed on the way in and out."""
+    if (len(buf) == 0):
+        return crc
+    crc = _bitrev32(crc & 0xffffffff) ^ 0xffffffff
+    crc = zlib.crc32(bytes(buf).translate(_BITREV8), crc)
+    return _bitrev32(crc ^ 0xffffffff)
+
+if (zlib is not None):
+    crc32 = crc32_zlib
+else:
+    crc32 = crc32_slicing
+
+def verify_sections(buffers):
+    """Check CRC32 of a number of raw sections at once.
+
+    Returns a bitmap as integer: bit n is set if buffers[n] has a valid
+    CRC32. A section is valid if the CRC32 over the whole section including
+    its CRC_32 field is zero."""
+    bitmap = 0
+    for n, buf in enumerate(buffers):
+        if (len(buf) >= 4 and crc32(buf) == 0):
+            bitmap |= 1 << n
+    return bitmap
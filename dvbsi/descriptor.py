@@ -21,9 +21,16 @@
 """Generic Descriptor"""
 
 class Descriptor:
-    """Generic descriptor header."""
+    """Generic descriptor header.
+
+    Descriptor does not copy its bytes out of buf. It keeps buf and the
+    offset of the descriptor in it; data makes a copy on demand."""
+    __slots__ = ('tag', 'length', 'buf', 'offset')
     def __init__(self, buf, i = 0):
         self.tag = -1
+        self.length = 0
+        self.buf = buf
+        self.offset = i
         buf_len = len(buf)
         if (buf_len < i + 2):
             return
@@ -31,7 +38,17 @@ class Descriptor:
         if (buf_len < i + self.length + 2):
             return
         self.tag = buf[i]
-        self.data = buf[i:i+self.length+2]
+
+    @property
+    def data(self):
+        """bytes of the whole descriptor including tag and length"""
+        data = self.buf[self.offset:self.offset + self.length + 2]
+        if (isinstance(data, memoryview)):
+            return data.tobytes()
+        return data
+
+    def tobytes(self):
+        return bytes(self.data)
 
     def __str__(self):
         if (self.tag == -1):
@@ -39,32 +56,79 @@ class Descriptor:
         return "tag:0x%02x length:%d" % (self.tag, self.length)
 
 class DescriptorLoop:
-    """Iterator of descriptor loop."""
+    """Iterator of descriptor loop.
+
+    The loop is the region of buf from offset with length bytes. If length is
+    None, the loop extends to the end of buf. buf may be bytes or memoryview;
+    it is not copied.
+
+    Descriptors are not parsed on creating the loop. Iterating the loop makes
+    Descriptor objects one by one; find() and find_all() step over the
+    descriptors of the other tags by their length without making objects.
+    The loop ends at the first descriptor which is truncated."""
+    __slots__ = ('buf', 'offset', 'iter_offset', 'end')
 
-    def __init__(self, buf, offset = 0, length = 0):
-        self.descriptors = []
-        if (length == 0):
-            length = len(buf)
+    def __init__(self, buf, offset = 0, length = None):
+        self.buf = buf
+        self.offset = offset
+        self.iter_offset = offset
+        if (length is None):
+            length = len(buf) - offset
         elif (len(buf) < offset + length):
-            return
-        i = 0
-        while (i < length):
-            dsc = Descriptor(buf, i + offset)
-            if (dsc.tag == -1):
-                return
-            if (i + dsc.length + 2 > length + offset):
-                return
-            self.descriptors.append(dsc)
-            i += dsc.length + 2
-        self.iter_offset = 0
+            length = 0
+        self.end = offset + length
+
+    def _next_offset(self, i):
+        'returns the offset of the descriptor after i, or -1 if invalid'
+        if (i + 2 > self.end):
+            return -1
+        i_next = i + self.buf[i+1] + 2
+        if (i_next > self.end):
+            return -1
+        return i_next
 
     def __iter__(self):
-        self.iter_offset = 0
+        self.iter_offset = self.offset
         return self
 
     def __next__(self):
-        self.iter_offset += 1
-        if (len(self.descriptors) < self.iter_offset):
+        i = self.iter_offset
+        i_next = self._next_offset(i)
+        if (i_next == -1):
+            self.iter_offset = self.end
             raise StopIteration
-        return self.descriptors[self.iter_offset - 1]
+        self.iter_offset = i_next
+        return Descriptor(self.buf, i)
+
+    @property
+    def descriptors(self):
+        'list of all descriptors in the loop'
+        return list(DescriptorLoop(self.buf, self.offset,
+                                   self.end - self.offset))
+
+    def find(self, tag):
+        'returns the first descriptor with tag, or None'
+        buf = self.buf
+        i = self.offset
+        while (True):
+            i_next = self._next_offset(i)
+            if (i_next == -1):
+                return None
+            if (buf[i] == tag):
+                return Descriptor(buf, i)
+            i = i_next
 
+    def find_all(self, tags):
+        'returns a list of descriptors with tag in tags, in loop order'
+        if (isinstance(tags, int)):
+            tags = (tags,)
+        buf = self.buf
+        found = []
+        i = self.offset
+        while (True):
+            i_next = self._next_offset(i)
+            if (i_next == -1):
+                return found
+            if (buf[i] in tags):
+                found.append(Descriptor(buf, i))
+            i = i_next
@@ -0,0 +1,80 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""Cache of decoded descriptors"""
+
+from collections import OrderedDict
+
+
+class DescriptorCache:
+    '''a bounded LRU cache of typed descriptors keyed by their raw bytes.
+
+    The same descriptors are repeated on every cycle of the SDT/EIT
+    carousels. decode(raw_dsc) parses a descriptor only on the first time
+    and returns the same typed descriptor object on the next times, so the
+    returned object shall not be modified by user.
+
+    descriptor_map maps a tag to the class of typed descriptor. size is the
+    maximum number of descriptors kept; 0 disables caching.
+    '''
+    def __init__(self, descriptor_map, size=4096):
+        self.descriptor_map = descriptor_map
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        'removes all cached descriptors and clears counters'
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def set_size(self, size):
+        self.size = size
+        while (len(self.cache) > self.size):
+            self.cache.popitem(last=False)
+
+    def decode(self, raw_dsc, parser=None):
+        '''returns typed descriptor of raw_dsc.
+
+        raw_dsc is a Descriptor. parser is the class of typed descriptor; if
+        it is None, it is looked up in descriptor_map by tag. Returns None if
+        no parser is found.'''
+        if (parser is None):
+            parser = self.descriptor_map.get(raw_dsc.tag)
+            if (parser is None):
+                return None
+        data = raw_dsc.data
+        key = (parser, data)
+        dsc = self.cache.get(key)
+        if (dsc is not None):
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return dsc
+        self.misses += 1
+        dsc = parser(data)
+        if (self.size > 0):
+            self.cache[key] = dsc
+            if (len(self.cache) > self.size):
+                self.cache.popitem(last=False)
+        return dsc
+
+    def get_stats(self):
+        'returns tuple (hits, misses, no. of cached descriptors)'
+        return self.hits, self.misses, len(self.cache)
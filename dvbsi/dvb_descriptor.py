@@ -20,8 +20,11 @@
 
 """Descriptors defined by DVB"""
 
+import struct
+
 from .descriptor import Descriptor
 from .dvb_types import bcd_to_integer
+from .records import fixed_records, uint8_array, uint16_array
 
 
 #
@@ -147,12 +150,15 @@ AVC_PS_3D_HD_NVOD_TIMESHIFT = 0x1d
 AVC_PS_3D_HD_NVOD_REF       = 0x1e
 
 
+_SERVICE = struct.Struct(">HB")
+
 class Service:
     "service in service list descriptor"
+    __slots__ = ('service_id', 'service_type')
 
-    def __init__(self, buf, i):
-        self.service_id = (buf[i] << 8) | buf[i+1]
-        self.service_type = buf[i+2]
+    def __init__(self, service_id, service_type):
+        self.service_id = service_id
+        self.service_type = service_type
 
     def __str__(self):
         return "    service_id:0x%04x service_type:0x%02x" % (
@@ -161,16 +167,26 @@ class Service:
 
 class ServiceListDescriptor(Descriptor):
     "service list descriptor"
+    __slots__ = ('services',)
     def __init__(self, buf, i=0):
         Descriptor.__init__(self, buf, i)
         if (self.tag == -1):
             return
-        self.services = []
-        i += 2
-        i_to = i + self.length
-        while (i < i_to):
-            self.services.append(Service(buf, i))
-            i += 3
+        self.services = [Service(service_id, service_type)
+                         for service_id, service_type in
+                         _SERVICE.iter_unpack(self.service_loop())]
+
+    def service_loop(self):
+        'returns memoryview of the service loop'
+        return fixed_records(self.buf, self.offset + 2, self.length, 3)
+
+    def service_ids_array(self):
+        "returns array('H') of service_id of all services"
+        return uint16_array(self.service_loop(), 3, 0)
+
+    def service_types_array(self):
+        "returns array('B') of service_type of all services"
+        return uint8_array(self.service_loop(), 3, 2)
 
     def __str__(self):
         return '\n'.join([
@@ -181,6 +197,7 @@ class ServiceListDescriptor(Descriptor):
 
 class ServiceDescriptor(Descriptor):
     "service descriptor"
+    __slots__ = ('service_type', 'service_name', 'service_provider_name')
     def __init__(self, buf, i = 0):
         self.service_type = 0
         self.service_name = ""
@@ -205,6 +222,7 @@ class ServiceDescriptor(Descriptor):
 
 class ShortEventDescriptor(Descriptor):
     """short event descriptor"""
+    __slots__ = ('language_code', 'event_name', 'text')
     def __init__(self, buf, i = 0):
         self.language_code = ""
         self.event_name = ""
@@ -229,6 +247,8 @@ class ShortEventDescriptor(Descriptor):
 
 class Item():
     """item in extended event descriptor"""
+    __slots__ = ('item_description_length', 'item_description', 'item_length',
+                 'item')
     def __init__(self, buf, i):
         self.item_description_length = buf[i]
         i += 1
@@ -244,6 +264,7 @@ class Item():
 
 class ExtendedEventDescriptor(Descriptor):
     """extended event descriptor"""
+    __slots__ = ('language_code', 'text', 'items')
     def __init__(self, buf, i = 0):
         self.language_code = ""
         self.text = ""
@@ -272,6 +293,7 @@ class ExtendedEventDescriptor(Descriptor):
 
 class StreamIdentifierDescriptor(Descriptor):
     """stream identifier descriptor"""
+    __slots__ = ('component_tag',)
     def __init__(self, buf, i = 0):
         self.component_tag = 0
         Descriptor.__init__(self, buf, i)
@@ -286,6 +308,8 @@ class StreamIdentifierDescriptor(Descriptor):
 
 class SubtitlingEntry:
     """entry in subtitling descriptor"""
+    __slots__ = ('language_code', 'subtitling_type', 'composition_page_id',
+                 'ancillary_page_id')
     def __init__(self, buf, i):
         self.language_code = buf[i:i+3].decode()
         self.subtitling_type = buf[i+3]
@@ -300,6 +324,7 @@ class SubtitlingEntry:
 
 class SubtitlingDescriptor(Descriptor):
     """subtitling descriptor"""
+    __slots__ = ('entries',)
     def __init__(self, buf, i = 0):
         self.entries = []
         Descriptor.__init__(self, buf, i)
@@ -318,6 +343,8 @@ class SubtitlingDescriptor(Descriptor):
 
 class MultilingualServiceName:
     "service name in muntilingual service name descriptor"
+    __slots__ = ('language_code', 'service_provider_name_length',
+                 'service_provider_name', 'service_name_length', 'service_name')
     def __init__(self, buf, i):
         self.language_code = buf[i:i+3].decode()
         self.service_provider_name_length = buf[i+3]
@@ -336,6 +363,7 @@ class MultilingualServiceName:
 
 class MultilingualServiceNameDescriptor(Descriptor):
     """multilingual service name descriptor"""
+    __slots__ = ('names',)
     def __init__(self, buf, i = 0):
         self.names = []
         Descriptor.__init__(self, buf, i)
@@ -356,6 +384,7 @@ class MultilingualServiceNameDescriptor(Descriptor):
 
 class DataBroadcastIdDescriptor(Descriptor):
     """data broadcast id descriptor"""
+    __slots__ = ('data_broadcast_id', 'id_selector_byte')
     def __init__(self, buf, i = 0):
         self.data_broadcast_id = 0
         self.id_selector_byte = ""
@@ -374,6 +403,7 @@ class DataBroadcastIdDescriptor(Descriptor):
 
 class DefaultAuthorityDescriptor(Descriptor):
     """default authority descriptor"""
+    __slots__ = ('name',)
     def __init__(self, buf, i = 0):
         self.name = ""
         Descriptor.__init__(self, buf, i)
@@ -388,6 +418,8 @@ class DefaultAuthorityDescriptor(Descriptor):
 
 class ComponentDescriptor(Descriptor):
     """component descriptor"""
+    __slots__ = ('stream_content', 'component_type', 'component_tag',
+                 'language_code', 'text')
     def __init__(self, buf, i = 0):
         self.stream_content = 0
         self.component_type = 0
@@ -414,6 +446,7 @@ class ComponentDescriptor(Descriptor):
 
 class PrivateDataSpecifierDescriptor(Descriptor):
     "private data specifier descriptor"
+    __slots__ = ('private_data_specifier',)
     def __init__(self, buf, i = 0):
         private_data_specifier = 0
         Descriptor.__init__(self, buf, i)
@@ -432,6 +465,8 @@ class PrivateDataSpecifierDescriptor(Descriptor):
 
 class Content:
     "content in content descriptor"
+    __slots__ = ('content_nibble_level_1', 'content_nibble_level_2',
+                 'user_byte')
     def __init__(self, buf, i):
         self.content_nibble_level_1 = (buf[i] >> 4) & 0xf
         self.content_nibble_level_2 = buf[i] & 0xf
@@ -446,6 +481,7 @@ class Content:
 
 class ContentDescriptor(Descriptor):
     """content descriptor"""
+    __slots__ = ('contents',)
     def __init__(self, buf, i = 0):
         self.contents = []
         Descriptor.__init__(self, buf, i)
@@ -465,6 +501,7 @@ class ContentDescriptor(Descriptor):
 
 class NetworkNameDescriptor(Descriptor):
     """network name descriptor"""
+    __slots__ = ('network_name',)
     def __init__(self, buf, i = 0):
         Descriptor.__init__(self, buf, i)
         if (self.tag == -1):
@@ -479,6 +516,7 @@ class NetworkNameDescriptor(Descriptor):
 
 class BouquetNameDescriptor(Descriptor):
     """bouquet name descriptor"""
+    __slots__ = ('bouquet_name',)
     def __init__(self, buf, i = 0):
         Descriptor.__init__(self, buf, i)
         if (self.tag == -1):
@@ -493,6 +531,7 @@ class BouquetNameDescriptor(Descriptor):
 
 class ParentalRating:
     "parental rating in parental rating descriptor"
+    __slots__ = ('country_code', 'rating')
     def __init__(self, buf, i):
         self.country_code = buf[i:i+3]
         self.rating = buf[i+3]
@@ -503,6 +542,7 @@ class ParentalRating:
 
 class ParentalRatingDescriptor(Descriptor):
     """parental rating descriptor"""
+    __slots__ = ('parental_ratings',)
     def __init__(self, buf, i = 0):
         self.parental_ratings = []
         Descriptor.__init__(self, buf, i)
@@ -521,6 +561,8 @@ class ParentalRatingDescriptor(Descriptor):
 
 class DataBroadcastDescriptor(Descriptor):
     """data broadcast descriptor"""
+    __slots__ = ('data_broadcast_id', 'component_tag', 'selector',
+                 'language_code', 'text')
     def __init__(self, buf, i = 0):
         Descriptor.__init__(self, buf, i)
         if (self.tag == -1):
@@ -552,6 +594,9 @@ class DataBroadcastDescriptor(Descriptor):
 
 class SatelliteDeliverySystemDescriptor(Descriptor):
 
+    __slots__ = ('frequency', 'orbital_position', 'polarization', 'roll_off',
+                 'modulation_system', 'modulation_type', 'symbol_rate',
+                 'fec_inner')
     POLARIZATION_STR = ["linear_horizontal",
                         "linear_vertical",
                         "circular_left",
@@ -606,6 +651,12 @@ class SatelliteDeliverySystemDescriptor(Descriptor):
 
 class TerrestrialDeliverySystemDescriptor(Descriptor):
 
+    __slots__ = ('frequency', 'bandwidth', 'priority',
+                 'time_slicing_indicator', 'mpe_fec_indicator', 'reserved1',
+                 'constellation', 'hierarchy_information',
+                 'code_rate_hp_stream', 'code_rate_lp_stream',
+                 'guard_interval', 'transmission_mode', 'other_frequency_flag',
+                 'reserved2')
     BANDWIDTH_STR = ["8 MHz", "7 MHz", "6 MHz", "5 MHz",
                      "4?", "5?", "6?", "7?"]
     PRIORITY_STR = ["LP", "HP"]
@@ -661,6 +712,8 @@ class TerrestrialDeliverySystemDescriptor(Descriptor):
 
 class CableDeliverySystemDescriptor(Descriptor):
 
+    __slots__ = ('frequency', 'fec_outer', 'modulation', 'symbol_rate',
+                 'fec_inner')
     MODULATION_SCHEME_STR = ["",
                              "16-QAM",
                              "32-QAM",
@@ -718,6 +771,8 @@ CRID_TYPE_RECOMMENDATION = 0x03
 
 class Crid:
     "CRID in content identifier descriptor"
+    __slots__ = ('crid_type', 'location', 'crid_length', 'crid_byte',
+                 'crid_ref')
 
     def __init__(self, buf, i):
         self.crid_type = (buf[i] >> 2) & 0x3f
@@ -742,6 +797,7 @@ class Crid:
 
 class ContentIdentifierDescriptor(Descriptor):
     """content identifier descriptor"""
+    __slots__ = ('crids',)
     def __init__(self, buf, i = 0):
         self.crids = []
         Descriptor.__init__(self, buf, i)
@@ -761,6 +817,8 @@ class ContentIdentifierDescriptor(Descriptor):
 
 class TeletextEntry:
     """entry in teletext descriptor"""
+    __slots__ = ('language_code', 'teletext_type', 'teletext_magazine_number',
+                 'teletext_page_number')
     def __init__(self, buf, i):
         self.language_code = buf[i:i+3].decode()
         self.teletext_type = (buf[i+3] >> 3) & 0x1f
@@ -776,6 +834,7 @@ class TeletextEntry:
 
 class TeletextDescriptor(Descriptor):
     """teletext descriptor"""
+    __slots__ = ('entries',)
     def __init__(self, buf, i = 0):
         self.entries = []
         Descriptor.__init__(self, buf, i)
@@ -794,6 +853,9 @@ class TeletextDescriptor(Descriptor):
 
 class LocalTimeOffset:
     """entry in local time descriptor"""
+    __slots__ = ('country_code', 'country_region_id',
+                 'local_time_offset_polarity', 'local_time_offset',
+                 'time_of_change', 'next_time_offset')
     def __init__(self, buf, i):
         self.country_code = buf[i:i+3]
         self.country_region_id = (buf[i+3] >> 2) & 0x3f
@@ -820,6 +882,7 @@ class LocalTimeOffset:
 
 class LocalTimeOffsetDescriptor(Descriptor):
     """local time offset descriptor"""
+    __slots__ = ('entries',)
     def __init__(self, buf, i = 0):
         self.entries = []
         Descriptor.__init__(self, buf, i)
@@ -836,91 +899,103 @@ class LocalTimeOffsetDescriptor(Descriptor):
                 self.__class__.__name__ + " " + Descriptor.__str__(self),
                 '\n'.join([entry.__str__() for entry in self.entries]) ])
 
-class UkDttLogicalChannel:
-    '''entry in logical channel descriptor'''
-    def __init__(self, buf, i):
-        self.service_id = (buf[i] << 8) | buf[i+1]
-        self.logical_channel_number = ((buf[i+2] & 0x03) << 8) | buf[i+3]
+_LOGICAL_CHANNEL = struct.Struct(">HH")
 
-    def __str__(self):
-        return "    service_id:%04x lcn:%d" % (
-            self.service_id, self.logical_channel_number)
+class _LogicalChannelDescriptor(Descriptor):
+    """logical channel descriptor made of 4 byte entries
+
+    ENTRY makes an entry of service_id and the 16 bit field carrying the
+    logical channel number, LCN_MASK selects the number out of the field."""
+    __slots__ = ('entries',)
+    ENTRY = None
+    LCN_MASK = 0x3ff
 
-class UkDttLogicalChannelDescriptor(Descriptor):
-    """local time offset descriptor"""
     def __init__(self, buf, i = 0):
         self.entries = []
         Descriptor.__init__(self, buf, i)
         if (self.tag == -1):
             return
-        i += 2
-        i_to = i + self.length
-        while (i < i_to):
-            self.entries.append(UkDttLogicalChannel(buf, i))
-            i += 4
+        entry = self.ENTRY
+        self.entries = [entry(service_id, field)
+                        for service_id, field in
+                        _LOGICAL_CHANNEL.iter_unpack(self.entry_loop())]
+
+    def entry_loop(self):
+        'returns memoryview of the entry loop'
+        return fixed_records(self.buf, self.offset + 2, self.length, 4)
+
+    def service_ids_array(self):
+        "returns array('H') of service_id of all entries"
+        return uint16_array(self.entry_loop(), 4, 0)
+
+    def logical_channel_numbers_array(self):
+        "returns array('H') of logical_channel_number of all entries"
+        return uint16_array(self.entry_loop(), 4, 2, self.LCN_MASK)
 
     def __str__(self):
         return '\n'.join([
                 self.__class__.__name__ + " " + Descriptor.__str__(self),
                 '\n'.join([entry.__str__() for entry in self.entries]) ])
 
+class UkDttLogicalChannel:
+    '''entry in logical channel descriptor'''
+    __slots__ = ('service_id', 'logical_channel_number')
+    def __init__(self, service_id, field):
+        self.service_id = service_id
+        self.logical_channel_number = field & 0x3ff
+
+    def __str__(self):
+        return "    service_id:%04x lcn:%d" % (
+            self.service_id, self.logical_channel_number)
+
+class UkDttLogicalChannelDescriptor(_LogicalChannelDescriptor):
+    """UK DTT logical channel descriptor"""
+    __slots__ = ()
+    ENTRY = UkDttLogicalChannel
+    LCN_MASK = 0x3ff
+
 class NorDigLogicalChannel:
     '''entry in logical channel descriptor'''
-    def __init__(self, buf, i):
-        self.service_id = (buf[i] << 8) | buf[i+1]
-        self.visible_service_flag = (buf[i+2] >> 7) & 0x1
-        self.logical_channel_number = ((buf[i+2] & 0x3f) << 8) | buf[i+3]
+    __slots__ = ('service_id', 'visible_service_flag', 'logical_channel_number')
+    def __init__(self, service_id, field):
+        self.service_id = service_id
+        self.visible_service_flag = field >> 15
+        self.logical_channel_number = field & 0x3fff
 
     def __str__(self):
         return "    service_id:%04x visible:%d lcn:%d" % (
             self.service_id, self.visible_service_flag,
             self.logical_channel_number)
 
-class NorDigLogicalChannelDescriptor(Descriptor):
-    """local time offset descriptor"""
-    def __init__(self, buf, i = 0):
-        self.entries = []
-        Descriptor.__init__(self, buf, i)
-        if (self.tag == -1):
-            return
-        i += 2
-        i_to = i + self.length
-        while (i < i_to):
-            self.entries.append(NorDigLogicalChannel(buf, i))
-            i += 4
+class NorDigLogicalChannelDescriptor(_LogicalChannelDescriptor):
+    """NorDig logical channel descriptor"""
+    __slots__ = ()
+    ENTRY = NorDigLogicalChannel
+    LCN_MASK = 0x3fff
 
-    def __str__(self):
-        return '\n'.join([
-                self.__class__.__name__ + " " + Descriptor.__str__(self),
-                '\n'.join([entry.__str__() for entry in self.entries]) ])
+    def visible_service_flags_array(self):
+        "returns array('B') of visible_service_flag of all entries"
+        return uint8_array(self.entry_loop(), 4, 2, 0x1, 7)
 
 class EacemLogicalChannel:
     '''entry in logical channel descriptor'''
-    def __init__(self, buf, i):
-        self.service_id = (buf[i] << 8) | buf[i+1]
-        self.visible_service_flag = (buf[i+2] >> 7) & 0x1
-        self.logical_channel_number = ((buf[i+2] & 0x03) << 8) | buf[i+3]
+    __slots__ = ('service_id', 'visible_service_flag', 'logical_channel_number')
+    def __init__(self, service_id, field):
+        self.service_id = service_id
+        self.visible_service_flag = field >> 15
+        self.logical_channel_number = field & 0x3ff
 
     def __str__(self):
         return "    service_id:%04x visible:%d lcn:%d" % (
             self.service_id, self.visible_service_flag,
             self.logical_channel_number)
 
-class EacemLogicalChannelDescriptor(Descriptor):
-    """local time offset descriptor"""
-    def __init__(self, buf, i = 0):
-        self.entries = []
-        Descriptor.__init__(self, buf, i)
-        if (self.tag == -1):
-            return
-        i += 2
-        i_to = i + self.length
-        while (i < i_to):
-            self.entries.append(EacemLogicalChannel(buf, i))
-            i += 4
-
-    def __str__(self):
-        return '\n'.join([
-                self.__class__.__name__ + " " + Descriptor.__str__(self),
-                '\n'.join([entry.__str__() for entry in self.entries]) ])
+class EacemLogicalChannelDescriptor(_LogicalChannelDescriptor):
+    """EACEM logical channel descriptor"""
+    __slots__ = ()
+    ENTRY = EacemLogicalChannel
+    LCN_MASK = 0x3ff
 
+    def visible_service_flags_array(self):
+        "returns array('B') of visible_service_flag of all entries"
+        return uint8_array(self.entry_loop(), 4, 2, 0x1, 7)
@@ -21,9 +21,13 @@
 """Parse sections defined by DVB"""
 
 
+import struct
+from array import array
+from collections import namedtuple
+
 from .section import Section, SectionExt
 from .descriptor import DescriptorLoop
-from .dvb_types import dvbdate_to_datetime, dvbduration_to_seconds
+from .dvb_types import dvbdate_to_datetime, dvbduration_to_seconds, BCD_TABLE
 
 
 TRANSPORT_NIT_PID = 0x10
@@ -71,6 +75,9 @@ STAG_SELECTION_INFORMATION                = 0x7f
 
 class SdtService:
     "Service in SDT"
+    __slots__ = ('service_id', 'eit_schedule_flag',
+                 'eit_present_following_flag', 'running_status',
+                 'free_ca_mode', 'descriptors_loop_length', 'descriptors')
     def __init__(self, buf, i):
         self.service_id = (buf[i] << 8) | buf[i+1]
         self.eit_schedule_flag = (buf[i+2] >> 1) & 1
@@ -78,8 +85,8 @@ class SdtService:
         self.running_status = (buf[i+3] >> 5) & 7
         self.free_ca_mode = (buf[i+3] >> 4) & 1
         self.descriptors_loop_length = (((buf[i+3] & 0xf) << 8) | buf[i+4])
-        descriptor_buf = buf[i+5:i+self.descriptors_loop_length + 5]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, i+5,
+                                          self.descriptors_loop_length)
 
     def __str__(self):
         return "service_id:0x%04x eit_schedule_flag:%i" \
@@ -91,6 +98,7 @@ class SdtService:
 
 class SdtSection(SectionExt):
     "Service Description Table"
+    __slots__ = ('transport_stream_id', 'original_network_id', 'services')
     def __init__(self, buf):
         self.transport_stream_id = -1
         self.original_network_id = -1
@@ -119,13 +127,15 @@ class SdtSection(SectionExt):
 
 class Transport:
     "Transport in NIT or BAT"
+    __slots__ = ('transport_stream_id', 'original_network_id',
+                 'transport_descriptors_length', 'descriptors')
     def __init__(self, buf, i):
         self.transport_stream_id = (buf[i] << 8) | buf[i+1]
         self.original_network_id = (buf[i+2] << 8) | buf[i+3]
         self.transport_descriptors_length = (((buf[i+4] & 0xf) << 8) |
                                                buf[i+5])
-        descriptor_buf = buf[i+6:i+self.transport_descriptors_length + 6]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, i+6,
+                                          self.transport_descriptors_length)
 
     def __str__(self):
         return "transport_stream_id:0x%04x original_network_id:0x%04x" % (
@@ -134,9 +144,10 @@ class Transport:
 
 class NitSection(SectionExt):
     "Network Information Table"
+    __slots__ = ('network_id', 'descriptors', 'transports')
     def __init__(self, buf):
         self.network_id = -1
-        self.descriptors = []
+        self.descriptors = DescriptorLoop(b"")
         self.transports = []
         SectionExt.__init__(self, buf)
         if (self.table_id == -1):
@@ -147,8 +158,7 @@ class NitSection(SectionExt):
         buf = self.data
         network_descriptors_length = (((buf[8] & 0xf) << 8) | buf[9])
         i = 10 + network_descriptors_length
-        descriptor_buf = buf[10:i]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, 10, network_descriptors_length)
         i += 2
         self.transports = []
         while (i < (self.length - 1)):
@@ -165,9 +175,10 @@ class NitSection(SectionExt):
 
 class BatSection(SectionExt):
     "Bouquet Association Table"
+    __slots__ = ('transports', 'descriptors', 'bouquet_id')
     def __init__(self, buf):
         self.transports = []
-        self.descriptors = []
+        self.descriptors = DescriptorLoop(b"")
         SectionExt.__init__(self, buf)
         if (self.table_id == -1):
             bouquet_id = -1
@@ -178,8 +189,7 @@ class BatSection(SectionExt):
         buf = self.data
         bouquet_descriptors_length = (((buf[8] & 0xf) << 8) | buf[9])
         i = 10 + bouquet_descriptors_length
-        descriptor_buf = buf[10:i]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, 10, bouquet_descriptors_length)
         i += 2
         self.transports = []
         while (i < (self.length - 1)):
@@ -196,6 +206,8 @@ class BatSection(SectionExt):
 
 class EitEvent:
     "Event in EIT"
+    __slots__ = ('event_id', 'start_time', 'duration', 'running_status',
+                 'free_ca_mode', 'descriptors_loop_length', 'descriptors')
     def __init__(self, buf, i):
         self.event_id = (buf[i] << 8) | buf[i+1]
         self.start_time = buf[i+2:i+7]
@@ -203,8 +215,8 @@ class EitEvent:
         self.running_status = (buf[i+10] >> 5) & 0x7
         self.free_ca_mode = (buf[i+10] >> 4) & 0x1
         self.descriptors_loop_length = (((buf[i+10] & 0xf) << 8) | buf[i+11])
-        descriptor_buf = buf[i+12:i+self.descriptors_loop_length + 12]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, i+12,
+                                          self.descriptors_loop_length)
 
     def __str__(self):
         dvb_time = dvbdate_to_datetime(self.start_time)
@@ -221,8 +233,46 @@ class EitEvent:
                 self.start_time[4],
                 dvb_time)
 
+# event_id, mjd, 3 bytes of start time, 3 bytes of duration and the 16 bits
+# of running_status, free_ca_mode and descriptors_loop_length
+_EIT_EVENT = struct.Struct(">HH6BH")
+
+EitColumns = namedtuple('EitColumns', [
+    'event_id', 'start_time', 'duration', 'running_status', 'free_ca_mode',
+    'section_index', 'descriptors_offset', 'descriptors_length'])
+EitColumns.__doc__ = '''events of EIT sections as parallel arrays
+
+event_id            array('H')
+start_time          array('q') of unix time
+duration            array('l') of seconds
+running_status      array('B')
+free_ca_mode        array('B')
+section_index       array('H') of the index of the section of the event
+descriptors_offset  array('H') of the offset of the descriptor loop
+                    in the data of the section
+descriptors_length  array('H') of descriptors_loop_length'''
+
+def new_eit_columns():
+    'returns EitColumns of empty arrays'
+    return EitColumns(array('H'), array('q'), array('l'), array('B'),
+                      array('B'), array('H'), array('H'), array('H'))
+
+def decode_eit_columns(sections, columns=None):
+    '''appends the events of EIT sections to columns and returns columns.
+
+    No EitEvent is made. section_index of an event is the index of its
+    section in sections. Invalid sections are skipped.'''
+    if (columns is None):
+        columns = new_eit_columns()
+    for index, section in enumerate(sections):
+        if (section.table_id != -1):
+            section.append_columns(columns, index)
+    return columns
+
 class EitSection(SectionExt):
     "Event Information Table"
+    __slots__ = ('service_id', 'transport_stream_id', 'original_network_id',
+                 'segment_last_section_number', 'last_table_id', 'events')
     def __init__(self, buf):
         self.service_id = 0
         self.transport_stream_id = 0
@@ -256,6 +306,38 @@ class EitSection(SectionExt):
             i += event.descriptors_loop_length + 12
         return 0
 
+    def decode_columns(self):
+        'returns EitColumns of the events in this section'
+        columns = new_eit_columns()
+        if (self.table_id != -1):
+            self.append_columns(columns, 0)
+        return columns
+
+    def append_columns(self, columns, index):
+        'appends the events in this section to columns as section index'
+        (event_ids, start_times, durations, running_statuses, free_ca_modes,
+         section_indexes, offsets, lengths) = columns
+        bcd = BCD_TABLE
+        unpack_from = _EIT_EVENT.unpack_from
+        buf = self.data
+        i = 14
+        end = self.length - 1
+        while (i + 12 <= end):
+            (event_id, mjd, hour, minute, second, d_hour, d_minute, d_second,
+             flags) = unpack_from(buf, i)
+            loop_length = flags & 0xfff
+            event_ids.append(event_id)
+            start_times.append((mjd - 40587) * 86400 + bcd[hour] * 3600 +
+                               bcd[minute] * 60 + bcd[second])
+            durations.append(bcd[d_hour] * 3600 + bcd[d_minute] * 60 +
+                             bcd[d_second])
+            running_statuses.append(flags >> 13)
+            free_ca_modes.append((flags >> 12) & 0x1)
+            section_indexes.append(index)
+            offsets.append(i + 12)
+            lengths.append(loop_length)
+            i += loop_length + 12
+
     def __str__(self):
         return '\n'.join([
             self.__class__.__name__ + " " + SectionExt.__str__(self),
@@ -269,6 +351,7 @@ class EitSection(SectionExt):
 
 class TdtSection(Section):
     "Time and Data Table"
+    __slots__ = ('utc_time', 'crc_32')
     def __init__(self, buf):
         self.utc_time = -1
         Section.__init__(self, buf)
@@ -299,17 +382,17 @@ class TdtSection(Section):
 
 class TotSection(Section):
     "Time Offset Table"
+    __slots__ = ('utc_time', 'descriptors')
     def __init__(self, buf):
         Section.__init__(self, buf)
         self.utc_time = -1
-        self.descriptors = []
+        self.descriptors = DescriptorLoop(b"")
 
     def decode(self):
         buf = self.data
         self.utc_time = buf[3:8]
         descriptors_loop_length = ((buf[8] & 0xf) << 8) | buf[9]
-        descriptor_buf = buf[10:descriptors_loop_length + 10]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, 10, descriptors_loop_length)
         return 0
 
     def __str__(self):
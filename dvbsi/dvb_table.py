@@ -21,6 +21,7 @@
 """Container for sections defined by DVB"""
 
 
+from .section import peek_header
 from .dvb_section import STAG_EVENT_INFORMATION_NOWNEXT_ACTUAL
 from .dvb_section import STAG_EVENT_INFORMATION_NOWNEXT_OTHER
 from .dvb_section import STAG_EVENT_INFORMATION_SCHEDULE_ACTUAL
@@ -36,6 +37,7 @@ NOT_MONITORING_TABLE   = -5
 ERROR_ON_RECEIVING     = -6
 RECEIVING_TIMED_OUT    = -7
 ERROR_ON_PARSING       = -8
+ERROR_ON_CRC           = -9
 
 NEW_SECTION            = 0x0001
 SECTION_REPLACED       = 0x0002
@@ -95,6 +97,33 @@ class SectionContainer:
                 COMPLETE_TABLE'''
         return 0
 
+    def test_header(self, header):
+        '''tests SectionHeader made by peek_header() before parsing section.
+
+        return value:
+            0 if the section is already received.
+            NOT_MONITORING_TABLE if the section is not for this container.
+            NOT_TESTED otherwise; the section should be parsed and saved.'''
+        return NOT_TESTED
+
+    def save_raw_sections(self, raws, parser):
+        '''parses raw sections read at once with parser and saves them in
+        order, skipping those test_header() finds already received.
+
+        yields (result, section) for every section parsed. result is that of
+        save(), or ERROR_ON_PARSING if parser made an invalid section. Each
+        section is saved only when the previous one is taken, so the
+        container is as if the sections were saved one by one.'''
+        for raw in raws:
+            header = peek_header(raw)
+            if (header is not None and self.test_header(header) == 0):
+                continue
+            section = parser(raw)
+            if (section.table_id == -1):
+                yield ERROR_ON_PARSING, section
+                continue
+            yield self.save(section), section
+
     def get_progress(self):
         'returns tuple (no. of received, no. of complete sections)'
         return (0, 0)
@@ -127,6 +156,10 @@ class SubTable(SectionContainer):
         self.last_section_number = 0
         self.complete = False
         self.obsolete_sections = []
+        # bitsets of section_number: the sections saved with the current
+        # version_number and last_section_number, and those to receive
+        self.received = 0
+        self.expected = 1
 
     def _is_monitoring_section(self, section):
         # virtual
@@ -142,6 +175,19 @@ class SubTable(SectionContainer):
                 if (sn > section.last_section_number):
                     self.obsolete_sections.append(self.sections.pop(sn))
         self.last_section_number = section.last_section_number
+        self.expected = (2 << self.last_section_number) - 1
+
+    def _is_current(self, section):
+        return (section.version_number == self.version_number and
+                section.last_section_number == self.last_section_number)
+
+    def _count_received(self):
+        'makes the bitset of received sections over again'
+        received = 0
+        for section_number, section in self.sections.items():
+            if (self._is_current(section)):
+                received |= 1 << section_number
+        self.received = received
 
     def save(self, section, test_result=-1):
         if (test_result is NOT_TESTED):
@@ -152,20 +198,32 @@ class SubTable(SectionContainer):
 
         self.obsolete_sections = []
         num_section_changed = self.is_num_section_changed(section)
+        recount = False
         if ((self.version_number == 0xff) or num_section_changed):
             self._process_num_section_changed(section)
+            recount = True
 
         if (test_result & (NEW_SECTION | VERSION_CHANGED | SECTION_REPLACED)):
+            if (self.version_number != section.version_number):
+                recount = True
             self.version_number = section.version_number
             obsolete_section = self.sections.pop(section.section_number, None)
             if (obsolete_section is not None):
                 self.obsolete_sections.append(obsolete_section)
             self.sections[section.section_number] = section
+            if (recount):
+                self._count_received()
+            elif (self._is_current(section)):
+                self.received |= 1 << section.section_number
+            else:
+                self.received &= ~(1 << section.section_number)
             if (self._check_complete(section)):
                 self.complete = True
                 test_result |= COMPLETE_SUB_TABLE
             else:
                 self.complete = False
+        elif (recount):
+            self._count_received()
 
         if (len(self.obsolete_sections)):
             test_result |= OBSOLETE_SECTIONS
@@ -198,16 +256,20 @@ class SubTable(SectionContainer):
 
         return test_result
 
+    def test_header(self, header):
+        saved = self.sections.get(header.section_number)
+        if (saved is None):
+            return NOT_TESTED
+        if (self.version_number != header.version_number or
+            saved.version_number != header.version_number or
+            saved.last_section_number != header.last_section_number or
+            saved.crc_32 != header.crc_32):
+            return NOT_TESTED
+        return 0
+
     def _check_complete(self, section):
         """Check if all sections are received"""
-        if (len(self.sections) is not self.last_section_number + 1):
-            return False
-        for section in self.sections.values():
-            if (section.version_number is not self.version_number):
-                return False
-            if (section.last_section_number is not self.last_section_number):
-                return False
-        return True
+        return self.received == self.expected
 
     def get_progress(self):
         return len(self.sections), self.last_section_number + 1
@@ -298,6 +360,17 @@ class SubTableEit(SubTable):
 
         return test_result
 
+    def test_header(self, header):
+        saved = self.sections.get(header.section_number)
+        if (saved is None):
+            return NOT_TESTED
+        if (self.version_number != header.version_number or
+            saved.version_number != header.version_number or
+            saved.last_section_number != header.last_section_number or
+            saved.segment_last_section_number != header.data[12]):
+            return NOT_TESTED
+        return 0
+
     def __str__(self):
         got, to_get = self.get_progress()
         string = " (ver %2d, %d/%d) - (%02x, %04x:%04x:%04x)" % (
@@ -312,30 +385,16 @@ class SubTableEit(SubTable):
 
     def reset(self):
         SubTable.reset(self)
-        self.segment_map = []     # contains which section
-                                  # with section_number is received
         self.segment_mask = []    # contains which section
                                   # with section_number should be received
         self.num_sec_in_seg = []  # contains the count of 1's in segment_mask
                                   # to get easily the total number of sections
                                   # to receive
-
-    def _check_complete(self, section):
-        # check segment map, not section map
-        seg_index = section.section_number // 8
-        seg_offset = section.section_number % 8
-        self.segment_map[seg_index] |= 0x01 << seg_offset
-        if (self.segment_mask != self.segment_map):
-            return False
-        for section in self.sections.values():
-            if (section.version_number is not self.version_number):
-                return False
-            if (section.last_section_number is not self.last_section_number):
-                return False
-        return True
+        self.expected = 0
+        self.num_expected = 0
 
     def get_progress(self):
-        return len(self.sections), sum(self.num_sec_in_seg)
+        return len(self.sections), self.num_expected
 
     def is_num_section_changed(self, section):
         if (self.last_section_number != section.last_section_number):
@@ -357,14 +416,12 @@ class SubTableEit(SubTable):
             diff = last_seg_index + 1 - len(self.segment_mask)
             for i in range(diff):
                 self.segment_mask.append(0xff)
-                self.segment_map.append(0)
                 self.num_sec_in_seg.append(8)
         elif (len(self.segment_mask) > last_seg_index + 1):
             # decrease the size of segment info
             diff = len(self.segment_mask) - last_seg_index - 1
             for i in range(diff):
                 self.segment_mask.pop()
-                self.segment_map.pop()
                 self.num_sec_in_seg.pop()
             # pop obsolete_sections.
             for sn in list(self.sections.keys()):
@@ -396,6 +453,11 @@ class SubTableEit(SubTable):
                     self.obsolete_sections.append(obsolete_section)
 
         self.num_sec_in_seg[seg_index] = num_sec_in_seg
+        expected = 0
+        for i, mask in enumerate(self.segment_mask):
+            expected |= mask << (i * 8)
+        self.expected = expected
+        self.num_expected = sum(self.num_sec_in_seg)
 
 
 class Table(SectionContainer):
@@ -419,6 +481,11 @@ class Table(SectionContainer):
 
     save(section)
 
+    test_header(header)  checks SectionHeader made by peek_header() without
+                    parsing the section. This method returns 0 if the section
+                    is already received and NOT_TESTED if it should be parsed
+                    and saved.
+
     is_complete()   returns True if all sections are received.
 
     is_complete(key)
@@ -438,21 +505,56 @@ class Table(SectionContainer):
     get_sections(key)  returns the list of all sections received.
 
     reset()         removes all SubTables.
+
+    If check_crc is True, save() verifies CRC32 of the section and returns
+    ERROR_ON_CRC without saving it if the CRC32 is wrong.
     '''
-    def __init__(self, table_id):
+    def __init__(self, table_id, check_crc=False):
         self.table_id = table_id
+        self.check_crc = check_crc
         self.reset()
 
     def reset(self):
         self.sub_tables = {}
+        # counts of the sub_tables kept on every change, so that
+        # is_complete() and get_progress() need not look at them all
+        self.num_incomplete = 0
+        self.num_got = 0
+        self.num_to_get = 0
+
+    def _count_sub_table(self, sub_table, sign):
+        got, to_get = sub_table.get_progress()
+        self.num_got += sign * got
+        self.num_to_get += sign * to_get
+        if (sub_table.complete is False):
+            self.num_incomplete += sign
+
+    def add_sub_table(self, key, sub_table):
+        'adds sub_table by key, replacing the one of the same key'
+        self.remove_sub_table(key)
+        self.sub_tables[key] = sub_table
+        self._count_sub_table(sub_table, 1)
+        return sub_table
+
+    def remove_sub_table(self, key):
+        'removes and returns the sub_table of key, or None'
+        sub_table = self.sub_tables.pop(key, None)
+        if (sub_table is not None):
+            self._count_sub_table(sub_table, -1)
+        return sub_table
+
+    def save_sub_table(self, sub_table, section, test_result):
+        'saves section in sub_table of this table and returns the result'
+        self._count_sub_table(sub_table, -1)
+        save_result = sub_table.save(section, test_result)
+        self._count_sub_table(sub_table, 1)
+        return save_result
 
     def new_sub_table(self, key):
         table_id, table_id_ext = key
         if (table_id != self.table_id):
             return None
-        sub_table = SubTable(table_id, table_id_ext)
-        self.sub_tables[key] = sub_table
-        return sub_table
+        return self.add_sub_table(key, SubTable(table_id, table_id_ext))
 
     def get_key(self, section):
         'makes a key to identify collector out of section'
@@ -470,10 +572,25 @@ class Table(SectionContainer):
             return NEW_SUB_TABLE | NEW_SECTION | NEW_VERSION
         return sub_table.test(section)
 
+    def get_header_key(self, header):
+        'makes a key to identify collector out of SectionHeader'
+        return (header.table_id, header.table_id_ext)
+
+    def test_header(self, header):
+        if (header.table_id != self.table_id):
+            return NOT_MONITORING_TABLE
+        sub_table = self.get_sub_table(self.get_header_key(header))
+        if (sub_table is None):
+            return NOT_TESTED
+        return sub_table.test_header(header)
+
     def save(self, section, test_result=-1):
         if (self._is_monitoring_table(section) is False):
             return NOT_MONITORING_TABLE
 
+        if (self.check_crc and section.verify_crc() is False):
+            return ERROR_ON_CRC
+
         if (test_result is NOT_TESTED):
             test_result = self.test(section)
 
@@ -485,30 +602,19 @@ class Table(SectionContainer):
         if (sub_table is None):
             return ERROR_ON_SAVING
 
-        save_result = sub_table.save(section, test_result)
+        save_result = self.save_sub_table(sub_table, section, test_result)
         if (save_result & COMPLETE_SUB_TABLE):
             if (self.is_complete() is True):
                 save_result |= COMPLETE_TABLE
         return save_result | test_result
 
     def is_complete(self):
-        if (len(self.sub_tables) is 0):
+        if (len(self.sub_tables) == 0):
             return False
-        for sub_table in self.sub_tables.values():
-            if (sub_table.complete is False):
-                return False
-        return True
+        return self.num_incomplete == 0
 
     def get_progress(self):
-        total_got = 0
-        total_to_get = 0
-
-        for sub_table in self.sub_tables.values():
-            get, to_get = sub_table.get_progress()
-            total_got += get
-            total_to_get += to_get
-
-        return total_got, total_to_get
+        return self.num_got, self.num_to_get
 
     def get_sections(self):
         sections = []
@@ -549,13 +655,18 @@ class TableSdt(Table):
         if (table_id != self.table_id):
             return None
         sub_table = SubTableSdt(table_id, table_id_ext, original_network_id)
-        self.sub_tables[key] = sub_table
-        return sub_table
+        return self.add_sub_table(key, sub_table)
 
     def get_key(self, section):
         return (section.table_id, section.table_id_ext,
                 section.original_network_id)
 
+    def get_header_key(self, header):
+        buf = header.data
+        if (len(buf) < 10):
+            return None
+        return (header.table_id, header.table_id_ext, (buf[8] << 8) | buf[9])
+
 
 class TableEitPrinciple(Table):
     '''a container to collect Event Information Table.
@@ -573,8 +684,7 @@ class TableEitPrinciple(Table):
             return None
         sub_table = SubTableEit(table_id, table_id_ext,
                                 transport_stream_id, original_network_id)
-        self.sub_tables[key] = sub_table
-        return sub_table
+        return self.add_sub_table(key, sub_table)
 
     def get_key(self, section):
         return (section.table_id, section.table_id_ext,
@@ -619,8 +729,7 @@ class SvcTable(Table):
         table_id_ext, transport_stream_id, original_network_id = svc_key
         sub_table = SubTableEit(table_id, table_id_ext,
                                 transport_stream_id, original_network_id)
-        self.sub_tables[key] = sub_table
-        return sub_table
+        return self.add_sub_table(key, sub_table)
 
     def get_key(self, section):
         return (section.table_id, (section.table_id_ext,
@@ -656,7 +765,7 @@ class SvcTable(Table):
             return ERROR_ON_SAVING
 
         self.obsolete_sub_tables = []
-        save_result = sub_table.save(section, test_result)
+        save_result = self.save_sub_table(sub_table, section, test_result)
         if (save_result & (NEW_SECTION | VERSION_CHANGED | SECTION_REPLACED)):
             if (self.is_eit_sch_table(section.table_id)):
                 num_eit_sch_sub_table = (section.last_table_id & 0xf) + 1
@@ -676,7 +785,7 @@ class SvcTable(Table):
         for i in range(new_num_eit_sch_sub_table, self.num_eit_sch_sub_table):
             table_id = i + STAG_EVENT_INFORMATION_SCHEDULE_ACTUAL
             key = (table_id, self.svc_key)
-            sub_table = self.sub_tables.pop(key, None)
+            sub_table = self.remove_sub_table(key)
             if (sub_table is not None):
                 self.obsolete_sub_tables.append(sub_table)
 
@@ -694,15 +803,30 @@ class SvcTable(Table):
 
 
 class TableEit(SectionContainer):
-    def __init__(self):
+    def __init__(self, check_crc=False):
+        self.check_crc = check_crc
         self.reset()
 
     def reset(self):
         self.svc_tables = {}
+        # counts of the svc_tables kept as in Table
+        self.num_incomplete = 0
+        self.num_got = 0
+        self.num_to_get = 0
+
+    def _count_svc_table(self, svc_table, sign):
+        self.num_got += sign * svc_table.num_got
+        self.num_to_get += sign * svc_table.num_to_get
+        if (svc_table.is_complete() is False):
+            self.num_incomplete += sign
 
     def new_svc_table(self, svc_key):
         svc_table = SvcTable(svc_key)
+        old = self.svc_tables.get(svc_key)
+        if (old is not None):
+            self._count_svc_table(old, -1)
         self.svc_tables[svc_key] = svc_table
+        self._count_svc_table(svc_table, 1)
         return svc_table
 
     def new_sub_table(self, key):
@@ -717,7 +841,10 @@ class TableEit(SectionContainer):
         if (svc_table is None):
             return ERROR_ON_SAVING
         new_key = (table_id, svc_key)
-        return svc_table.new_sub_table(new_key)
+        self._count_svc_table(svc_table, -1)
+        sub_table = svc_table.new_sub_table(new_key)
+        self._count_svc_table(svc_table, 1)
+        return sub_table
 
     def get_key(self, section):
         return (section.table_id, self.get_svc_table_key(section))
@@ -729,11 +856,7 @@ class TableEit(SectionContainer):
     def is_complete(self):
         if (len(self.svc_tables) == 0):
             return False
-        for svc_table in self.svc_tables.values():
-            if (svc_table.is_complete() is False):
-                return False
-        else:
-            return True
+        return self.num_incomplete == 0
 
     def equivalent_table_id(self, table_id):
         if (table_id >= STAG_EVENT_INFORMATION_SCHEDULE_ACTUAL and
@@ -744,6 +867,23 @@ class TableEit(SectionContainer):
             return STAG_EVENT_INFORMATION_NOWNEXT_ACTUAL
         return -1
 
+    def test_header(self, header):
+        table_id = self.equivalent_table_id(header.table_id)
+        if (table_id == -1):
+            return NOT_MONITORING_TABLE
+        buf = header.data
+        if (len(buf) < 14):
+            return NOT_TESTED
+        svc_key = (header.table_id_ext, (buf[8] << 8) | buf[9],
+                   (buf[10] << 8) | buf[11])
+        svc_table = self.svc_tables.get(svc_key)
+        if (svc_table is None):
+            return NOT_TESTED
+        sub_table = svc_table.get_sub_table((table_id, svc_key))
+        if (sub_table is None):
+            return NOT_TESTED
+        return sub_table.test_header(header)
+
     def test(self, section):
         table_id = self.equivalent_table_id(section.table_id)
         if (table_id == -1):
@@ -761,6 +901,8 @@ class TableEit(SectionContainer):
         table_id = self.equivalent_table_id(section.table_id)
         if (table_id == -1):
             return NOT_MONITORING_TABLE
+        if (self.check_crc and section.verify_crc() is False):
+            return ERROR_ON_CRC
         section.table_id = table_id
         if (test_result is NOT_TESTED):
             test_result = self.test(section)
@@ -770,11 +912,13 @@ class TableEit(SectionContainer):
         if (test_result & NEW_SVC_TABLE):
             svc_table = self.new_svc_table(svc_key)
         else:
-            svc_table = self.get_svc_table(svc_key)
+            svc_table = self.svc_tables.get(svc_key)
         if (svc_table is None):
             return ERROR_ON_SAVING
 
+        self._count_svc_table(svc_table, -1)
         save_result = svc_table.save(section, test_result)
+        self._count_svc_table(svc_table, 1)
         if (save_result & COMPLETE_SVC_TABLE):
             if (self.is_complete()):
                 save_result |= COMPLETE_TABLE
@@ -784,15 +928,7 @@ class TableEit(SectionContainer):
         return self.svc_tables.get(key, None)
 
     def get_progress(self):
-        total_got = 0
-        total_to_get = 0
-
-        for svc_table in self.svc_tables.values():
-            get, to_get = svc_table.get_progress()
-            total_got += get
-            total_to_get += to_get
-
-        return total_got, total_to_get
+        return self.num_got, self.num_to_get
 
     def get_sections(self):
         sections = []
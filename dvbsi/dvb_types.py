@@ -19,33 +19,30 @@
 #
 
 import datetime
+import struct
+
+# BCD_TABLE[b] is the value of the 2 digit BCD byte b
+BCD_TABLE = bytes([(b >> 4) * 10 + (b & 0x0f) for b in range(256)])
 
 def bcd_to_integer(bcdval):
     """Convert a string BCD value into a normal integer."""
+    if (bcdval < 0x100):
+        return BCD_TABLE[bcdval]
     val = 0
-    for i in range(28, -1, -4):
-        val += ((bcdval >> i) & 0x0f)
-        if (i != 0):
-            val *= 10
+    scale = 1
+    while (bcdval):
+        val += BCD_TABLE[bcdval & 0xff] * scale
+        bcdval >>= 8
+        scale *= 100
     return val
 
 def dvbduration_to_seconds(dvbduration):
     """Convert from a 3 byte DVB BCD duration to a number of seconds."""
-    seconds = 0
-
-    seconds += bcd_to_integer(dvbduration[0]) * 60 * 60
-    seconds += bcd_to_integer(dvbduration[1]) * 60
-    seconds += bcd_to_integer(dvbduration[2])
-
-    return seconds
-
-def mjd_to_ymdwd(mjd):
-    """Convert mjd to (Y, M, D, WD) according to ETSI EN 300 468 Annex C.
+    bcd = BCD_TABLE
+    return (bcd[dvbduration[0]] * 3600 + bcd[dvbduration[1]] * 60 +
+            bcd[dvbduration[2]])
 
-       Y: Year from 1900 (e.g. for 2003, Y = 103)
-       M: Month from January (= 1) to December (= 12)
-       D: Day of month from 1 to 31
-       WD: Day of week from Monday (= 1) to Sunday (= 7)"""
+def _mjd_to_ymdwd(mjd):
     year = (mjd * 100 - 1507820) // 36525
     mon = ((mjd * 10000 - 149561000) - (year * 36525 // 100) * 10000) // 306001
     day = mjd - 14956 - (year * 36525 // 100) - (mon * 306001 // 10000)
@@ -58,6 +55,23 @@ def mjd_to_ymdwd(mjd):
     wday = (mjd + 2) % 7 + 1
     return (year, mon, day, wday)
 
+# mjd -> (Y, M, D, WD). A schedule spans a handful of days, and there are
+# no more than 65536 mjd values, so the memo is never pruned.
+_MJD_MEMO = {}
+
+def mjd_to_ymdwd(mjd):
+    """Convert mjd to (Y, M, D, WD) according to ETSI EN 300 468 Annex C.
+
+       Y: Year from 1900 (e.g. for 2003, Y = 103)
+       M: Month from January (= 1) to December (= 12)
+       D: Day of month from 1 to 31
+       WD: Day of week from Monday (= 1) to Sunday (= 7)"""
+    ymdwd = _MJD_MEMO.get(mjd)
+    if (ymdwd is None):
+        ymdwd = _mjd_to_ymdwd(mjd)
+        _MJD_MEMO[mjd] = ymdwd
+    return ymdwd
+
 def dvbdate_to_datetime(dvbdate):
     """Convert from a 5 byte DVB UTC date to datetime
 
@@ -66,15 +80,10 @@ def dvbdate_to_datetime(dvbdate):
     mjd = (dvbdate[0] << 8) | dvbdate[1]
     year, month, day, wday = mjd_to_ymdwd(mjd)
     year += 1900
-    hour = bcd_to_integer(dvbdate[2])
-    if (hour > 23):
-        hour = 23
-    minute = bcd_to_integer(dvbdate[3])
-    if (minute > 59):
-        minute = 59
-    second = bcd_to_integer(dvbdate[4])
-    if (second > 59):
-        second = 59
+    bcd = BCD_TABLE
+    hour = min(bcd[dvbdate[2]], 23)
+    minute = min(bcd[dvbdate[3]], 59)
+    second = min(bcd[dvbdate[4]], 59)
     return datetime.datetime(year, month, day, hour, minute, second)
 
 def dvbdate_to_unixtime(dvbdate):
@@ -82,11 +91,22 @@ def dvbdate_to_unixtime(dvbdate):
 
     Note: this functions expects the DVB date in network byte order.
     """
-    mjd = (dvbdate[0] << 8) | dvbdate[1]
-    hour = bcd_to_integer(dvbdate[2])
-    minute = bcd_to_integer(dvbdate[3])
-    second = bcd_to_integer(dvbdate[4])
-    return ((mjd - 40587) * 86400 + hour * 3600 + minute * 60 + second)
+    bcd = BCD_TABLE
+    return ((((dvbdate[0] << 8) | dvbdate[1]) - 40587) * 86400 +
+            bcd[dvbdate[2]] * 3600 + bcd[dvbdate[3]] * 60 + bcd[dvbdate[4]])
+
+_START_DURATION = struct.Struct(">H6B")
+
+def parse_start_duration(buf, offset=0):
+    """Convert a 5 byte DVB UTC date followed by a 3 byte DVB BCD duration,
+    as in the event loop of EIT, to (unix_start, unix_end)."""
+    (mjd, hour, minute, second, d_hour, d_minute,
+     d_second) = _START_DURATION.unpack_from(buf, offset)
+    bcd = BCD_TABLE
+    start = ((mjd - 40587) * 86400 + bcd[hour] * 3600 + bcd[minute] * 60 +
+             bcd[second])
+    return (start, start + bcd[d_hour] * 3600 + bcd[d_minute] * 60 +
+            bcd[d_second])
 
 CHARSET_CODE_MAP = {
     0x01: "ISO8859-5",
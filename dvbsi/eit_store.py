@@ -0,0 +1,321 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""Bounded store of EIT sections
+
+TableEit keeps every EIT section it saves for as long as it lives.
+BoundedTableEit evicts sections to keep within budgets of sections and
+bytes, for the whole table and per service, and evicts the sections
+whose events have all ended. An evicted section leaves a SectionStub
+behind, so that it is still known as received and the carousel does not
+make it saved over and over again.
+
+    table = BoundedTableEit(True, max_bytes=8 << 20, spill=True)
+    table.save(section)
+    ...
+    table.evict_past(time.time())
+    svc_table = table.load_svc_table(svc_key)  # rehydrated if spilled
+"""
+
+from collections import OrderedDict
+
+from .dvb_section import EitSection
+from .dvb_types import parse_start_duration
+from .dvb_table import SvcTable, TableEit
+
+
+class SectionStub:
+    '''what is kept of an evicted section: enough to tell the same section
+    received again. data is the raw section if it is spilled, or None'''
+    __slots__ = ('section_number', 'version_number', 'last_section_number',
+                 'segment_last_section_number', 'crc_32', 'data')
+    def __init__(self, section, data=None):
+        self.section_number = section.section_number
+        self.version_number = section.version_number
+        self.last_section_number = section.last_section_number
+        self.segment_last_section_number = section.segment_last_section_number
+        self.crc_32 = section.crc_32
+        self.data = data
+
+
+def section_end_time(section):
+    '''returns unix time when the last event of EIT section ends, or None if
+    the section has no event'''
+    raw = section.data
+    end_time = None
+    i = 14
+    end = len(raw) - 4
+    while (i + 12 <= end):
+        start, stop = parse_start_duration(raw, i + 2)
+        if (end_time is None or stop > end_time):
+            end_time = stop
+        i += 12 + (((raw[i+10] & 0x0f) << 8) | raw[i+11])
+    return end_time
+
+
+class BoundedSvcTable(SvcTable):
+    'SvcTable of BoundedTableEit, whose get_sections() skips SectionStubs'
+    def get_sections(self):
+        return [section for section in SvcTable.get_sections(self)
+                if (section.__class__ is not SectionStub)]
+
+
+class BoundedTableEit(TableEit):
+    '''TableEit with budgets of memory.
+
+    max_sections and max_bytes bound the sections resident in the whole
+    table, max_svc_sections and max_svc_bytes those of each service;
+    set_svc_budget() sets them for one service. The bytes are those of the
+    raw sections; decoded events take a few times more. None is no limit.
+
+    Over the budget of a service, its sections ending first are evicted.
+    Over the budget of the table, the services least recently saved or
+    loaded with load_svc_table() are evicted as a whole. With spill,
+    evicted sections keep their raw bytes in the SectionStub and are
+    parsed again when load_svc_table() loads their service, for a reader
+    of its whole schedule; without, they are forgotten and saved again
+    when received again. get_svc_table() only looks the service up.
+    The service loaded last may stay over its own budget while it is
+    read; it is trimmed when another service is loaded or a section is
+    saved. evict_past(now) evicts the sections whose events have all
+    ended for good: they are not saved again while their version stays.'''
+    def __init__(self, check_crc=False, max_sections=None, max_bytes=None,
+                 max_svc_sections=None, max_svc_bytes=None, spill=False):
+        self.max_sections = max_sections
+        self.max_bytes = max_bytes
+        self.max_svc_sections = max_svc_sections
+        self.max_svc_bytes = max_svc_bytes
+        self.svc_budgets = {}
+        self.spill = spill
+        TableEit.__init__(self, check_crc)
+
+    def reset(self):
+        TableEit.reset(self)
+        self.lru = OrderedDict()    # svc_key, least recently used first
+        self.resident = {}          # svc_key to [sections, bytes]
+        self.end_times = {}         # section to unix time its events end
+        self.num_resident = 0
+        self.resident_bytes = 0
+        self.num_spilled = 0
+        self.spilled_bytes = 0
+        self.num_evicted = 0
+        self.loaded = None          # svc_key loaded last, over its budget
+
+    def set_svc_budget(self, svc_key, max_sections=None, max_bytes=None):
+        'sets the budget of the service of svc_key'
+        self.svc_budgets[svc_key] = (max_sections, max_bytes)
+        self.trim_svc_table(svc_key)
+
+    def get_stats(self):
+        '''returns tuple of (resident sections, resident bytes, spilled
+        sections, spilled bytes, sections evicted so far)'''
+        return (self.num_resident, self.resident_bytes, self.num_spilled,
+                self.spilled_bytes, self.num_evicted)
+
+    def new_svc_table(self, svc_key):
+        svc_table = BoundedSvcTable(svc_key)
+        old = self.svc_tables.get(svc_key)
+        if (old is not None):
+            self._count_svc_table(old, -1)
+        self.svc_tables[svc_key] = svc_table
+        self._count_svc_table(svc_table, 1)
+        return svc_table
+
+    def load_svc_table(self, key):
+        '''returns the svc_table of key with its spilled sections parsed
+        again, or None'''
+        self._unload(key)
+        svc_table = self.svc_tables.get(key, None)
+        if (svc_table is None):
+            return None
+        self.lru[key] = None
+        self.lru.move_to_end(key)
+        if (self.spill and self.rehydrate(key)):
+            self.loaded = key
+            self.trim()
+        return svc_table
+
+    def _unload(self, key):
+        'trims the service loaded last to its budget, unless it is of key'
+        loaded = self.loaded
+        if (loaded is not None and loaded != key):
+            self.loaded = None
+            self.trim_svc_table(loaded)
+
+    def _account(self, svc_key, section, sign):
+        'counts section in or out of the memory of svc_key'
+        if (section.__class__ is SectionStub):
+            if (section.data is not None):
+                self.num_spilled += sign
+                self.spilled_bytes += sign * len(section.data)
+            return
+        size = sign * len(section.data)
+        resident = self.resident.setdefault(svc_key, [0, 0])
+        resident[0] += sign
+        resident[1] += size
+        self.num_resident += sign
+        self.resident_bytes += size
+        if (sign < 0):
+            self.end_times.pop(section, None)
+
+    def save(self, section, test_result=-1):
+        save_result = TableEit.save(self, section, test_result)
+        if (save_result <= 0):
+            return save_result
+        svc_key = self.get_svc_table_key(section)
+        svc_table = self.svc_tables[svc_key]
+        sub_table = svc_table.get_sub_table(svc_table.get_key(section))
+        if (sub_table is not None and
+            sub_table.sections.get(section.section_number) is section):
+            self._account(svc_key, section, 1)
+            for obsolete in sub_table.obsolete_sections:
+                self._account(svc_key, obsolete, -1)
+        for obsolete_sub_table in svc_table.obsolete_sub_tables:
+            for obsolete in obsolete_sub_table.sections.values():
+                self._account(svc_key, obsolete, -1)
+        self.lru[svc_key] = None
+        self.lru.move_to_end(svc_key)
+        self._unload(None)
+        self.trim_svc_table(svc_key)
+        self.trim()
+        return save_result
+
+    def _replace(self, svc_key, sub_table, section_number, section):
+        '''puts section in sub_table at section_number, removing it if None,
+        keeping the counts of the tables'''
+        svc_table = self.svc_tables[svc_key]
+        old = sub_table.sections[section_number]
+        self._count_svc_table(svc_table, -1)
+        svc_table._count_sub_table(sub_table, -1)
+        self._account(svc_key, old, -1)
+        if (section is None):
+            del sub_table.sections[section_number]
+            sub_table._count_received()
+            sub_table.complete = sub_table._check_complete(None)
+        else:
+            sub_table.sections[section_number] = section
+            self._account(svc_key, section, 1)
+        svc_table._count_sub_table(sub_table, 1)
+        self._count_svc_table(svc_table, 1)
+
+    def evict(self, svc_key, sub_table, section_number):
+        'evicts the section of section_number of sub_table to the budget'
+        section = sub_table.sections[section_number]
+        if (section.__class__ is SectionStub):
+            return
+        self.num_evicted += 1
+        if (self.spill):
+            self._replace(svc_key, sub_table, section_number,
+                          SectionStub(section, section.data))
+        else:
+            self._replace(svc_key, sub_table, section_number, None)
+
+    def get_end_time(self, section):
+        end_time = self.end_times.get(section)
+        if (end_time is None):
+            end_time = section_end_time(section)
+            if (end_time is None):
+                end_time = 0
+            self.end_times[section] = end_time
+        return end_time
+
+    def get_resident_sections(self, svc_key):
+        'returns list of (sub_table, section) of svc_key not evicted'
+        resident = []
+        svc_table = self.svc_tables.get(svc_key)
+        if (svc_table is None):
+            return resident
+        for sub_table in svc_table.sub_tables.values():
+            for section in sub_table.sections.values():
+                if (section.__class__ is not SectionStub):
+                    resident.append((sub_table, section))
+        return resident
+
+    def _is_over(self, num, size, max_sections, max_bytes):
+        return ((max_sections is not None and num > max_sections) or
+                (max_bytes is not None and size > max_bytes))
+
+    def trim_svc_table(self, svc_key):
+        'evicts the sections of svc_key ending first while over its budget'
+        max_sections, max_bytes = self.svc_budgets.get(
+                svc_key, (self.max_svc_sections, self.max_svc_bytes))
+        resident = self.resident.get(svc_key)
+        if (resident is None or
+            not self._is_over(resident[0], resident[1],
+                              max_sections, max_bytes)):
+            return
+        sections = self.get_resident_sections(svc_key)
+        sections.sort(key=lambda item: self.get_end_time(item[1]))
+        for sub_table, section in sections:
+            if (not self._is_over(resident[0], resident[1],
+                                  max_sections, max_bytes)):
+                break
+            self.evict(svc_key, sub_table, section.section_number)
+
+    def trim(self):
+        'evicts the least recently used services while over the budget'
+        for svc_key in list(self.lru):
+            if (not self._is_over(self.num_resident, self.resident_bytes,
+                                  self.max_sections, self.max_bytes)):
+                break
+            if (len(self.lru) > 1 and svc_key == next(reversed(self.lru))):
+                # the one just saved goes last
+                break
+            for sub_table, section in self.get_resident_sections(svc_key):
+                self.evict(svc_key, sub_table, section.section_number)
+
+    def evict_past(self, now):
+        '''evicts the sections whose events all ended before now.
+        returns number of sections evicted'''
+        num = 0
+        for svc_key, svc_table in self.svc_tables.items():
+            for sub_table in svc_table.sub_tables.values():
+                for section in list(sub_table.sections.values()):
+                    if (section.__class__ is SectionStub):
+                        if (section.data is None):
+                            continue
+                        end_time = section_end_time(section)
+                    else:
+                        end_time = self.get_end_time(section)
+                    if (end_time and end_time < now):
+                        self._replace(svc_key, sub_table,
+                                      section.section_number,
+                                      SectionStub(section))
+                        self.num_evicted += 1
+                        num += 1
+        return num
+
+    def rehydrate(self, svc_key):
+        '''parses again the spilled sections of svc_key.
+        returns number of sections rehydrated'''
+        svc_table = self.svc_tables.get(svc_key)
+        if (svc_table is None):
+            return 0
+        num = 0
+        for sub_table in svc_table.sub_tables.values():
+            for section_number, stub in list(sub_table.sections.items()):
+                if (stub.__class__ is not SectionStub or stub.data is None):
+                    continue
+                section = EitSection(stub.data)
+                section.table_id = sub_table.table_id
+                section.decode()
+                self._replace(svc_key, sub_table, section_number, section)
+                num += 1
+        return num
@@ -59,6 +59,7 @@ DTAG_METADATA_STD                  = 0x27
 
 class Iso639LanguageCode:
     "language code in iso 639 language descriptor"
+    __slots__ = ('audio_type', 'language_code')
     def __init__(self, buf, i):
         language_code = buf[i:i+3].decode()
         if (language_code.isalpha()):
@@ -73,6 +74,7 @@ class Iso639LanguageCode:
 
 class Iso639LanguageDescriptor(Descriptor):
     "iso 639 language descriptor"
+    __slots__ = ('entries',)
     def __init__(self, buf, i = 0):
         self.entries = []
         Descriptor.__init__(self, buf, i)
@@ -91,6 +93,7 @@ class Iso639LanguageDescriptor(Descriptor):
 
 class CaDescriptor(Descriptor):
     "CA descriptor"
+    __slots__ = ('entries', 'ca_system_id', 'ca_pid', 'private_data_byte')
     def __init__(self, buf, i = 0):
         self.entries = []
         Descriptor.__init__(self, buf, i)
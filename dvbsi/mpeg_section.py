@@ -21,8 +21,11 @@
 """Parse sections defined by ISO"""
 
 
+import struct
+
 from .section import Section, SectionExt
 from .descriptor import DescriptorLoop
+from .records import fixed_records, uint16_array
 
 
 TRANSPORT_PAT_PID   = 0x00
@@ -39,11 +42,14 @@ STAG_ISO14496_OBJECT_DESCRIPTION   = 0x05
 STAG_METADATA                      = 0x06
 
 
+_PAT_PROGRAM = struct.Struct(">HH")
+
 class PatProgram:
     "Program in PAT"
-    def __init__(self, buf, i):
-        self.program_number = (buf[i] << 8) | buf[i+1]
-        self.pid = ((buf[i+2] & 0x1f) << 8) | buf[i+3]
+    __slots__ = ('program_number', 'pid')
+    def __init__(self, program_number, pid):
+        self.program_number = program_number
+        self.pid = pid & 0x1fff
 
     def __str__(self):
         return "    program_number:0x%04x pid:0x%04x" % (
@@ -51,6 +57,7 @@ class PatProgram:
 
 class PatSection(SectionExt):
     "Program Association Table"
+    __slots__ = ('programs', 'transport_stream_id')
     def __init__(self, buf):
         self.programs = []
         self.transport_stream_id = 0
@@ -60,14 +67,23 @@ class PatSection(SectionExt):
         self.transport_stream_id = self.table_id_ext
 
     def decode(self):
-        buf = self.data
-        i = 8
-        self.programs = []
-        while (i < (self.length - 1)):
-            self.programs.append(PatProgram(buf, i))
-            i += 4
+        self.programs = [PatProgram(program_number, pid)
+                         for program_number, pid in
+                         _PAT_PROGRAM.iter_unpack(self.program_loop())]
         return 0
 
+    def program_loop(self):
+        'returns memoryview of the program loop'
+        return fixed_records(self.data, 8, self.length - 9, 4)
+
+    def program_numbers_array(self):
+        "returns array('H') of program_number of all programs"
+        return uint16_array(self.program_loop(), 4, 0)
+
+    def pids_array(self):
+        "returns array('H') of pid of all programs"
+        return uint16_array(self.program_loop(), 4, 2, 0x1fff)
+
     def __str__(self):
         string = '\n'.join([
             self.__class__.__name__ + " " + SectionExt.__str__(self),
@@ -109,12 +125,12 @@ ISO14496_10_H264    = 0x1b
 
 class PmtStream:
     "Stream in PMT"
+    __slots__ = ('stream_type', 'pid', 'es_info_length', 'descriptors')
     def __init__(self, buf, i):
         self.stream_type = buf[i]
         self.pid = ((buf[i+1] & 0x1f) << 8) | buf[i+2]
         self.es_info_length = ((buf[i+3] & 0xf) << 8) | buf[i+4]
-        descriptor_buf = buf[i+5:i+self.es_info_length + 5]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, i+5, self.es_info_length)
 
     def __str__(self):
         return "stream_type:0x%02x pid:0x%04x" % (
@@ -122,11 +138,13 @@ class PmtStream:
 
 class PmtSection(SectionExt):
     "Program Map Table"
+    __slots__ = ('program_number', 'pcr_pid', 'program_info_length',
+                 'descriptors', 'streams')
     def __init__(self, buf):
         self.program_number = 0
         self.pcr_pid = 0
         self.program_info_length = 0
-        self.descriptors = []
+        self.descriptors = DescriptorLoop(b"")
         self.streams = []
         SectionExt.__init__(self, buf)
         if (self.table_id == -1):
@@ -138,8 +156,7 @@ class PmtSection(SectionExt):
         self.pcr_pid = ((buf[8] & 0x1f) << 8) | buf[9]
         self.program_info_length = ((buf[10] & 0xf) << 8) | buf[11]
         i = 12 + self.program_info_length
-        descriptor_buf = buf[12:i]
-        self.descriptors = DescriptorLoop(descriptor_buf)
+        self.descriptors = DescriptorLoop(buf, 12, self.program_info_length)
         self.streams = []
         while (i < (self.length - 1)):
             stream = PmtStream(buf, i)
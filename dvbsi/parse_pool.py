@@ -0,0 +1,221 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""Pool of worker processes parsing sections
+
+ParsePool hands raw sections to worker processes, which parse and decode
+them and send back compact records made of plain tuples, ints and bytes,
+cheap to unpickle. The records come back through one pipe: register
+fileno() on a poll loop and call collect() when it is readable. The
+callbacks given to submit() are called in the order of submission, so
+whatever the callbacks keep stays deterministic however the work is
+spread over the workers.
+
+    pool = ParsePool(eit_event_records)
+    pool.submit(raw, on_records, section)
+    ...
+    pool.collect()      # calls on_records(records, section)
+"""
+
+import os
+import select
+import time
+import multiprocessing
+
+from .dvb_types import parse_start_duration
+
+
+def eit_event_records(raw):
+    '''parses raw EIT section by SECTION_MAP and decodes it.
+
+    returns tuple of the events as (event_id, start_time, end_time,
+    running_status, free_ca_mode, descriptors), or None if raw is not
+    valid. start_time and end_time are unix time; descriptors is the bytes
+    of the descriptor loop, for DescriptorLoop(descriptors). Plain tuples
+    are used as they unpickle several times faster than namedtuples.'''
+    from . import SECTION_MAP
+    parser = SECTION_MAP.get(raw[0])
+    if (parser is None):
+        return None
+    section = parser(raw)
+    if (section.table_id == -1):
+        return None
+    section.decode()
+    records = []
+    i = 14
+    for event in section.events:
+        start_time, end_time = parse_start_duration(raw, i + 2)
+        end = i + 12 + event.descriptors_loop_length
+        records.append((event.event_id, start_time, end_time,
+                        event.running_status, event.free_ca_mode,
+                        raw[i+12:end]))
+        i = end
+    return tuple(records)
+
+
+def _work(func, tasks, results, lock):
+    'main loop of a worker process'
+    while True:
+        task = tasks.get()
+        if (task is None):
+            break
+        seq, raws = task
+        batch = []
+        for raw in raws:
+            try:
+                batch.append(func(raw))
+            except Exception:
+                batch.append(None)
+        with lock:
+            results.send((seq, batch))
+
+
+class ParsePool:
+    '''Worker processes running func on raw sections.
+
+    func is called as func(raw) in a worker; it must be a function of a
+    module, e.g. eit_event_records, and return something picklable. A
+    section func fails on gives None. num_workers is the number of CPUs
+    less one if not given.
+
+    Sections go to the workers in batches, as sending one costs more than
+    parsing it: a section submitted while a worker is idle is sent at
+    once, and the sections submitted while all workers are busy are sent
+    together, up to batch_size, when a worker is done.'''
+    def __init__(self, func=eit_event_records, num_workers=None,
+                 batch_size=256):
+        if (num_workers is None):
+            num_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        self.tasks = multiprocessing.Queue()
+        self.reader, writer = multiprocessing.Pipe(False)
+        lock = multiprocessing.Lock()
+        self.workers = []
+        for n in range(num_workers):
+            worker = multiprocessing.Process(target=_work,
+                                             args=(func, self.tasks, writer,
+                                                   lock),
+                                             daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        writer.close()
+        # Connection.poll() sets up a selector on every call
+        self.ready = select.poll()
+        self.ready.register(self.reader.fileno(), select.POLLIN)
+        self.next_seq = 0       # sequence number of the next submit()
+        self.next_done = 0      # sequence number of the next callback
+        self.batch = []         # sections not sent yet
+        self.batch_seq = 0      # sequence number of batch[0]
+        self.num_busy = 0       # batches sent and not back
+        self.callbacks = {}
+        self.done = {}          # results come back out of order
+        self.num_submitted = 0
+        self.num_collected = 0
+
+    def fileno(self):
+        'returns the fd to poll for results'
+        return self.reader.fileno()
+
+    def get_num_pending(self):
+        'returns number of sections submitted whose callback is not called'
+        return len(self.callbacks)
+
+    def submit(self, raw, callback, *args):
+        '''sends raw section to a worker. callback(result, *args) is called
+        by collect() when the result is back'''
+        seq = self.next_seq
+        self.next_seq += 1
+        self.callbacks[seq] = (callback, args)
+        if (len(self.batch) == 0):
+            self.batch_seq = seq
+        self.batch.append(bytes(raw))
+        self.num_submitted += 1
+        if (self.num_busy < len(self.workers) or
+            len(self.batch) >= self.batch_size):
+            self.flush()
+        return seq
+
+    def flush(self):
+        'sends the sections not sent yet'
+        if (len(self.batch) == 0):
+            return
+        self.tasks.put((self.batch_seq, self.batch))
+        self.batch = []
+        self.num_busy += 1
+
+    def collect(self, timeout=0):
+        '''receives the results ready, waiting up to timeout seconds for
+        the first one, and calls the callbacks of the results whose
+        predecessors are all back. returns number of callbacks called'''
+        if (timeout is not None):
+            timeout *= 1000
+        if (self.ready.poll(timeout)):
+            recv = self.reader.recv
+            poll = self.ready.poll
+            while True:
+                seq, batch = recv()
+                self.num_busy -= 1
+                for result in batch:
+                    self.done[seq] = result
+                    seq += 1
+                if (not poll(0)):
+                    break
+            self.flush()
+        num = 0
+        while (self.next_done in self.done):
+            seq = self.next_done
+            self.next_done += 1
+            result = self.done.pop(seq)
+            callback, args = self.callbacks.pop(seq)
+            self.num_collected += 1
+            num += 1
+            callback(result, *args)
+        return num
+
+    def wait(self, timeout=None):
+        '''collects until every submitted section is called back.
+        returns False if timeout seconds passed before that'''
+        self.flush()
+        if (timeout is not None):
+            deadline = time.monotonic() + timeout
+        while (len(self.callbacks)):
+            if (timeout is None):
+                self.collect(None)
+                continue
+            left = deadline - time.monotonic()
+            if (left <= 0):
+                return False
+            self.collect(left)
+        return True
+
+    def close(self):
+        'stops the workers. results not collected are dropped'
+        for worker in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join(1)
+            if (worker.is_alive()):
+                worker.terminate()
+        self.workers = []
+        self.tasks.close()
+        self.reader.close()
+        self.batch = []
+        self.callbacks = {}
+        self.done = {}
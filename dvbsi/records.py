@@ -0,0 +1,79 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""Fixed-size record loops
+
+Loops such as the programs of a PAT, the services of a service list
+descriptor or the entries of a logical channel descriptor are arrays of
+records of the same size. fixed_records() cuts such a loop out of a buffer
+so that it can be decoded with struct.Struct.iter_unpack(), and
+uint8_array()/uint16_array() extract one field of every record into an
+array by slicing, without a Python loop over the records."""
+
+import sys
+from array import array
+
+
+_MASK_TABLES = {}
+
+def _mask_table(mask, shift):
+    key = (mask, shift)
+    table = _MASK_TABLES.get(key)
+    if (table is None):
+        table = bytes([(x >> shift) & mask for x in range(256)])
+        _MASK_TABLES[key] = table
+    return table
+
+
+def fixed_records(buf, offset, length, size):
+    '''returns memoryview of the whole size byte records
+    in buf[offset:offset+length]. A truncated last record is dropped.'''
+    length = min(length, len(buf) - offset)
+    length -= length % size
+    if (length <= 0):
+        return memoryview(b"")
+    return memoryview(buf)[offset:offset+length]
+
+
+def uint8_array(records, size, pos, mask=0xff, shift=0):
+    '''returns array('B') of (byte >> shift) & mask
+    where byte is at pos of each size byte record'''
+    col = bytes(records[pos::size])
+    if (mask != 0xff or shift != 0):
+        col = col.translate(_mask_table(mask, shift))
+    return array('B', col)
+
+
+def uint16_array(records, size, pos, mask=0xffff):
+    '''returns array('H') of big-endian 16 bit field & mask
+    where field is at pos of each size byte record'''
+    hi = bytes(records[pos::size])
+    lo = bytes(records[pos+1::size])
+    if (mask & 0xff00 != 0xff00):
+        hi = hi.translate(_mask_table(mask >> 8, 0))
+    if (mask & 0xff != 0xff):
+        lo = lo.translate(_mask_table(mask & 0xff, 0))
+    col = bytearray(2 * len(hi))
+    col[0::2] = hi
+    col[1::2] = lo
+    values = array('H', col)
+    if (sys.byteorder == 'little'):
+        values.byteswap()
+    return values
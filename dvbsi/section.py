@@ -18,8 +18,19 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 #
 
+from collections import namedtuple
+
+from .crc32 import crc32
+
+
 class Section:
-    """Generic section header."""
+    """Generic section header.
+
+    buf may be bytes or memoryview. Sections and the objects decoded from them
+    keep offsets into buf instead of copies of it, so a section made from a
+    memoryview of the read buffer is parsed without copying any bytes."""
+    __slots__ = ('table_id', 'syntax_indicator', 'private_indicator', 'length',
+                 'data')
     def __init__(self, buf):
         self.table_id = -1
         self.syntax_indicator = 0
@@ -47,8 +58,14 @@ class Section:
     def decode(self):
         pass
 
+    def tobytes(self):
+        """Returns a copy of the section as bytes."""
+        return bytes(self.data)
+
 class SectionExt(Section):
     """Generic extended section header class."""
+    __slots__ = ('table_id_ext', 'version_number', 'current_next_indicator',
+                 'section_number', 'last_section_number', 'crc_32')
     def __init__(self, buf):
         self.table_id_ext = 0
         self.version_number = 0
@@ -82,3 +99,33 @@ class SectionExt(Section):
                         self.version_number, self.current_next_indicator,
                         self.section_number, self.last_section_number)))
 
+    def verify_crc(self):
+        """Returns True if CRC32 over the whole section is valid."""
+        if (self.table_id == -1):
+            return False
+        return crc32(self.data) == 0
+
+
+SectionHeader = namedtuple('SectionHeader',
+        ['table_id', 'table_id_ext', 'version_number', 'current_next_indicator',
+         'section_number', 'last_section_number', 'crc_32', 'data'])
+
+def peek_header(buf):
+    """Read the header of an extended section without parsing it.
+
+    Returns SectionHeader, or None if buf is not a valid extended section.
+    data of SectionHeader is buf itself."""
+    buf_len = len(buf)
+    if (buf_len < 8):
+        return None
+    if ((buf[1] & 0x80) == 0):
+        return None
+    if ((((buf[1] & 0xf) << 8) | buf[2]) + 3 != buf_len):
+        return None
+    if (buf[6] > buf[7]):
+        return None
+    return SectionHeader(buf[0], (buf[3] << 8) | buf[4],
+                         (buf[5] >> 1) & 0x1f, buf[5] & 1, buf[6], buf[7],
+                         (buf[-4] << 24) | (buf[-3] << 16) |
+                         (buf[-2] << 8) | buf[-1],
+                         buf)
@@ -0,0 +1,183 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""Append-only log of sections
+
+SectionLog keeps the raw sections saved by the containers in a file, so
+that a process started again can restore() them into empty containers
+and go on with the sections it knew: the carousel then only brings
+sections of new versions, and the tables are complete as soon as they
+were before. Each record is the raw section after a header of its
+table_id, table_id_extension, version_number, section_number and
+CRC_32, so records can be looked over without parsing the sections.
+The log grows with every append(); compact() rewrites it with the
+sections the containers have now.
+
+    log = SectionLog("eit.slog")
+    log.restore({table_id: table})
+    ...
+    log.append(section.data)
+"""
+
+import os
+import struct
+
+from .section import peek_header
+
+
+# magic, version
+_HEADER = struct.Struct("<4sI")
+# table_id, table_id_ext, version_number, section_number, crc_32, length
+_RECORD = struct.Struct("<BHBBIH")
+_MAGIC = b"SLOG"
+_VERSION = 1
+
+
+class SectionLog:
+    '''Append-only file of raw sections.
+
+    A record torn by a crash at the end of the file is dropped when the
+    file is opened; a file which is not a section log is started over.'''
+    def __init__(self, path):
+        self.path = path
+        self.num_appended = 0
+        self.file = None
+        self.open()
+
+    def open(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        end = self.scan(data)
+        self.file = open(self.path, "r+b" if end else "wb")
+        if (end == 0):
+            self.file.write(_HEADER.pack(_MAGIC, _VERSION))
+        else:
+            self.file.truncate(end)
+            self.file.seek(end)
+
+    def close(self):
+        if (self.file is not None):
+            self.file.close()
+            self.file = None
+
+    def flush(self):
+        self.file.flush()
+
+    def scan(self, data):
+        '''returns the length of the whole records at the start of data,
+        0 if data is not a section log'''
+        if (len(data) < _HEADER.size):
+            return 0
+        magic, version = _HEADER.unpack_from(data)
+        if (magic != _MAGIC or version != _VERSION):
+            return 0
+        end = _HEADER.size
+        for record in self.iter_records(data):
+            end = record[0]
+        return end
+
+    def iter_records(self, data):
+        '''yields (end, table_id, table_id_ext, version_number,
+        section_number, crc_32, raw) of the records of data'''
+        i = _HEADER.size
+        size = len(data)
+        record_size = _RECORD.size
+        while (i + record_size <= size):
+            (table_id, table_id_ext, version_number, section_number, crc_32,
+             length) = _RECORD.unpack_from(data, i)
+            i += record_size
+            if (i + length > size):
+                return
+            raw = data[i:i + length]
+            i += length
+            yield (i, table_id, table_id_ext, version_number, section_number,
+                   crc_32, raw)
+
+    def records(self):
+        '''yields (table_id, table_id_ext, version_number, section_number,
+        crc_32, raw) of every record, oldest first'''
+        self.file.flush()
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for record in self.iter_records(data):
+            yield record[1:]
+
+    def append(self, raw):
+        'appends raw section'
+        header = peek_header(raw)
+        if (header is None):
+            record = _RECORD.pack(raw[0], 0, 0, 0, 0, len(raw))
+        else:
+            record = _RECORD.pack(header.table_id, header.table_id_ext,
+                                  header.version_number,
+                                  header.section_number, header.crc_32,
+                                  len(raw))
+        self.file.write(record + bytes(raw))
+        self.num_appended += 1
+
+    def restore(self, containers, decode=True):
+        '''saves the sections of the log into containers, a dict of
+        table_id to the container taking the sections of it, as the filters
+        of a collector hand them out. returns number of sections saved as
+        new'''
+        from . import SECTION_MAP
+        num = 0
+        for record in self.records():
+            raw = record[-1]
+            container = containers.get(raw[0])
+            if (container is None):
+                continue
+            header = peek_header(raw)
+            if (header is not None and container.test_header(header) == 0):
+                # already known, e.g. appended again after a restart
+                continue
+            parser = SECTION_MAP.get(raw[0])
+            if (parser is None):
+                continue
+            section = parser(raw)
+            if (section.table_id == -1):
+                continue
+            if (decode):
+                section.decode()
+            if (container.save(section) > 0):
+                num += 1
+        return num
+
+    def compact(self, containers):
+        '''rewrites the log with only the sections containers, a dict as of
+        restore(), have now. returns number of sections written'''
+        num = 0
+        tmp_path = self.path + ".tmp"
+        self.close()
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION))
+            self.file = f
+            # a container may take several table_ids
+            for container in dict.fromkeys(containers.values()):
+                for section in container.get_sections():
+                    self.append(section.data)
+                    num += 1
+        os.replace(tmp_path, self.path)
+        self.file = None
+        self.open()
+        return num
@@ -0,0 +1,335 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""Section demultiplexer for transport streams
+
+TsDemux does in user space what the section filters of a demux device do:
+it takes 188 byte TS packets from a file, a pipe or a socket, checks the
+continuity counter of each PID, reassembles the PSI/SI sections carried by
+the packets and hands every section to the SectionFilters which match it.
+A SectionFilter is set up with the same arguments as Demux.set_filter() of
+nav, so a recorded capture can be processed at disk speed without a dvr
+device.
+
+    demux = TsDemux()
+    flt = demux.open_filter()
+    flt.set_filter(0x12, [0x4e], [0xff], None, 0, DMX_IMMEDIATE_START)
+    for section_filter, section in demux.sections(open("cap.ts", "rb")):
+        ...
+"""
+
+import os
+from collections import deque
+
+from .crc32 import crc32
+
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+TS_NULL_PID = 0x1fff
+
+DMX_FILTER_SIZE = 16
+
+# flags of set_filter(), same values as linux/dvb/dmx.h
+DMX_CHECK_CRC = 1
+DMX_ONESHOT = 2
+DMX_IMMEDIATE_START = 4
+
+
+class SectionFilter:
+    '''Section filter of TsDemux.
+
+    set_filter(), start(), stop() and read() behave like those of the Demux
+    of nav. As on the demux device, byte 0 of the filter applies to
+    table_id and byte n (n > 0) of the filter applies to byte n + 2 of the
+    section, skipping section_length. A mode bit of 1 asks the masked bit
+    to differ; a section passes when every bit with mode 0 matches and, if
+    there is any bit with mode 1, at least one of those differs.'''
+    __slots__ = ('demux', 'pid', 'flags', 'running', 'queue', 'tests',
+                 'negative')
+    def __init__(self, demux):
+        self.demux = demux
+        self.pid = -1
+        self.flags = 0
+        self.running = False
+        self.queue = deque()
+        self.tests = []
+        self.negative = False
+
+    def set_filter(self, pid, _filter, mask, mode, timeout, flags):
+        """Set up a filter according to the _filter and mask arguments.
+
+        timeout is accepted for compatibility with Demux and ignored:
+        a stream read from a file has no clock to time out against."""
+        if (len(_filter) != len(mask) or len(_filter) > DMX_FILTER_SIZE):
+            raise IOError()
+        if (mode is not None and len(mode) != len(_filter)):
+            raise IOError()
+        self.stop()
+        self.pid = pid
+        self.flags = flags
+        self.tests = []
+        self.negative = False
+        for i in range(len(_filter)):
+            if (mask[i] == 0):
+                continue
+            if (mode is None):
+                m = 0
+            else:
+                m = mode[i] & mask[i]
+            if (m):
+                self.negative = True
+            if (i == 0):
+                pos = 0
+            else:
+                pos = i + 2
+            self.tests.append((pos, _filter[i] & mask[i], mask[i], m))
+        self.queue.clear()
+        if (flags & DMX_IMMEDIATE_START):
+            self.start()
+
+    def start(self):
+        """Start the filtering operation defined via set_filter."""
+        if (self.running or self.pid < 0):
+            return
+        self.running = True
+        self.demux.add_filter(self)
+
+    def stop(self):
+        """Stop the filtering operation defined via set_filter."""
+        if (not self.running):
+            return
+        self.running = False
+        self.demux.remove_filter(self)
+
+    def match(self, section):
+        'returns True if section passes this filter'
+        length = len(section)
+        differ = False
+        for pos, value, mask, mode in self.tests:
+            if (pos >= length):
+                return False
+            x = (section[pos] ^ value) & mask
+            if (x & ~mode):
+                return False
+            if (x & mode):
+                differ = True
+        if (self.negative and not differ):
+            return False
+        if (self.flags & DMX_CHECK_CRC and section[1] & 0x80):
+            if (crc32(section) != 0):
+                return False
+        return True
+
+    def read(self):
+        'returns the oldest section received, or None'
+        if (len(self.queue) == 0):
+            return None
+        return self.queue.popleft()
+
+
+class _PidState:
+    "reassembly state of a PID"
+    __slots__ = ('cc', 'buf', 'filters')
+    def __init__(self):
+        self.cc = -1
+        self.buf = None     # bytearray of the section being reassembled
+        self.filters = []
+
+
+class TsDemux:
+    '''Demultiplexes sections out of a transport stream.
+
+    Feed TS data with feed(), in chunks of any size, and read the sections
+    from the SectionFilters, or let sections() pull data out of a file, a
+    pipe or a socket and yield (filter, section) as the sections complete.
+    Packets of PIDs without a running filter are skipped.'''
+    def __init__(self):
+        self.pids = {}
+        self.rest = b""
+        self.pending = None     # filters with a new section, for sections()
+        self.num_packets = 0
+        self.num_cc_errors = 0
+        self.num_sections = 0
+        self.num_sync_losses = 0
+
+    def open_filter(self):
+        'returns a new SectionFilter on this demux'
+        return SectionFilter(self)
+
+    def add_filter(self, section_filter):
+        state = self.pids.get(section_filter.pid)
+        if (state is None):
+            state = _PidState()
+            self.pids[section_filter.pid] = state
+        state.filters.append(section_filter)
+
+    def remove_filter(self, section_filter):
+        state = self.pids.get(section_filter.pid)
+        if (state is None):
+            return
+        if (section_filter in state.filters):
+            state.filters.remove(section_filter)
+        if (len(state.filters) == 0):
+            del self.pids[section_filter.pid]
+
+    def get_stats(self):
+        'returns (packets, cc errors, sections, sync losses)'
+        return (self.num_packets, self.num_cc_errors, self.num_sections,
+                self.num_sync_losses)
+
+    def reset(self, pids=None):
+        '''forgets partial packets and sections, e.g. after seeking the input.
+        with pids, forgets only the sections being reassembled on them,
+        e.g. after packets of the PIDs were lost'''
+        if (pids is None):
+            self.rest = b""
+            states = self.pids.values()
+        else:
+            states = [self.pids[pid] for pid in pids if pid in self.pids]
+        for state in states:
+            state.cc = -1
+            state.buf = None
+
+    def feed(self, data):
+        '''demultiplexes TS data, which need not start or end
+        at a packet boundary. returns the number of sections delivered'''
+        if (not isinstance(data, (bytes, bytearray))):
+            data = bytes(data)
+        if (self.rest):
+            data = self.rest + data
+        num_sections = self.num_sections
+        size = len(data)
+        pids = self.pids
+        i = 0
+        while (i + TS_PACKET_SIZE <= size):
+            if (data[i] != TS_SYNC_BYTE):
+                j = data.find(b"\x47", i + 1)
+                self.num_sync_losses += 1
+                if (j < 0):
+                    i = size
+                    break
+                i = j
+                continue
+            self.num_packets += 1
+            pid = ((data[i+1] & 0x1f) << 8) | data[i+2]
+            state = pids.get(pid)
+            if (state is not None):
+                self.packet(state, data, i)
+            i += TS_PACKET_SIZE
+        self.rest = data[i:]
+        return self.num_sections - num_sections
+
+    def packet(self, state, data, i):
+        'processes the packet at data[i] of the PID of state'
+        b1 = data[i+1]
+        b3 = data[i+3]
+        if (b1 & 0x80):
+            # transport_error_indicator
+            state.buf = None
+            return
+        afc = (b3 >> 4) & 0x3
+        if ((afc & 0x1) == 0):
+            # no payload, continuity_counter does not change
+            return
+        cc = b3 & 0xf
+        start = i + 4
+        discontinuity = False
+        if (afc == 3):
+            af_length = data[start]
+            if (af_length > 0):
+                discontinuity = (data[start+1] & 0x80) != 0
+            start += 1 + af_length
+        if (state.cc >= 0 and not discontinuity):
+            if (cc == state.cc):
+                # duplicate packet
+                return
+            if (cc != (state.cc + 1) & 0xf):
+                self.num_cc_errors += 1
+                state.buf = None
+        state.cc = cc
+        end = i + TS_PACKET_SIZE
+        if (start >= end):
+            return
+        if (b1 & 0x40):
+            # payload_unit_start_indicator: pointer_field
+            pointer = data[start]
+            start += 1
+            if (state.buf is not None):
+                state.buf += data[start:min(start + pointer, end)]
+                self.take_sections(state, True)
+            state.buf = bytearray(data[start + pointer:end])
+        elif (state.buf is not None):
+            state.buf += data[start:end]
+        else:
+            return
+        self.take_sections(state, False)
+
+    def take_sections(self, state, last):
+        '''delivers the complete sections at the head of state.buf.
+        if last, whatever follows them is dropped'''
+        buf = state.buf
+        while (len(buf) >= 3):
+            if (buf[0] == 0xff):
+                # stuffing
+                buf = None
+                break
+            length = (((buf[1] & 0xf) << 8) | buf[2]) + 3
+            if (len(buf) < length):
+                break
+            self.deliver(state, bytes(buf[:length]))
+            del buf[:length]
+        if (last or (buf is not None and len(buf) == 0)):
+            buf = None
+        state.buf = buf
+
+    def deliver(self, state, section):
+        self.num_sections += 1
+        for section_filter in list(state.filters):
+            if (not section_filter.match(section)):
+                continue
+            section_filter.queue.append(section)
+            if (self.pending is not None):
+                self.pending.append(section_filter)
+            if (section_filter.flags & DMX_ONESHOT):
+                section_filter.stop()
+
+    def sections(self, f, chunk_size=TS_PACKET_SIZE * 1024):
+        '''reads f to the end and yields (filter, section) for every section
+        passing a filter. f is a file descriptor or an object with read(),
+        e.g. a file, or a socket wrapped by makefile("rb").'''
+        if (isinstance(f, int)):
+            read = lambda: os.read(f, chunk_size)
+        else:
+            read = lambda: f.read(chunk_size)
+        self.pending = deque()
+        try:
+            while True:
+                data = read()
+                if (not data):
+                    break
+                self.feed(data)
+                while (self.pending):
+                    section_filter = self.pending.popleft()
+                    section = section_filter.read()
+                    if (section is not None):
+                        yield section_filter, section
+        finally:
+            self.pending = None
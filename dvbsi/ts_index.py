@@ -0,0 +1,232 @@
+#
+# section and descriptor parser
+#
+# Copyright (c) 2008 by K. Uhm <kayzm0@gmail.com>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+#
+
+"""PID index of a TS file
+
+TsIndex memory-maps a recorded transport stream and makes, in one pass,
+the list of the offsets of the packets of every PID. The index is saved
+next to the file (name of the file + PID_INDEX_SUFFIX) and loaded instead
+of being rebuilt as long as the size and the mtime of the file do not
+change. feed() then hands only the packets of the PIDs a TsDemux is
+filtering to the demux, so the SI PIDs of a capture of many GB are read
+at disk speed, without touching the packets of audio and video.
+"""
+
+import os
+import sys
+import mmap
+import heapq
+import struct
+from array import array
+from bisect import bisect_left
+
+from .ts import TS_PACKET_SIZE, TS_SYNC_BYTE
+
+
+PID_INDEX_SUFFIX = ".pidx"
+
+# magic, version, size and mtime_ns of the TS file, number of PIDs
+_HEADER = struct.Struct("<4sIQQI")
+# pid, number of packets
+_PID_HEADER = struct.Struct("<HQ")
+_MAGIC = b"PIDX"
+_VERSION = 1
+
+# packets examined at a time while building the index
+_SCAN_PACKETS = 65536
+
+_PID_HI = bytes([x & 0x1f for x in range(256)])
+
+
+class TsIndex:
+    '''Memory-mapped TS file with the offsets of the packets of every PID.
+
+    offsets[pid] is array('Q') of the file offsets of the packets of pid
+    in ascending order.'''
+    def __init__(self, path, rebuild=False):
+        self.path = path
+        self.index_path = path + PID_INDEX_SUFFIX
+        self.file = open(path, "rb")
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        if (self.size == 0):
+            self.mm = b""
+        else:
+            self.mm = mmap.mmap(self.file.fileno(), 0,
+                                access=mmap.ACCESS_READ)
+        self.offsets = {}
+        if (rebuild or not self.load()):
+            self.build()
+            self.save()
+
+    def close(self):
+        if (self.mm):
+            self.mm.close()
+        self.mm = b""
+        self.file.close()
+
+    def get_pids(self):
+        'returns list of PIDs in the file'
+        return sorted(self.offsets.keys())
+
+    def get_num_packets(self, pid):
+        'returns number of packets of pid'
+        offsets = self.offsets.get(pid)
+        if (offsets is None):
+            return 0
+        return len(offsets)
+
+    def find_sync(self, i):
+        '''returns offset of the first packet at or after i:
+        a sync byte followed by another one a packet later'''
+        mm = self.mm
+        size = self.size
+        while True:
+            i = mm.find(b"\x47", i)
+            if (i < 0 or i + TS_PACKET_SIZE > size):
+                return size
+            if (i + TS_PACKET_SIZE == size or
+                mm[i + TS_PACKET_SIZE] == TS_SYNC_BYTE):
+                return i
+            i += 1
+
+    def build(self):
+        'scans the whole file and makes offsets'
+        mm = self.mm
+        size = self.size
+        offsets = {}
+        i = self.find_sync(0)
+        while (i + TS_PACKET_SIZE <= size):
+            num = min(_SCAN_PACKETS, (size - i) // TS_PACKET_SIZE)
+            end = i + num * TS_PACKET_SIZE
+            if (mm[i:end:TS_PACKET_SIZE].count(b"\x47") == num):
+                # all in sync: read the PIDs of num packets at once
+                hi = mm[i+1:end:TS_PACKET_SIZE].translate(_PID_HI)
+                lo = mm[i+2:end:TS_PACKET_SIZE]
+                offset = i
+                for pid_hi, pid_lo in zip(hi, lo):
+                    pid = (pid_hi << 8) | pid_lo
+                    pid_offsets = offsets.get(pid)
+                    if (pid_offsets is None):
+                        pid_offsets = array('Q')
+                        offsets[pid] = pid_offsets
+                    pid_offsets.append(offset)
+                    offset += TS_PACKET_SIZE
+                i = end
+                continue
+            # lost sync somewhere: go packet by packet up to end
+            while (i < end):
+                if (mm[i] != TS_SYNC_BYTE):
+                    i = self.find_sync(i + 1)
+                    break
+                pid = ((mm[i+1] & 0x1f) << 8) | mm[i+2]
+                pid_offsets = offsets.get(pid)
+                if (pid_offsets is None):
+                    pid_offsets = array('Q')
+                    offsets[pid] = pid_offsets
+                pid_offsets.append(i)
+                i += TS_PACKET_SIZE
+        self.offsets = offsets
+
+    def load(self):
+        'loads the saved index. returns False if it is missing or stale'
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if (len(data) < _HEADER.size):
+            return False
+        magic, version, size, mtime_ns, num_pids = _HEADER.unpack_from(data)
+        if (magic != _MAGIC or version != _VERSION or
+            size != self.size or mtime_ns != self.mtime_ns):
+            return False
+        offsets = {}
+        i = _HEADER.size
+        for n in range(num_pids):
+            if (i + _PID_HEADER.size > len(data)):
+                return False
+            pid, count = _PID_HEADER.unpack_from(data, i)
+            i += _PID_HEADER.size
+            pid_offsets = array('Q')
+            pid_offsets.frombytes(data[i:i + count * 8])
+            if (len(pid_offsets) != count):
+                return False
+            if (sys.byteorder != 'little'):
+                pid_offsets.byteswap()
+            offsets[pid] = pid_offsets
+            i += count * 8
+        self.offsets = offsets
+        return True
+
+    def save(self):
+        '''saves the index next to the file.
+        returns False if it can not be written'''
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, self.size,
+                                     self.mtime_ns, len(self.offsets)))
+                for pid in sorted(self.offsets.keys()):
+                    pid_offsets = self.offsets[pid]
+                    f.write(_PID_HEADER.pack(pid, len(pid_offsets)))
+                    if (sys.byteorder != 'little'):
+                        pid_offsets = array('Q', pid_offsets)
+                        pid_offsets.byteswap()
+                    f.write(pid_offsets.tobytes())
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            return False
+        return True
+
+    def get_offsets(self, pids, start=0, end=None):
+        '''returns offsets of the packets of pids in [start, end)
+        in file order'''
+        if (end is None):
+            end = self.size
+        lists = []
+        for pid in pids:
+            offsets = self.offsets.get(pid)
+            if (offsets is None):
+                continue
+            lo = bisect_left(offsets, start)
+            hi = bisect_left(offsets, end, lo)
+            if (lo < hi):
+                lists.append(offsets[lo:hi])
+        if (len(lists) == 0):
+            return []
+        if (len(lists) == 1):
+            return lists[0]
+        return list(heapq.merge(*lists))
+
+    def read_packets(self, pids, start=0, end=None):
+        'returns the packets of pids in [start, end) as one bytes'
+        mm = self.mm
+        return b"".join([mm[offset:offset + TS_PACKET_SIZE]
+                         for offset in self.get_offsets(pids, start, end)])
+
+    def feed(self, demux, start=0, end=None):
+        '''feeds demux with the packets in [start, end) of the PIDs
+        demux is filtering. returns the number of sections delivered'''
+        data = self.read_packets(list(demux.pids.keys()), start, end)
+        if (len(data) == 0):
+            return 0
+        return demux.feed(data)
@@ -0,0 +1,155 @@
+#! /usr/bin/env python3
+
+import asyncio
+import select
+import signal
+
+import poll_loop
+
+
+class AsyncioLoop:
+    '''PollLoop implementation on an asyncio event loop.
+
+    It has the register()/register_timer() interface of PollLoop, made of
+    loop.add_reader()/add_writer() and loop.call_later(), so collectors and
+    frontends run as they are inside an asyncio application, e.g. beside
+    HTTP and metrics servers. Call install() before anything makes a
+    PollLoop().
+
+    asyncio tells only that an fd is ready; the mode given to the callback
+    is read with a poll(0) of the fd, so that POLLERR of a demux timeout
+    reaches the collectors as with PollLoop.'''
+    def __init__(self, loop=None):
+        if (loop is None):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+        self.loop = loop
+        self.callbacks = {}
+        self.timers = {}
+        self.current_timer = None
+        self.timer_changed = False
+        self.resizer = None
+        self.stopped = False
+        self.running = False
+
+    def register_resizer(self, resizer):
+        self.resizer = resizer
+        self.loop.add_signal_handler(signal.SIGWINCH, resizer)
+
+    def register(self, fd, mode, callback, *args, **kwargs):
+        if (fd in self.callbacks):
+            self.unregister(fd)
+        probe = select.poll()
+        probe.register(fd, mode)
+        self.callbacks[fd] = (callback, args, kwargs, mode, probe)
+        if (mode & (poll_loop.POLLIN | poll_loop.POLLERR)):
+            self.loop.add_reader(fd, self.dispatch, fd)
+        if (mode & poll_loop.POLLOUT):
+            self.loop.add_writer(fd, self.dispatch, fd)
+        return fd
+
+    def unregister(self, fd):
+        handler = self.callbacks.pop(fd, None)
+        if (handler is None):
+            return
+        callback, args, kwargs, mode, probe = handler
+        if (mode & (poll_loop.POLLIN | poll_loop.POLLERR)):
+            self.loop.remove_reader(fd)
+        if (mode & poll_loop.POLLOUT):
+            self.loop.remove_writer(fd)
+
+    def dispatch(self, fd):
+        handler = self.callbacks.get(fd)
+        if (handler is None):
+            return
+        callback, args, kwargs, mode, probe = handler
+        ready = probe.poll(0)
+        if (len(ready) == 0):
+            return
+        callback(fd, ready[0][1], *args, **kwargs)
+
+    def set_monotonic(self, monotonic=True):
+        'the clock of asyncio is always monotonic'
+        pass
+
+    def register_timer(self, callback, after_msec, interval_msec,
+                       *args, **kwargs):
+        if (after_msec <= 0):
+            return
+        self.unregister_timer(callback)
+        handle = self.loop.call_later(after_msec / 1000, self.run_timer,
+                                      callback)
+        self.timers[callback] = (handle, interval_msec, args, kwargs)
+
+    def unregister_timer(self, callback):
+        if (callback == self.current_timer):
+            self.timer_changed = True
+        timer = self.timers.pop(callback, None)
+        if (timer is not None):
+            timer[0].cancel()
+
+    def run_timer(self, callback):
+        handle, interval_msec, args, kwargs = self.timers.pop(callback)
+        self.timer_changed = False
+        self.current_timer = callback
+        try:
+            callback(*args, **kwargs)
+        finally:
+            self.current_timer = None
+        if (self.timer_changed == False and interval_msec):
+            handle = self.loop.call_later(interval_msec / 1000,
+                                          self.run_timer, callback)
+            self.timers[callback] = (handle, interval_msec, args, kwargs)
+
+    def run(self):
+        '''runs the asyncio loop until stop(). If the loop is already
+        running, e.g. under asyncio.run(), it just returns'''
+        if (self.loop.is_running()):
+            return
+        self.stopped = False
+        self.running = True
+        try:
+            self.loop.run_forever()
+        finally:
+            self.running = False
+
+    def stop(self):
+        'stops the loop only if it was started by run()'
+        self.stopped = True
+        if (self.running):
+            self.loop.stop()
+
+
+def install(loop=None):
+    '''makes PollLoop() an AsyncioLoop on loop, the current event loop if
+    None. returns the AsyncioLoop'''
+    impl = AsyncioLoop(loop)
+    poll_loop.PollLoop.set_instance(impl)
+    return impl
+
+
+if __name__ == "__main__":
+    import os
+
+    async def main():
+        install(asyncio.get_running_loop())
+        poller = poll_loop.PollLoop()
+        r, w = os.pipe()
+
+        def on_pipe(fd, mode):
+            print("pipe:", os.read(fd, 100), mode)
+
+        def tick(name):
+            print("tick", name)
+            os.write(w, name.encode())
+
+        poller.register(r, poll_loop.POLLIN, on_pipe)
+        poller.register_timer(tick, 100, 300, "a")
+        await asyncio.sleep(1)
+        poller.unregister_timer(tick)
+        poller.unregister(r)
+
+    asyncio.run(main())
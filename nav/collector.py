@@ -1,12 +1,25 @@
 #! /usr/bin/env python3
 
+import asyncio
+import errno
+import time
 import poll_loop
-import os
 import dvbsi
-from demux import Demux
+import filter_manager
 import observer
 
 
+# sections read from a demux at most on a wakeup, so that a busy filter
+# does not starve the others
+READ_BUDGET = 64
+
+# period to evict the EIT schedule sections whose events are over
+EVICT_PAST_MSEC = 10 * 60 * 1000
+
+# seconds stop() waits for the records of the sections in the parse pool
+PARSE_POOL_WAIT_SEC = 1
+
+
 class Collector(observer.Observable):
     def __init__(self):
         observer.Observable.__init__(self)
@@ -14,11 +27,121 @@ class Collector(observer.Observable):
         self.poller = poll_loop.PollLoop()
         self.card = 0
         self.dev = 0
+        self.ts_source = None
+        self.section_log = None
+        self.read_budget = READ_BUDGET
+        self.demuxes = set()
+        self.waiters = []       # (table, asyncio.Queue) of sections()
+        self.reset_stats()
 
     def set_demux_dev(self, card, dev):
         self.card = card
         self.dev = dev
 
+    def set_ts_source(self, ts_source):
+        '''takes sections from ts_source, e.g. offline.OfflineSource,
+        instead of the demux device. None goes back to the device.'''
+        self.ts_source = ts_source
+
+    def set_section_log(self, section_log):
+        '''appends the new sections of the tables to section_log,
+        dvbsi.SectionLog, from now on. None stops it'''
+        self.section_log = section_log
+
+    def get_tables(self):
+        '''returns dict of table_id to the table of the collector the
+        sections of it are saved into'''
+        return {}
+
+    def restore(self, section_log):
+        '''saves the sections of section_log into the tables, e.g. after a
+        restart, without notifying the observers. returns number of
+        sections restored'''
+        return section_log.restore(self.get_tables())
+
+    def open_demux(self):
+        '''returns a demux on a filter of the device shared with the other
+        tables of the PID, of every collector, or of ts_source if set'''
+        if (self.ts_source is not None):
+            return self.ts_source.open_demux()
+        return filter_manager.get_manager(self.card, self.dev).open_demux()
+
+    def register_demux(self, demux, callback, *args):
+        self.demuxes.add(demux)
+        demux.source.register(demux, callback, *args)
+
+    def unregister_demux(self, demux):
+        self.demuxes.discard(demux)
+        demux.source.unregister(demux)
+
+    def wake_waiters(self, table, section):
+        '''hands section of table to sections(). None ends them'''
+        for waiter_table, queue in self.waiters:
+            if (waiter_table is table):
+                queue.put_nowait(section)
+
+    async def sections(self, table):
+        '''yields the sections of table received from now on which are new
+        or of a new version, for a collector on aio_loop.AsyncioLoop:
+
+            async for section in si_collector.sections(si_collector.sdt_act):
+                ...
+
+        It ends when the table stops being received: by stop(),
+        stop_table() or a timeout of the filter of SiCollector.'''
+        queue = asyncio.Queue()
+        waiter = (table, queue)
+        self.waiters.append(waiter)
+        try:
+            while True:
+                section = await queue.get()
+                if (section is None):
+                    return
+                yield section
+        finally:
+            self.waiters.remove(waiter)
+
+    def reset_stats(self):
+        self.stats_time = time.time()
+        self.num_wakeups = 0
+        self.num_sections_read = 0
+        self.num_sections_new = 0
+        self.num_overflows = 0
+
+    def get_stats(self):
+        '''returns tuple of (wakeups, sections read, new sections, overflows,
+        sections read per second) since reset_stats()'''
+        elapsed = time.time() - self.stats_time
+        if (elapsed > 0):
+            rate = self.num_sections_read / elapsed
+        else:
+            rate = 0.0
+        return (self.num_wakeups, self.num_sections_read,
+                self.num_sections_new, self.num_overflows, rate)
+
+    def read_sections(self, demux):
+        '''reads the sections waiting on demux until EAGAIN, but not more
+        than read_budget. returns list of raw sections'''
+        raws = []
+        budget = self.read_budget
+        self.num_wakeups += 1
+        while (len(raws) < budget):
+            try:
+                raw = demux.read()
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if (e.errno == errno.EOVERFLOW):
+                    # the driver dropped sections and flushed its buffer
+                    self.num_overflows += 1
+                    continue
+                break
+            if (not raw):
+                break
+            raws.append(raw)
+        self.num_sections_read += len(raws)
+        return raws
+
 
 class SiCollector(Collector):
     '''collects PSI/SI (service information; defined by ISO and ETSI) data.
@@ -46,19 +169,32 @@ class SiCollector(Collector):
         Collector.__init__(self)
 
         # initialize tables
-        self.pat = dvbsi.Table(dvbsi.STAG_PROGRAM_ASSOCIATION)
-        self.pmt = dvbsi.Table(dvbsi.STAG_PROGRAM_MAP)
-        self.bat = dvbsi.Table(dvbsi.STAG_BOUQUET_ASSOCIATION)
-        self.nit_act = dvbsi.Table(dvbsi.STAG_NETWORK_INFORMATION_ACTUAL)
-        self.nit_oth = dvbsi.Table(dvbsi.STAG_NETWORK_INFORMATION_OTHER)
-        self.sdt_act = dvbsi.TableSdt(dvbsi.STAG_SERVICE_DESCRIPTION_ACTUAL)
-        self.sdt_oth = dvbsi.TableSdt(dvbsi.STAG_SERVICE_DESCRIPTION_OTHER)
+        self.pat = dvbsi.Table(dvbsi.STAG_PROGRAM_ASSOCIATION, True)
+        self.pmt = dvbsi.Table(dvbsi.STAG_PROGRAM_MAP, True)
+        self.bat = dvbsi.Table(dvbsi.STAG_BOUQUET_ASSOCIATION, True)
+        self.nit_act = dvbsi.Table(dvbsi.STAG_NETWORK_INFORMATION_ACTUAL,
+                                   True)
+        self.nit_oth = dvbsi.Table(dvbsi.STAG_NETWORK_INFORMATION_OTHER,
+                                   True)
+        self.sdt_act = dvbsi.TableSdt(dvbsi.STAG_SERVICE_DESCRIPTION_ACTUAL,
+                                      True)
+        self.sdt_oth = dvbsi.TableSdt(dvbsi.STAG_SERVICE_DESCRIPTION_OTHER,
+                                      True)
         self.active_tables = []
         self.reset()
 
         self.tdt_demux = None
         self.tot_demux = None
 
+    def get_tables(self):
+        return {dvbsi.STAG_PROGRAM_ASSOCIATION: self.pat,
+                dvbsi.STAG_PROGRAM_MAP: self.pmt,
+                dvbsi.STAG_BOUQUET_ASSOCIATION: self.bat,
+                dvbsi.STAG_NETWORK_INFORMATION_ACTUAL: self.nit_act,
+                dvbsi.STAG_NETWORK_INFORMATION_OTHER: self.nit_oth,
+                dvbsi.STAG_SERVICE_DESCRIPTION_ACTUAL: self.sdt_act,
+                dvbsi.STAG_SERVICE_DESCRIPTION_OTHER: self.sdt_oth}
+
     def reset(self):
         self.pat.reset()
         self.pmt.reset()
@@ -105,29 +241,32 @@ class SiCollector(Collector):
             self.notify_observers(dvbsi.ERROR_ON_PARSING, None, None, None)
             return -1
 
-        try:
-            raw = os.read(fd, 4096)
-        except:
-            return
-        section = parser(raw)
-        if (section.table_id == -1):
-            self.notify_observers(dvbsi.ERROR_ON_PARSING, section, None, None)
-            return -1
+        for raw in self.read_sections(demux):
+            section = parser(raw)
+            if (section.table_id == -1):
+                self.notify_observers(dvbsi.ERROR_ON_PARSING,
+                                      section, None, None)
+                continue
 
-        section.decode()
+            section.decode()
+            self.num_sections_new += 1
 
-        if (table_id == dvbsi.STAG_TIME_DATE):
-            self.tdt_section = section
-        elif (table_id == dvbsi.STAG_TIME_OFFSET):
-            self.tot_section = section
+            if (table_id == dvbsi.STAG_TIME_DATE):
+                self.tdt_section = section
+            elif (table_id == dvbsi.STAG_TIME_OFFSET):
+                self.tot_section = section
 
-        # notify
-        self.notify_observers(dvbsi.NEW_SECTION, section, None, None)
+            # notify
+            self.notify_observers(dvbsi.NEW_SECTION, section, None, None)
+            if (demux not in self.demuxes):
+                # stopped by an observer
+                break
 
     def process_section(self, fd, mode, demux, table):
         if (mode & poll_loop.POLLERR):
             demux.stop()
             self.notify_observers(dvbsi.RECEIVING_TIMED_OUT, None, None, table)
+            self.wake_waiters(table, None)
             return -1
 
         # find out parser
@@ -138,23 +277,30 @@ class SiCollector(Collector):
             self.notify_observers_warning(None, string)
             return -1
 
-        try:
-            raw = os.read(fd, 4096)
-        except:
-            return
-        section = parser(raw)
-        if (section.table_id == -1):
-            self.notify_observers(dvbsi.ERROR_ON_PARSING, section, None, None)
-            return -1
+        for result, section in table.save_raw_sections(
+                self.read_sections(demux), parser):
+            self.process_saved_section(result, section, table)
+            if (demux not in self.demuxes):
+                # stopped by an observer
+                break
 
-        # find out key & sub_table
-        result = table.save(section)
+    def process_saved_section(self, result, section, table):
+        if (result == dvbsi.ERROR_ON_PARSING):
+            self.notify_observers(result, section, None, None)
+            return -1
+        if (result == dvbsi.ERROR_ON_CRC):
+            self.notify_observers(result, section, None, table)
+            return -1
         if ((result & (dvbsi.NEW_SECTION | dvbsi.VERSION_CHANGED)) is 0):
             # this section is already received. just return...
             return 0
+        self.num_sections_new += 1
+        if (self.section_log is not None):
+            self.section_log.append(section.data)
 
         section.decode()
 
+        table_id = table.table_id
         if (table_id == dvbsi.STAG_PROGRAM_ASSOCIATION):
             if (section.transport_stream_id != self.actual_tsid):
                 if (self.actual_tsid != 0):
@@ -193,6 +339,7 @@ class SiCollector(Collector):
         sub_table = table.get_sub_table(key)
 
         self.notify_observers(result, section, sub_table, table)
+        self.wake_waiters(table, section)
 
     def on_complete_pat(self):
         sections = self.pat.get_sections()
@@ -229,17 +376,18 @@ class SiCollector(Collector):
         for table in self.active_tables:
             if (hasattr(table, 'demux')):
                 table.demux.stop()
-                self.poller.unregister(table.demux.fileno())
+                self.unregister_demux(table.demux)
                 del(table.demux)
+            self.wake_waiters(table, None)
         self.active_tables = []
 
         if (self.tdt_demux):
             self.tdt_demux.stop()
-            self.poller.unregister(self.tdt_demux.fileno())
+            self.unregister_demux(self.tdt_demux)
             self.tdt_demux = None
         if (self.tot_demux):
             self.tot_demux.stop()
-            self.poller.unregister(self.tot_demux.fileno())
+            self.unregister_demux(self.tot_demux)
             self.tot_demux = None
 
     def stop_table(self, table):
@@ -249,17 +397,15 @@ class SiCollector(Collector):
             return
         if (hasattr(table, 'demux')):
             table.demux.stop()
-            self.poller.unregister(table.demux.fileno())
+            self.unregister_demux(table.demux)
             del(table.demux)
+        self.wake_waiters(table, None)
 
     def start_table(self, table, pid, timeout, flags=0):
-        demux = Demux(self.card, self.dev)
+        demux = self.open_demux()
         demux.set_filter(pid, [table.table_id], [0xff], None, timeout, flags)
         demux.start()
-        self.poller.register(demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_section,
-                             demux, table)
+        self.register_demux(demux, self.process_section, table)
         self.active_tables.append(table)
         table.demux = demux
 
@@ -270,7 +416,7 @@ class SiCollector(Collector):
     def start_pmt(self, pid, timeout=0):
         if (hasattr(self.pmt, 'demux')):
             self.pmt.demux.stop()
-            self.poller.unregister(self.pmt.demux.fileno())
+            self.unregister_demux(self.pmt.demux)
             del(self.pmt.demux)
         self.pmt.reset()
         self.start_table(self.pmt, pid, timeout)
@@ -307,30 +453,26 @@ class SiCollector(Collector):
     def start_tdt(self, timeout=0, pid=dvbsi.TRANSPORT_TDT_PID):
         if (self.tdt_demux):
             self.tdt_demux.stop()
-            self.poller.unregister(self.tdt_demux.fileno())
+            self.unregister_demux(self.tdt_demux)
             self.tdt_demux = None
-        self.tdt_demux = Demux(self.card, self.dev)
+        self.tdt_demux = self.open_demux()
         self.tdt_demux.set_filter(pid, [dvbsi.STAG_TIME_DATE],
                                   [0xff], None, timeout, 0)
         self.tdt_demux.start()
-        self.poller.register(self.tdt_demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_section2,
-                             self.tdt_demux, dvbsi.STAG_TIME_DATE)
+        self.register_demux(self.tdt_demux, self.process_section2,
+                            dvbsi.STAG_TIME_DATE)
 
     def start_tot(self, timeout=0, pid=dvbsi.TRANSPORT_TOT_PID):
         if (self.tot_demux):
             self.tot_demux.stop()
-            self.poller.unregister(self.tot_demux.fileno())
+            self.unregister_demux(self.tot_demux)
             self.tot_demux = None
-        self.tot_demux = Demux(self.card, self.dev)
+        self.tot_demux = self.open_demux()
         self.tot_demux.set_filter(pid, [dvbsi.STAG_TIME_OFFSET],
                                   [0xff], None, timeout, 0)
         self.tot_demux.start()
-        self.poller.register(self.tot_demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_section2,
-                             self.tot_demux, dvbsi.STAG_TIME_OFFSET)
+        self.register_demux(self.tot_demux, self.process_section2,
+                            dvbsi.STAG_TIME_OFFSET)
 
 
 class EitCollector(Collector):
@@ -338,8 +480,11 @@ class EitCollector(Collector):
         Collector.__init__(self)
 
         # initialize tables
-        self.eit_pf = dvbsi.TableEit()
-        self.eit_sch = dvbsi.TableEit()
+        self.eit_pf = dvbsi.TableEit(True)
+        # budgets may be set on it, e.g. eit_sch.max_bytes
+        self.eit_sch = dvbsi.BoundedTableEit(True)
+        self.parse_pool = None
+        self.context = None
         self.reset()
 
     def notify_observers(self, result, section, sub_table, svc_table, table):
@@ -351,10 +496,56 @@ class EitCollector(Collector):
         for observer in self.observers:
             observer.on_eit_warning(self, section, string)
 
+    def notify_observers_records(self, section, records, svc_table, context):
+        for observer in self.observers:
+            observer.on_eit_records(self, section, records, svc_table,
+                                    context)
+
+    def get_tables(self):
+        tables = {dvbsi.STAG_EVENT_INFORMATION_NOWNEXT_ACTUAL: self.eit_pf,
+                  dvbsi.STAG_EVENT_INFORMATION_NOWNEXT_OTHER: self.eit_pf}
+        for n in range(0x20):
+            table_id = dvbsi.STAG_EVENT_INFORMATION_SCHEDULE_ACTUAL + n
+            tables[table_id] = self.eit_sch
+        return tables
+
     def reset(self):
         self.eit_pf.reset()
         self.eit_sch.reset()
 
+    def set_parse_pool(self, parse_pool):
+        '''decodes the events of EIT sections in the worker processes of
+        parse_pool, dvbsi.ParsePool of dvbsi.eit_event_records.
+
+        The tables are still updated here, in the order the sections are
+        received, and on_eit_section() is notified as without the pool but
+        with no events in the section. The events follow, in the same order,
+        as the records of dvbsi.eit_event_records() through
+        on_eit_records(), with the context of set_context() when the
+        section was received. None decodes the events here again.'''
+        if (self.parse_pool is not None):
+            self.poller.unregister(self.parse_pool.fileno())
+        self.parse_pool = parse_pool
+        if (parse_pool is not None):
+            self.poller.register(parse_pool.fileno(), poll_loop.POLLIN,
+                                 self.process_parse_pool)
+
+    def set_context(self, context):
+        '''passes context, e.g. the source the sections come from, with the
+        records of the sections received from now on to on_eit_records(),
+        which the parse pool calls later'''
+        self.context = context
+
+    def process_parse_pool(self, fd, mode):
+        self.parse_pool.collect()
+
+    def process_eit_records(self, records, section, svc_table, context):
+        if (records is None):
+            self.notify_observers(dvbsi.ERROR_ON_PARSING,
+                                  section, None, None, None)
+            return
+        self.notify_observers_records(section, records, svc_table, context)
+
     def process_eit(self, fd, mode, demux, table):
         if (mode & poll_loop.POLLERR):
             demux.stop()
@@ -366,23 +557,29 @@ class EitCollector(Collector):
         # find out parser
         table_id = dvbsi.STAG_EVENT_INFORMATION_NOWNEXT_ACTUAL
         parser = dvbsi.SECTION_MAP.get(table_id)
-        try:
-            raw = os.read(fd, 4096)
-        except:
+        for result, section in table.save_raw_sections(
+                self.read_sections(demux), parser):
+            self.process_saved_eit(result, section, table)
+            if (demux not in self.demuxes):
+                # stopped by an observer
+                break
+
+    def process_saved_eit(self, result, section, table):
+        if (result == dvbsi.ERROR_ON_PARSING):
+            self.notify_observers(result, section, None, None, None)
             return
-        section = parser(raw)
-        if (section.table_id == -1):
-            self.notify_observers(dvbsi.ERROR_ON_PARSING,
-                                  section, None, None, None)
+        if (result == dvbsi.ERROR_ON_CRC):
+            self.notify_observers(result, section, None, None, table)
             return
-
-        # find out key & sub_table
-        result = table.save(section)
         if ((result & (dvbsi.NEW_SECTION | dvbsi.VERSION_CHANGED)) is 0):
             # this section is already received. just return...
             return
+        self.num_sections_new += 1
+        if (self.section_log is not None):
+            self.section_log.append(section.data)
 
-        section.decode()
+        if (self.parse_pool is None):
+            section.decode()
 
         svc_key = table.get_svc_table_key(section)
         svc_table = table.get_svc_table(svc_key)
@@ -391,78 +588,138 @@ class EitCollector(Collector):
         sub_table = svc_table.get_sub_table(sub_key)
 
         self.notify_observers(result, section, sub_table, svc_table, table)
+        self.wake_waiters(table, section)
+        if (self.parse_pool is not None):
+            self.parse_pool.submit(section.data, self.process_eit_records,
+                                   section, svc_table, self.context)
 
     def stop(self):
         if (hasattr(self.eit_pf, 'demux_act')):
             self.eit_pf.demux_act.stop()
-            self.poller.unregister(self.eit_pf.demux_act.fileno())
+            self.unregister_demux(self.eit_pf.demux_act)
             del(self.eit_pf.demux_act)
         if (hasattr(self.eit_pf, 'demux_oth')):
             self.eit_pf.demux_oth.stop()
-            self.poller.unregister(self.eit_pf.demux_oth.fileno())
+            self.unregister_demux(self.eit_pf.demux_oth)
             del(self.eit_pf.demux_oth)
         if (hasattr(self.eit_sch, 'demux_act')):
             self.eit_sch.demux_act.stop()
-            self.poller.unregister(self.eit_sch.demux_act.fileno())
+            self.unregister_demux(self.eit_sch.demux_act)
             del(self.eit_sch.demux_act)
         if (hasattr(self.eit_sch, 'demux_oth')):
             self.eit_sch.demux_oth.stop()
-            self.poller.unregister(self.eit_sch.demux_oth.fileno())
+            self.unregister_demux(self.eit_sch.demux_oth)
             del(self.eit_sch.demux_oth)
+        self.wake_waiters(self.eit_pf, None)
+        self.wake_waiters(self.eit_sch, None)
+        self.poller.unregister_timer(self.evict_past)
+        if (self.parse_pool is not None):
+            # the records of the sections received so far
+            self.parse_pool.wait(PARSE_POOL_WAIT_SEC)
+
+    def evict_past(self):
+        self.eit_sch.evict_past(time.time())
+        if (self.section_log is not None):
+            # drops the sections evicted and the old versions from the log
+            self.section_log.compact(self.get_tables())
 
     def start_eit_pf(self, timeout=0, pid=dvbsi.TRANSPORT_EIT_PID):
         #self.eit_pf.reset()
-        demux = Demux(self.card, self.dev)
+        demux = self.open_demux()
         demux.set_filter(pid,
                          [dvbsi.STAG_EVENT_INFORMATION_NOWNEXT_ACTUAL],
                          [0xff], None, timeout, 0)
         demux.start()
-        self.poller.register(demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_eit,
-                             demux, self.eit_pf)
+        self.register_demux(demux, self.process_eit, self.eit_pf)
         self.eit_pf.demux_act = demux
 
-        demux = Demux(self.card, self.dev)
+        demux = self.open_demux()
         demux.set_filter(pid,
                          [dvbsi.STAG_EVENT_INFORMATION_NOWNEXT_OTHER],
                          [0xff], None, timeout, 0)
         demux.start()
-        self.poller.register(demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_eit,
-                             demux, self.eit_pf)
+        self.register_demux(demux, self.process_eit, self.eit_pf)
         self.eit_pf.demux_oth = demux
 
     def start_eit_sch(self, timeout=0, pid=dvbsi.TRANSPORT_EIT_PID):
         #self.eit_sch.reset()
-        demux = Demux(self.card, self.dev)
+        demux = self.open_demux()
         demux.set_filter(pid,
                          [dvbsi.STAG_EVENT_INFORMATION_SCHEDULE_ACTUAL],
                          [0xf0], None, timeout, 0)
         demux.start()
-        self.poller.register(demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_eit,
-                             demux, self.eit_sch)
+        self.register_demux(demux, self.process_eit, self.eit_sch)
         self.eit_sch.demux_act = demux
 
-        demux = Demux(self.card, self.dev)
+        demux = self.open_demux()
         demux.set_filter(pid,
                          [dvbsi.STAG_EVENT_INFORMATION_SCHEDULE_OTHER],
                          [0xf0], None, timeout, 0)
         demux.start()
-        self.poller.register(demux.fileno(),
-                             poll_loop.POLLIN | poll_loop.POLLERR,
-                             self.process_eit,
-                             demux, self.eit_sch)
+        self.register_demux(demux, self.process_eit, self.eit_sch)
         self.eit_sch.demux_oth = demux
+        self.poller.register_timer(self.evict_past, EVICT_PAST_MSEC,
+                                   EVICT_PAST_MSEC)
 
 
 if __name__ == "__main__":
+    import sys
+    import argparse
     import si_print
-
+    import offline
+    import ts_tap
+
+    prg_desc = "Test collector. Print the SI tables of a TS."
+    parser = argparse.ArgumentParser(description=prg_desc)
+    parser.add_argument('-t',
+                        action='store_true',
+                        help="filter the sections of TS packets tapped from "
+                        "the demux device, with a filter per PID")
+    parser.add_argument('-w',
+                        action='store_true',
+                        help="filter the sections of the whole TS tapped "
+                        "from the demux device")
+    parser.add_argument('-p',
+                        action='store_true',
+                        help="collect the EIT p/f too, decoding its events "
+                        "in a pool of worker processes")
+    loops = parser.add_mutually_exclusive_group()
+    loops.add_argument('--epoll',
+                       action='store_true',
+                       help="run the PollLoop on an edge-triggered epoll")
+    loops.add_argument('--asyncio',
+                       action='store_true',
+                       help="run the collectors on an asyncio event loop")
+    parser.add_argument('ts_file',
+                        action='store',
+                        nargs='?',
+                        help="recorded TS file to read at disk speed "
+                        "instead of the demux device")
+
+    argv = sys.argv[:]
+    argv.pop(0)
+    args = parser.parse_args(argv)
+
+    if (args.epoll):
+        poll_loop.PollLoop.use_epoll()
+    elif (args.asyncio):
+        import aio_loop
+        aio_loop.install()
     poller = poll_loop.PollLoop()
+    if (args.ts_file):
+        ts_source = offline.OfflineSource(args.ts_file)
+    elif (args.t or args.w):
+        ts_source = ts_tap.TapSource(whole_ts=args.w)
+    else:
+        ts_source = None
+
+    if (args.p):
+        parse_pool = dvbsi.ParsePool()
+        eit_collector = EitCollector()
+        eit_collector.set_ts_source(ts_source)
+        eit_collector.set_parse_pool(parse_pool)
+    else:
+        eit_collector = None
 
     class TestSiObserver(observer.SiObserver):
         def on_section(self, si_collector, result, section, sub_table, table):
@@ -476,10 +733,15 @@ if __name__ == "__main__":
                 if (section is not None):
                     si_print.print_section(section)
                 return
+            elif (result < 0):
+                # ERROR_ON_CRC, the section is not saved
+                print("error %d on table 0x%02x" % (result, table.table_id))
+                return
             else:
                 si_print.print_section(section)
 
-            if (result & dvbsi.COMPLETE_TABLE):
+            # the bits of a negative result, e.g. of a timeout, are no flags
+            if (result > 0 and (result & dvbsi.COMPLETE_TABLE)):
                 table_id = table.table_id
                 if (table_id == dvbsi.STAG_PROGRAM_ASSOCIATION):
                     #self.eit_collector.start_eit_sch()
@@ -489,6 +751,8 @@ if __name__ == "__main__":
                     si_collector.start_tdt()
                     si_collector.start_tot()
                     si_collector.start_bat()
+                    if (eit_collector is not None):
+                        eit_collector.start_eit_pf()
                 elif (table_id == dvbsi.STAG_NETWORK_INFORMATION_ACTUAL):
                     si_collector.start_sdt_oth(21000)
 
@@ -497,7 +761,11 @@ if __name__ == "__main__":
 
             if (si_collector.is_all_complete()):
                 si_collector.stop()
+                if (eit_collector is not None):
+                    eit_collector.stop()
                 poller.stop()
+                if (args.ts_file):
+                    ts_source.stop()
 
         def on_section2(self, monitor, section):
             si_print.print_section(section)
@@ -529,12 +797,39 @@ if __name__ == "__main__":
             #monitor.stop()
             #poller.stop()
 
+    class TestEitObserver(observer.EitObserver):
+        def on_eit_section(self, eit_collector, result, section,
+                           sub_table, svc_table, table):
+            if (result == dvbsi.RECEIVING_TIMED_OUT):
+                print("timeout EIT p/f")
+            elif (result < 0):
+                print("error %d on EIT" % result)
+
+        def on_eit_records(self, eit_collector, section, records, svc_table,
+                           context):
+            print("EIT 0x%02x sid 0x%04x section %d: %d events" %
+                  (section.table_id, section.table_id_ext,
+                   section.section_number, len(records)))
+
+    if (eit_collector is not None):
+        eit_collector.register_observer(TestEitObserver())
+
     test_si_observer = TestSiObserver()
     si_collector = SiCollector()
     si_collector.register_observer(test_si_observer)
+    si_collector.set_ts_source(ts_source)
     si_collector.start_pat(5000)
 
-    poller.run()
+    if (args.ts_file):
+        ts_source.run()
+    else:
+        poller.run()
+    if (ts_source is not None):
+        ts_source.close()
+    if (eit_collector is not None):
+        # the records of the EIT sections still in the pool
+        eit_collector.stop()
+        parse_pool.close()
 
     sections = []
     sections += si_collector.pat.get_sections()
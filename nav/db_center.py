@@ -6,8 +6,133 @@ import dvbsi
 from private import dtg
 from private import boxer
 import os
+import itertools
 #from private import huffman
 import dvb
+import db_index
+
+
+# events.db is used in place, in WAL journal mode, so that starting takes
+# no time and a crash loses only what was not committed. False copies it
+# into memory at start and back into the file by sync_events_db().
+EVENTS_ON_DISK = True
+
+# schema version of events.sql, in PRAGMA user_version
+EVENTS_VERSION = 1
+
+EVENTS_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    # a commit does not wait for the disk, a checkpoint does
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16384',           # KiB
+    'PRAGMA mmap_size = 67108864',
+    'PRAGMA wal_autocheckpoint = 1000',     # pages
+    'PRAGMA journal_size_limit = 8388608',
+    'PRAGMA foreign_keys = ON',
+]
+
+# brings an events.db of the version before to EVENTS_VERSION
+UPGRADE_EVENTS_SQL = '''
+DELETE FROM event_texts WHERE rowid NOT IN
+    (SELECT max(rowid) FROM event_texts GROUP BY evt_key, lang);
+DROP INDEX IF EXISTS event_texts_index;
+CREATE UNIQUE INDEX event_texts_index ON event_texts (evt_key, lang);
+DELETE FROM series_crids WHERE rowid NOT IN
+    (SELECT max(rowid) FROM series_crids GROUP BY evt_key, series_crid);
+DROP INDEX IF EXISTS series_crid_evt_index;
+CREATE UNIQUE INDEX series_crid_evt_index
+    ON series_crids (evt_key, series_crid);
+PRAGMA user_version = 1;
+'''
+
+# staging tables of DbCenter.save_event_batch(), in the connection only
+STAGING_SQL = '''
+CREATE TEMP TABLE stage_events (svc_key INTEGER, evid INTEGER,
+    start_time INTEGER, end_time INTEGER, version_number INTEGER);
+CREATE TEMP TABLE stage_texts (svc_key INTEGER, evid INTEGER, lang CHAR,
+    evt_name CHAR, short_text CHAR, extended_text CHAR);
+-- events of which the rows of a table are replaced
+CREATE TEMP TABLE stage_keys (svc_key INTEGER, evid INTEGER);
+CREATE TEMP TABLE stage_event_genres (svc_key INTEGER, evid INTEGER,
+    level_1 INTEGER, level_2 INTEGER, user_byte INTEGER);
+CREATE TEMP TABLE stage_event_parental_ratings (svc_key INTEGER,
+    evid INTEGER, country_code CHAR, rating INTEGER);
+CREATE TEMP TABLE stage_series_crids (svc_key INTEGER, evid INTEGER,
+    series_crid CHAR);
+CREATE TEMP TABLE stage_programs (svc_key INTEGER, evid INTEGER,
+    prog_crid CHAR, imi CHAR, season INTEGER, episode INTEGER,
+    total_episodes INTEGER);
+'''
+
+
+class EventBatch:
+    '''rows of events to be saved at once by DbCenter.save_event_batch().
+
+    The rows are keyed by (svc_key, evid) of their event; DbCenter.add_event()
+    adds the rows of an event.'''
+    def __init__(self):
+        self.events = {}
+        self.texts = {}     # (svc_key, evid) to lang to row of event_texts
+        self.genres = {}
+        self.ratings = {}
+        self.series_crids = {}
+        self.programs = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def get_text(self, key, lang):
+        '''returns row of the texts of event key in lang, of which the
+        texts not given are None'''
+        texts = self.texts.setdefault(key, {})
+        text = texts.get(lang)
+        if (text is None):
+            text = [key[0], key[1], lang, None, None, None]
+            texts[lang] = text
+        return text
+
+
+class KeyCache:
+    '''values read from the databases by a key, kept until cleared.
+
+    The keys of services and transports and the default authorities change
+    only by a scan, so DbCenter reads them once and keeps them here; the
+    methods writing them clear or update the cache. None is kept too, e.g.
+    for the services of an EIT which are not in the databases.'''
+
+    # returned by get() for a key not kept
+    MISS = object()
+
+    def __init__(self):
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        'returns value of key, KeyCache.MISS if it is not kept'
+        value = self.values.get(key, KeyCache.MISS)
+        if (value is KeyCache.MISS):
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.values[key] = value
+
+    def clear(self):
+        self.values.clear()
+
+    def get_stats(self):
+        'returns (hits, misses, number of keys kept)'
+        return self.hits, self.misses, len(self.values)
+
+    def get_hit_rate(self):
+        'returns ratio of the gets which were hits, 0 before any get'
+        num = self.hits + self.misses
+        if (num == 0):
+            return 0
+        return self.hits / num
 
 
 class DbSqlite3:
@@ -48,7 +173,11 @@ class DbSqlite3:
                 except:
                     self.create_db(db_file_name, schema_file_name)
 
-            self.connection = sqlite.connect(":memory:")
+            if (EVENTS_ON_DISK):
+                self.connection = sqlite.connect('events.db')
+                self.open_events_db()
+            else:
+                self.connection = sqlite.connect(":memory:")
             self.connection.row_factory = sqlite.Row
             c = self.connection.cursor()
 
@@ -56,16 +185,32 @@ class DbSqlite3:
             c.execute('''ATTACH DATABASE 'install.db' AS instdb''')
             c.execute('''ATTACH DATABASE 'settings.db' AS setdb''')
 
-            schema = open('events.sql', 'r')
-            sql = schema.read()
-            schema.close()
-
-            c.executescript(sql)
+            if (EVENTS_ON_DISK is False):
+                schema = open('events.sql', 'r')
+                sql = schema.read()
+                schema.close()
 
-            self.load_events_db()
+                c.executescript(sql)
+                self.load_events_db()
+            c.executescript(STAGING_SQL)
+            db_index.ensure_indexes(self.connection)
 
             self.connection.commit()
 
+            # shared by every DbCenter, as the connection
+            self.svc_key_cache = KeyCache()
+            self.ts_key_cache = KeyCache()
+            self.def_auth_cache = KeyCache()
+
+        def open_events_db(self):
+            c = self.connection.cursor()
+            for pragma in EVENTS_PRAGMAS:
+                c.execute(pragma)
+            c.execute('''PRAGMA user_version''')
+            if (c.fetchone()[0] < EVENTS_VERSION):
+                print("upgrading events.db...")
+                c.executescript(UPGRADE_EVENTS_SQL)
+
         def load_events_db(self):
             print("loading events.db...")
 
@@ -79,13 +224,27 @@ class DbSqlite3:
                 query += " SELECT * from filedb." + table + ";"
                 c.execute(query)
 
+            self.connection.commit()
             c.execute('''DETACH filedb''')
 
             self.connection.commit()
 
             print("done.")
 
+        def checkpoint(self, mode='PASSIVE'):
+            '''commits and copies the WAL into events.db, as far as the
+            readers let it with PASSIVE. returns (busy, pages of the WAL,
+            pages copied)'''
+            self.connection.commit()
+            c = self.connection.cursor()
+            c.execute('PRAGMA main.wal_checkpoint(%s)' % mode)
+            return tuple(c.fetchone())
+
         def sync_events_db(self):
+            if (EVENTS_ON_DISK):
+                self.checkpoint('TRUNCATE')
+                return
+
             print("syncing events.db...")
 
             c = self.connection.cursor()
@@ -101,6 +260,7 @@ class DbSqlite3:
                 query += " SELECT * from " + table + ";"
                 c.execute(query)
 
+            self.connection.commit()
             c.execute('''DETACH filedb''')
 
             self.connection.commit()
@@ -136,6 +296,19 @@ class DbCenter:
     def __init__(self):
         self.sqlite_db = DbSqlite3()
         self.connection = self.sqlite_db.get_connection()
+        # (tsid, onid, svid, src_key, nid) to svc_key
+        self.svc_key_cache = self.sqlite_db.svc_key_cache
+        # (tsid, onid, nid, src_key) to ts_key
+        self.ts_key_cache = self.sqlite_db.ts_key_cache
+        # svc_key to default authority
+        self.def_auth_cache = self.sqlite_db.def_auth_cache
+
+    def get_cache_stats(self):
+        '''returns get_stats() of the caches of svc_key, ts_key and
+        default authority'''
+        return (self.svc_key_cache.get_stats(),
+                self.ts_key_cache.get_stats(),
+                self.def_auth_cache.get_stats())
 
     def commit(self):
         self.connection.commit()
@@ -144,6 +317,11 @@ class DbCenter:
     def sync_events(self):
         self.sqlite_db.sync_events_db()
 
+    def checkpoint(self):
+        '''commits and checkpoints events.db, to be called now and then'''
+        if (EVENTS_ON_DISK):
+            self.sqlite_db.checkpoint()
+
     def save_network(self, nid, net_name):
         c = self.connection.cursor()
 
@@ -184,6 +362,10 @@ class DbCenter:
                    tsid != ? or tsid is null or
                    onid != ? or onid is null)''',
                   [nid, tsid, onid, ts_key, nid, tsid, onid])
+        if (c.rowcount > 0):
+            # the keys of the old IDs are wrong now
+            self.ts_key_cache.clear()
+            self.svc_key_cache.clear()
         return
 
     def save_transport(self, src_key, nid, onid, tsid):
@@ -196,6 +378,8 @@ class DbCenter:
         if (not row):
             c.execute('''insert into transports (nid, tsid, onid, src_key)
                            values(?, ?, ?, ?)''', [nid, tsid, onid, src_key])
+            # it may be kept as None
+            self.ts_key_cache.clear()
         return
 
     def save_time_offset(self, ts_key, time_offset):
@@ -243,6 +427,9 @@ class DbCenter:
         c.execute('''insert or replace into default_authorities
                   (svc_key, default_authority)
                   values (?, ?)''', [svc_key, def_auth])
+        if (def_auth is None):
+            def_auth = ""
+        self.def_auth_cache.put(svc_key, def_auth)
 
     def save_file_param(self, ts_key, dsc):
         c = self.connection.cursor()
@@ -546,6 +733,9 @@ class DbCenter:
         return
 
     def _get_default_authority(self, svc_key):
+        default_authority = self.def_auth_cache.get(svc_key)
+        if (default_authority is not KeyCache.MISS):
+            return default_authority
         c = self.connection.cursor()
         c.execute('''select default_authority
                   from default_authorities
@@ -555,53 +745,87 @@ class DbCenter:
             default_authority = ""
         else:
             default_authority = row[0]
+        self.def_auth_cache.put(svc_key, default_authority)
         return default_authority
 
     def save_event(self, onid, tsid, svid, svc_key, version_number, event):
-        start_time = dvbsi.dvbdate_to_unixtime(event.start_time)
-        end_time = start_time + dvbsi.dvbduration_to_seconds(event.duration)
-        c = self.connection.cursor()
-
-        c.execute('''select * from events
-                  where svc_key = ? and evid = ?''',
-                  [svc_key, event.event_id])
-        row = c.fetchone()
-        if (not row):
-            # inserting event is applied immediately
-            c.execute('''insert into events
-                      (svc_key, evid, start_time, end_time, version_number)
-                      values (?, ?, ?, ?, ?)''',
-                      [svc_key, event.event_id,
-                       start_time, end_time, version_number])
-        elif (row['start_time'] != start_time or
-              row['end_time'] != end_time or
-              row['version_number'] != version_number):
-            # updating event is applied immediately
-            c.execute('''update events
-                      set start_time = ?, end_time = ?, version_number = ?
-                      where svc_key = ? and evid = ?''',
-                      [start_time, end_time, version_number,
-                       svc_key, event.event_id])
-
-        c.execute('''select evt_key from events
-                  where svc_key = ? and evid = ?''',
-                  [svc_key, event.event_id])
-        row = c.fetchone()
-        evt_key = row['evt_key']
-
-        for raw_dsc in event.descriptors:
+        'saves an event of an EitSection'
+        batch = EventBatch()
+        self.add_events(batch, onid, tsid, svid, svc_key, version_number,
+                        [event])
+        self.save_event_batch(batch)
+
+    def add_events(self, batch, onid, tsid, svid, svc_key, version_number,
+                   events):
+        'adds the events of an EitSection to batch'
+        for event in events:
+            start_time = dvbsi.dvbdate_to_unixtime(event.start_time)
+            end_time = start_time + \
+                dvbsi.dvbduration_to_seconds(event.duration)
+            self.add_event(batch, onid, tsid, svid, svc_key, version_number,
+                           event.event_id, start_time, end_time,
+                           event.descriptors)
+
+    def add_event_records(self, batch, onid, tsid, svid, svc_key,
+                          version_number, records):
+        'adds the event records of dvbsi.eit_event_records() to batch'
+        for record in records:
+            event_id, start_time, end_time, running_status, free_ca_mode, \
+                descriptors = record
+            self.add_event(batch, onid, tsid, svid, svc_key, version_number,
+                           event_id, start_time, end_time,
+                           dvbsi.DescriptorLoop(descriptors))
+
+    def _decode_event_string(self, raw_str):
+        if (len(raw_str) > 0 and raw_str[0] == 0x1f):
+            #return dtg.decompress_string(raw_str)
+            #return huffman.decode_freesat(raw_str).decode("utf-8")
+            return None
+        charset, used = dvbsi.dvb_charset(raw_str)
+        return raw_str[used:].decode(charset, 'replace')
+
+    def add_event(self, batch, onid, tsid, svid, svc_key, version_number,
+                  event_id, start_time, end_time, descriptors):
+        '''adds the rows of an event to batch, EventBatch, to be saved by
+        save_event_batch()'''
+        key = (svc_key, event_id)
+        batch.events[key] = (svc_key, event_id, start_time, end_time,
+                             version_number)
+        # rows of an event given again in the batch are of the last one
+        batch.texts.pop(key, None)
+        batch.genres.pop(key, None)
+        batch.ratings.pop(key, None)
+        batch.series_crids.pop(key, None)
+        batch.programs.pop(key, None)
+
+        for raw_dsc in descriptors.find_all((dvbsi.DTAG_SHORT_EVENT,
+                                             dvbsi.DTAG_EXTENDED_EVENT,
+                                             dvbsi.DTAG_PARENTAL_RATING,
+                                             dvbsi.DTAG_CONTENT)):
             if (raw_dsc.tag == dvbsi.DTAG_SHORT_EVENT):
-                dsc = dvbsi.ShortEventDescriptor(raw_dsc.data)
-                self.save_event_text(evt_key, dsc)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.ShortEventDescriptor)
+                text = batch.get_text(key, dsc.language_code)
+                text[3] = self._decode_event_string(dsc.event_name)
+                text[4] = self._decode_event_string(dsc.text)
             elif (raw_dsc.tag == dvbsi.DTAG_EXTENDED_EVENT):
-                dsc = dvbsi.ExtendedEventDescriptor(raw_dsc.data)
-                self.save_event_extended(evt_key, dsc)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.ExtendedEventDescriptor)
+                text = batch.get_text(key, dsc.language_code)
+                text[5] = self._decode_event_string(dsc.text)
             elif (raw_dsc.tag == dvbsi.DTAG_PARENTAL_RATING):
-                dsc = dvbsi.ParentalRatingDescriptor(raw_dsc.data)
-                self.save_event_parental_rating(evt_key, dsc)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.ParentalRatingDescriptor)
+                batch.ratings[key] = [(svc_key, event_id,
+                                       rating.country_code, rating.rating)
+                                      for rating in dsc.parental_ratings]
             elif (raw_dsc.tag == dvbsi.DTAG_CONTENT):
-                dsc = dvbsi.ContentDescriptor(raw_dsc.data)
-                self.save_event_genres(evt_key, dsc)
+                dsc = dvbsi.decode_descriptor(raw_dsc, dvbsi.ContentDescriptor)
+                batch.genres[key] = [(svc_key, event_id,
+                                      content.content_nibble_level_1,
+                                      content.content_nibble_level_2,
+                                      content.user_byte)
+                                     for content in dsc.contents]
 
         prog_crid = None
         prog_imi = None
@@ -610,11 +834,14 @@ class DbCenter:
         total_episodes = 0
 
         def_auth = self._get_default_authority(svc_key)
+        series_crids = []
 
         # save series CRID & find program CRID
-        for raw_dsc in event.descriptors:
+        for raw_dsc in descriptors.find_all(
+                (dvbsi.DTAG_CONTENT_IDENTIFIER, boxer.DTAG_CBI)):
             if (raw_dsc.tag == dvbsi.DTAG_CONTENT_IDENTIFIER):
-                dsc = dvbsi.ContentIdentifierDescriptor(raw_dsc.data)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.ContentIdentifierDescriptor)
                 for dvb_crid in dsc.crids:
                     if (dvb_crid.location != 0):
                         continue
@@ -622,7 +849,7 @@ class DbCenter:
                      or dvb_crid.crid_type == dvbsi.CRID_TYPE_SERIES_CRID):
                         crid, imi = self.make_crid_imi(def_auth,
                                                        dvb_crid.crid_byte)
-                        self.save_series_crid(evt_key, crid)
+                        series_crids.append((svc_key, event_id, crid))
                     elif (dvb_crid.crid_type == dtg.CRID_TYPE_PROGRAM_CRID or
                           dvb_crid.crid_type == dvbsi.CRID_TYPE_PROGRAM_CRID):
                         crid, imi = self.make_crid_imi(def_auth,
@@ -630,7 +857,7 @@ class DbCenter:
                         prog_crid = crid
                         prog_imi = imi
             elif (raw_dsc.tag == boxer.DTAG_CBI):
-                dsc = boxer.CBIDescriptor(raw_dsc.data)
+                dsc = dvbsi.decode_descriptor(raw_dsc, boxer.CBIDescriptor)
                 if (dsc.cbitype == 1):
                     info = dsc.basic_info
                     season = info.season
@@ -639,132 +866,121 @@ class DbCenter:
                     if (info.series_id != 0):
                         cbi_def_auth = "%x.%x.%x" % (onid, tsid, svid)
                         crid = cbi_def_auth + "/" + hex(info.series_id)
-                        self.save_series_crid(evt_key, crid)
+                        series_crids.append((svc_key, event_id, crid))
                         if (info.episode != 0 and prog_crid is None):
                             crid += "/" + str(info.season)
                             crid += "/" + str(info.episode)
                             prog_crid = crid
+        if (series_crids):
+            batch.series_crids[key] = series_crids
 
         # save program CRID
         if (prog_crid or prog_imi or season or episode or total_episodes):
-            self.save_program(evt_key, prog_crid, prog_imi, season,
-                              episode, total_episodes)
-
-    def save_event_text(self, evt_key, dsc):
-        raw_str = dsc.event_name
-        if (len(raw_str) > 0 and raw_str[0] == 0x1f):
-            #evt_name = dtg.decompress_string(raw_str)
-            #evt_name = huffman.decode_freesat(raw_str).decode("utf-8")
-            pass
-        else:
-            charset, used = dvbsi.dvb_charset(raw_str)
-            evt_name = raw_str[used:].decode(charset, 'replace')
-
-        raw_str = dsc.text
-        if (len(raw_str) > 0 and raw_str[0] == 0x1f):
-            #short_text = dtg.decompress_string(raw_str)
-            #short_text = huffman.decode_freesat(raw_str).decode("utf-8")
-            pass
-        else:
-            charset, used = dvbsi.dvb_charset(raw_str)
-            short_text = raw_str[used:].decode(charset, 'replace')
-
-        c = self.connection.cursor()
-        c.execute('''select * from event_texts
-                  where evt_key = ? and lang = ?''',
-                  [evt_key, dsc.language_code])
-
-        row = c.fetchone()
-        if (not row):
-            c.execute('''insert into event_texts
-                      (evt_key, lang, evt_name, short_text)
-                      values (?, ?, ?, ?)''',
-                      [evt_key, dsc.language_code, evt_name, short_text])
-        elif (row['evt_name'] != evt_name or row['short_text'] != short_text):
-            c.execute('''update event_texts
-                      set evt_name = ?, short_text = ?
-                      where evt_key = ? and lang = ?''',
-                      [evt_name, short_text, evt_key, dsc.language_code])
-
-    def save_event_extended(self, evt_key, dsc):
-        raw_str = dsc.text
-        if (len(raw_str) > 0 and raw_str[0] == 0x1f):
-            #extended_text = dtg.decompress_string(raw_str)
-            #extended_text = huffman.decode_freesat(raw_str).decode("utf-8")
-            pass
-        else:
-            charset, used = dvbsi.dvb_charset(raw_str)
-            extended_text = raw_str[used:].decode(charset, 'replace')
-
+            batch.programs[key] = (svc_key, event_id, prog_crid, prog_imi,
+                                   season, episode, total_episodes)
+
+    def save_event_batch(self, batch):
+        '''saves the rows of batch, EventBatch, with a few statements: the
+        rows are loaded into the staging tables and merged from there into
+        the event tables, keyed by (svc_key, evid) until evt_key is known.
+        "where true" tells the upsert clause from a join of the select.'''
+        if (len(batch.events) == 0):
+            return
         c = self.connection.cursor()
-        c.execute('''select * from event_texts
-                  where evt_key = ? and lang = ?''',
-                  [evt_key, dsc.language_code])
-
-        row = c.fetchone()
-        if (not row):
+        c.executemany('''insert into stage_events
+                      (svc_key, evid, start_time, end_time, version_number)
+                      values (?, ?, ?, ?, ?)''', batch.events.values())
+        c.execute('''insert into events
+                  (svc_key, evid, start_time, end_time, version_number)
+                  select svc_key, evid, start_time, end_time, version_number
+                  from stage_events where true
+                  on conflict (svc_key, evid) do update
+                  set start_time = excluded.start_time,
+                  end_time = excluded.end_time,
+                  version_number = excluded.version_number
+                  where start_time != excluded.start_time or
+                  end_time != excluded.end_time or
+                  version_number != excluded.version_number''')
+        c.execute('''delete from stage_events''')
+
+        if (batch.texts):
+            # a text not given, e.g. extended_text of short_event_descriptor,
+            # is left as it is
+            c.executemany('''insert into stage_texts
+                          (svc_key, evid, lang, evt_name, short_text,
+                          extended_text) values (?, ?, ?, ?, ?, ?)''',
+                          itertools.chain.from_iterable(
+                              texts.values()
+                              for texts in batch.texts.values()))
             c.execute('''insert into event_texts
-                      (evt_key, lang, extended_text)
-                      values (?, ?, ?)''',
-                      [evt_key, dsc.language_code, extended_text])
-        elif (row['extended_text'] != extended_text):
-            c.execute('''update event_texts
-                      set extended_text = ?
-                      where evt_key = ? and lang = ?''',
-                      [extended_text, evt_key, dsc.language_code])
-
-    def save_event_genres(self, evt_key, dsc):
-        c = self.connection.cursor()
-        c.execute('''delete from event_genres where evt_key = ?;''', [evt_key])
-        for content in dsc.contents:
-            c.execute('''insert into event_genres
-                      (evt_key, level_1, level_2, user_byte)
-                      values (?, ?, ?, ?);''',
-                      [evt_key,
-                       content.content_nibble_level_1,
-                       content.content_nibble_level_2,
-                       content.user_byte])
-
-    def save_event_parental_rating(self, evt_key, dsc):
-        c = self.connection.cursor()
-        c.execute('''delete from event_parental_ratings where evt_key = ?;''',
-                  [evt_key])
-        for rating in dsc.parental_ratings:
-            c.execute('''insert into event_parental_ratings
-                      (evt_key, country_code, rating)
-                      values (?, ?, ?);''',
-                      [evt_key, rating.country_code, rating.rating])
-
-    def save_series_crid(self, evt_key, series_crid):
-        c = self.connection.cursor()
-        c.execute('''select * from series_crids
-                  where evt_key = ? and series_crid = ?''',
-                  [evt_key, series_crid])
-        row = c.fetchone()
-        if (not row):
+                      (evt_key, lang, evt_name, short_text, extended_text)
+                      select e.evt_key, s.lang, s.evt_name, s.short_text,
+                      s.extended_text
+                      from stage_texts s join events e
+                      on e.svc_key = s.svc_key and e.evid = s.evid where true
+                      on conflict (evt_key, lang) do update
+                      set evt_name = coalesce(excluded.evt_name, evt_name),
+                      short_text = coalesce(excluded.short_text, short_text),
+                      extended_text = coalesce(excluded.extended_text,
+                      extended_text)''')
+            c.execute('''delete from stage_texts''')
+
+        if (batch.genres):
+            self._replace_event_rows(c, batch.genres, 'event_genres',
+                                     'level_1, level_2, user_byte')
+        if (batch.ratings):
+            self._replace_event_rows(c, batch.ratings,
+                                     'event_parental_ratings',
+                                     'country_code, rating')
+
+        if (batch.series_crids):
+            c.executemany('''insert into stage_series_crids
+                          (svc_key, evid, series_crid) values (?, ?, ?)''',
+                          itertools.chain.from_iterable(
+                              batch.series_crids.values()))
             c.execute('''insert into series_crids (evt_key, series_crid)
-                      values (?, ?)''', [evt_key, series_crid])
-
-    def save_program(self, evt_key, prog_crid, imi, season, episode,
-                     total_episodes):
-        c = self.connection.cursor()
-        c.execute('''select * from programs where evt_key = ?''',
-                  [evt_key])
-        row = c.fetchone()
-        if (not row):
+                      select e.evt_key, s.series_crid
+                      from stage_series_crids s join events e
+                      on e.svc_key = s.svc_key and e.evid = s.evid where true
+                      on conflict (evt_key, series_crid) do nothing''')
+            c.execute('''delete from stage_series_crids''')
+
+        if (batch.programs):
+            c.executemany('''insert into stage_programs
+                          (svc_key, evid, prog_crid, imi, season, episode,
+                          total_episodes) values (?, ?, ?, ?, ?, ?, ?)''',
+                          batch.programs.values())
             c.execute('''insert into programs
                       (evt_key, prog_crid, imi, season, episode,
-                      total_episodes) values (?, ?, ?, ?, ?, ?)''',
-                      [evt_key, prog_crid, imi, season, episode,
-                       total_episodes])
-        elif (row['prog_crid'] != prog_crid or row['imi'] != imi or
-              row['season'] != season or row['episode'] != episode or
-              row['total_episodes'] != total_episodes):
-            c.execute('''update programs
-                      set prog_crid = ?, imi = ?, season = ?, episode = ?,
-                      total_episodes = ? where evt_key = ?''',
-                      [prog_crid, imi, season, episode, total_episodes,
-                       evt_key])
+                      total_episodes)
+                      select e.evt_key, s.prog_crid, s.imi, s.season,
+                      s.episode, s.total_episodes
+                      from stage_programs s join events e
+                      on e.svc_key = s.svc_key and e.evid = s.evid where true
+                      on conflict (evt_key) do update
+                      set prog_crid = excluded.prog_crid, imi = excluded.imi,
+                      season = excluded.season, episode = excluded.episode,
+                      total_episodes = excluded.total_episodes''')
+            c.execute('''delete from stage_programs''')
+
+    def _replace_event_rows(self, c, rows, table, columns):
+        '''replaces the rows of table of the events of rows, dict of
+        (svc_key, evid) to the rows of stage_<table>'''
+        stage = 'stage_' + table
+        c.executemany('insert into stage_keys (svc_key, evid) values (?, ?)',
+                      rows.keys())
+        c.execute('''delete from %s where evt_key in
+                  (select e.evt_key from stage_keys s join events e
+                  on e.svc_key = s.svc_key and e.evid = s.evid)''' % table)
+        marks = ', '.join('?' * (2 + len(columns.split(','))))
+        c.executemany('insert into %s values (%s)' % (stage, marks),
+                      itertools.chain.from_iterable(rows.values()))
+        c.execute('''insert into %s (evt_key, %s)
+                  select e.evt_key, %s from %s s join events e
+                  on e.svc_key = s.svc_key and e.evid = s.evid
+                  order by s.rowid''' % (table, columns, columns, stage))
+        c.execute('delete from stage_keys')
+        c.execute('delete from %s' % stage)
 
     def make_crid_imi(self, default_authority, crid_byte):
         # separate crid_byte into three fields: authority, data and imi
@@ -844,14 +1060,21 @@ class DbCenter:
         return evt
 
     def get_ts_key(self, tsid, onid, nid, src_key=0):
+        key = (tsid, onid, nid, src_key)
+        ts_key = self.ts_key_cache.get(key)
+        if (ts_key is not KeyCache.MISS):
+            return ts_key
         c = self.connection.cursor()
         c.execute('''select ts_key from transports
                   where nid = ? and tsid = ? and onid = ? and src_key = ?''',
                   [nid, tsid, onid, src_key])
         row = c.fetchone()
         if (not row):
-            return None
-        return row[0]
+            ts_key = None
+        else:
+            ts_key = row[0]
+        self.ts_key_cache.put(key, ts_key)
+        return ts_key
 
     def get_ts_key2(self, tsid, onid, src_key=0):
         c = self.connection.cursor()
@@ -864,6 +1087,10 @@ class DbCenter:
         return row[0]
 
     def get_svc_key(self, tsid, onid, svid, src_key, nid=-1):
+        key = (tsid, onid, svid, src_key, nid)
+        svc_key = self.svc_key_cache.get(key)
+        if (svc_key is not KeyCache.MISS):
+            return svc_key
         c = self.connection.cursor()
         if (nid == -1):
             c.execute(''' select svc_key from services
@@ -881,8 +1108,11 @@ class DbCenter:
                       [tsid, onid, svid, nid, src_key])
         row = c.fetchone()
         if (not row):
-            return None
-        return row[0]
+            svc_key = None
+        else:
+            svc_key = row[0]
+        self.svc_key_cache.put(key, svc_key)
+        return svc_key
 
     def get_svc_key2(self, ts_key, svid):
         c = self.connection.cursor()
@@ -901,7 +1131,7 @@ class DbCenter:
     def insert_temp_service(self, ts_key, service):
         for dsc in service.descriptors:
             if (dsc.tag == dvbsi.DTAG_SERVICE):
-                svc_dsc = dvbsi.ServiceDescriptor(dsc.data)
+                svc_dsc = dvbsi.decode_descriptor(dsc, dvbsi.ServiceDescriptor)
                 break
         else:
             # no service descriptor: nothings to be done.
@@ -1027,6 +1257,9 @@ class DbCenter:
                   on OLD.svid = NEW.svid and OLD.ts_key = NEW.ts_key
                   where OLD.svid is null;''')
 
+        # services may be gone, or come with a new svc_key
+        self.svc_key_cache.clear()
+
     def save_bouquet_service(self, bid, tsid, onid, svid, nid):
         c = self.connection.cursor()
         c.execute('''insert or ignore into bouquet_services
@@ -0,0 +1,85 @@
+#! /usr/bin/env python3
+
+
+# indexes the hot queries of db_center and evtwin need, as
+# (database, index, table, columns). They are made by ensure_indexes() on
+# every start, so that databases made by an older schema get them too.
+INDEXES = [
+    # EvtWin.read_events_of_service(): start_time/end_time range of a svc_key
+    ("main", "events_svc_time_index", "events",
+     "svc_key, start_time, end_time"),
+    # get_alternatives_of_program()
+    ("main", "program_crid_index", "programs", "prog_crid"),
+    # get_prog_crid_list_of_series()
+    ("main", "series_crid_index", "series_crids", "series_crid"),
+    # get_ts_key(), get_ts_key2() and get_svc_key()
+    ("svcdb", "transports_ids_index", "transports",
+     "tsid, onid, src_key, nid"),
+    # get_rsv_links_of_schedule() of read_schedule_of_period()
+    ("svcdb", "rsv_links_sched_index", "rsv_links", "sched_key"),
+]
+
+# read_schedule_of_period() and is_moment_scheduled() are served by the
+# UNIQUE (action, svc_key, start_time, end_time) of schedules, and the
+# join of get_svc_key() by the UNIQUE (ts_key, svid) of services.
+
+
+def ensure_indexes(connection):
+    '''creates the indexes of INDEXES missing in the databases of
+    connection. returns names of the indexes created'''
+    c = connection.cursor()
+    created = []
+    for db, name, table, columns in INDEXES:
+        c.execute('''select count(*) from %s.sqlite_master
+                  where type = 'index' and name = ?''' % db, [name])
+        if (c.fetchone()[0]):
+            continue
+        c.execute('create index %s.%s on %s (%s)' % (db, name, table, columns))
+        created.append(name)
+    return created
+
+
+def query_plan(connection, sql, params=()):
+    'returns the steps of EXPLAIN QUERY PLAN of sql'
+    c = connection.cursor()
+    c.execute('explain query plan ' + sql, params)
+    return [row[3] for row in c.fetchall()]
+
+
+def full_scans(plan):
+    '''returns the steps of plan reading a whole table or index, i.e. not
+    searching it with an index'''
+    return [step for step in plan
+            if step.startswith('SCAN ') and step != 'SCAN CONSTANT ROW']
+
+
+class QueryRecorder:
+    '''records the select statements run on connection in a with block,
+    with their parameters bound, e.g. to see the plans of the statements
+    of a DbCenter method'''
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+
+    def record(self, statement):
+        if (statement.lstrip()[:6].lower() == 'select'):
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        self.connection.set_trace_callback(self.record)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.set_trace_callback(None)
+        return False
+
+    def get_full_scans(self):
+        '''returns (statement, steps) of the statements recorded reading a
+        whole table'''
+        scans = []
+        for statement in self.statements:
+            steps = full_scans(query_plan(self.connection, statement))
+            if (steps):
+                scans.append((statement, steps))
+        return scans
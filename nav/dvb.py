@@ -229,8 +229,8 @@ class TsTer(dvbsi.TerrestrialDeliverySystemDescriptor, Transport):
         self.time_slicing_indicator = dsc.time_slicing_indicator
         self.mpe_fec_indicator = dsc.mpe_fec_indicator
         self.other_frequency_flag = dsc.other_frequency_flag
-        self.code_rate_hp_stream = dsc.code_rate_HP
-        self.code_rate_lp_stream = dsc.code_rate_LP
+        self.code_rate_hp_stream = dsc.code_rate_hp_stream
+        self.code_rate_lp_stream = dsc.code_rate_lp_stream
         self.constellation = dsc.constellation
         self.transmission_mode = dsc.transmission_mode
         self.guard_interval = dsc.guard_interval
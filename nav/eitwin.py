@@ -85,7 +85,7 @@ class EitWin(window.Window, observer.SvcObserver):
             return
         service = self.cur_service
         svc_table_key = (service.svid, service.tsid, service.onid)
-        svc_table = self.eit_collector.eit_sch.get_svc_table(svc_table_key)
+        svc_table = self.eit_collector.eit_sch.load_svc_table(svc_table_key)
         if (svc_table is None):
             return
         sections = svc_table.get_sections()
@@ -3,6 +3,7 @@
  ***************************************************************************/
 
 PRAGMA foreign_keys = ON;
+PRAGMA user_version = 1;  -- EVENTS_VERSION of db_center.py
 
 CREATE TABLE events (
 	evt_key INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,7 +38,7 @@ CREATE TABLE event_texts (
 	extended_text CHAR, -- text in extended_event_descriptor
 	FOREIGN KEY (evt_key) REFERENCES events ON DELETE CASCADE
 );
-CREATE INDEX event_texts_index ON event_texts (evt_key);
+CREATE UNIQUE INDEX event_texts_index ON event_texts (evt_key, lang);
 
 CREATE TABLE event_parental_ratings (
 	evt_key INTEGER,    -- evt_key is not a primary key because
@@ -65,7 +66,8 @@ CREATE TABLE series_crids (
 	series_crid CHAR,
 	FOREIGN KEY (evt_key) REFERENCES events ON DELETE CASCADE
 );
-CREATE INDEX series_crid_evt_index ON series_crids (evt_key);
+CREATE UNIQUE INDEX series_crid_evt_index
+	ON series_crids (evt_key, series_crid);
 CREATE INDEX series_crid_index ON series_crids (series_crid);
 
 CREATE TABLE programs (
@@ -418,7 +418,7 @@ class EvtWin(window.Window, observer.SvcObserver):
         cur_event = self.cur_service.events[self.cur_evt]
 
         svc_table_key = (service.svid, service.tsid, service.onid)
-        svc_table = self.eit_collector.eit_sch.get_svc_table(svc_table_key)
+        svc_table = self.eit_collector.eit_sch.load_svc_table(svc_table_key)
         if (svc_table is None):
             return
         sections = svc_table.get_sections()
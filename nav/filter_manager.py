@@ -0,0 +1,276 @@
+#! /usr/bin/env python3
+
+import errno
+import time
+
+import dvbsi
+import poll_loop
+
+
+# sections read from the demux device at most on a wakeup
+READ_BUDGET = 256
+# buffer of a filter shared by the tables of a PID, e.g. all the EITs
+BUFFER_SIZE = 256 * 1024
+
+
+class SharedDemux:
+    '''Demux on a section filter shared by the tables of a PID.
+
+    It has the interface of demux.Demux the collectors use. The sections
+    of the PID are read from one filter of the demux device by the
+    FilterManager and matched here with the whole filter, mask and mode
+    given to set_filter(), as dvbsi.SectionFilter does. The timeout of
+    set_filter() is kept here with a timer of the PollLoop: POLLERR comes
+    when no section passed this filter for timeout msec after start().'''
+    def __init__(self, manager):
+        self.source = manager
+        self.filter = dvbsi.SectionFilter(self)
+        self.pid_filter = None
+        self.handler = None
+        self.timeout = 0
+        self.last_time = 0
+        self.overflowed = False
+
+    def fileno(self):
+        if (self.pid_filter is None):
+            return -1
+        return self.pid_filter.demux.fileno()
+
+    def set_blocking(self, blocking):
+        pass
+
+    def set_buffer_size(self, size):
+        pass
+
+    def set_filter(self, pid, _filter, mask, mode, timeout, flags):
+        self.filter.set_filter(pid, _filter, mask, mode, 0,
+                               flags & ~dvbsi.DMX_IMMEDIATE_START)
+        self.timeout = timeout
+        self.source.attach(self, pid)
+        if (flags & dvbsi.DMX_IMMEDIATE_START):
+            self.start()
+
+    def start(self):
+        self.filter.start()
+
+    def stop(self):
+        self.filter.stop()
+        # DMX_STOP flushes the buffer of the device
+        self.filter.queue.clear()
+
+    def read(self, length=4096):
+        if (self.overflowed):
+            self.overflowed = False
+            raise OSError(errno.EOVERFLOW, "Value too large")
+        section = self.filter.read()
+        if (section is None):
+            raise BlockingIOError()
+        return section
+
+    # called by self.filter
+    def add_filter(self, section_filter):
+        if (self.pid_filter is None):
+            return
+        self.pid_filter.running.append(self)
+        self.last_time = time.monotonic()
+        if (self.timeout):
+            self.source.poller.register_timer(self.check_timeout,
+                                              self.timeout, 0)
+
+    def remove_filter(self, section_filter):
+        if (self.pid_filter is None):
+            return
+        self.pid_filter.running.remove(self)
+        if (self.timeout):
+            self.source.poller.unregister_timer(self.check_timeout)
+
+    def check_timeout(self):
+        left = self.timeout - (time.monotonic() - self.last_time) * 1000
+        if (left > 0):
+            self.source.poller.register_timer(self.check_timeout,
+                                              int(left) + 1, 0)
+            return
+        self.notify(poll_loop.POLLERR)
+
+    def notify(self, mode):
+        'calls the callback while it has something to read'
+        if (self.handler is None):
+            return
+        callback, args = self.handler
+        fd = self.fileno()
+        if (mode & poll_loop.POLLERR):
+            callback(fd, mode, self, *args)
+            return
+        while ((len(self.filter.queue) or self.overflowed) and
+               self.handler is not None):
+            callback(fd, mode, self, *args)
+
+
+class PidFilter:
+    '''the filter of the demux device on a PID and the SharedDemuxes on it.
+
+    The device filters table_id with the bits common to the table_ids of
+    every SharedDemux set on the PID; the rest is filtered by them.'''
+    def __init__(self, manager, pid):
+        self.pid = pid
+        self.demux = manager.open_device()
+        self.demux.set_buffer_size(BUFFER_SIZE)
+        self.shared = []        # SharedDemuxes set on the PID
+        self.running = []       # those started
+        self.table_id = -1
+        self.mask = -1
+
+    def update(self):
+        '''sets the device filter to pass every table_id of the shared
+        filters. returns True if it is changed'''
+        table_id = None
+        mask = 0
+        for shared in self.shared:
+            value, bits = 0, 0
+            for pos, v, m, mode in shared.filter.tests:
+                if (pos == 0):
+                    value, bits = v, m & ~mode
+            if (table_id is None):
+                table_id, mask = value, bits
+            else:
+                mask &= bits & ~(table_id ^ value)
+            table_id &= mask
+        if (table_id is None or (table_id, mask) == (self.table_id,
+                                                     self.mask)):
+            return False
+        if (self.mask != -1):
+            self.demux.stop()
+        self.table_id = table_id
+        self.mask = mask
+        self.demux.set_filter(self.pid, [table_id], [mask], None, 0, 0)
+        self.demux.start()
+        return True
+
+
+class FilterManager:
+    '''Shares the section filters of a demux device among the collectors.
+
+    A demux device has a few hardware filters, and a filter per table
+    copies the sections of a PID once per table. FilterManager opens one
+    filter per PID, e.g. 0x12 for EIT p/f and schedule of the actual and
+    other TS, reads the sections of it and hands them out to the
+    SharedDemuxes of the tables, which pass only those matching their
+    own filter. The filter of a PID is open while a SharedDemux is set
+    on it, by any collector, and closed when the last one is set to
+    other PID or unregistered. Collectors open and register demuxes here
+    with open_demux() and register().'''
+    def __init__(self, card=0, dev=0):
+        self.card = card
+        self.dev = dev
+        self.poller = poll_loop.PollLoop()
+        self.pid_filters = {}
+        self.read_budget = READ_BUDGET
+        self.num_sections = 0
+        self.num_overflows = 0
+
+    def open_device(self):
+        from demux import Demux
+        return Demux(self.card, self.dev, False)
+
+    def get_num_filters(self):
+        'returns number of filters open on the demux device'
+        return len(self.pid_filters)
+
+    def open_demux(self):
+        return SharedDemux(self)
+
+    def register(self, demux, callback, *args):
+        demux.handler = (callback, args)
+
+    def unregister(self, demux):
+        demux.handler = None
+        demux.stop()
+        self.detach(demux)
+
+    def attach(self, shared, pid):
+        if (shared.pid_filter is not None):
+            if (shared.pid_filter.pid == pid):
+                shared.pid_filter.update()
+                return
+            self.detach(shared)
+        pid_filter = self.pid_filters.get(pid)
+        if (pid_filter is None):
+            pid_filter = PidFilter(self, pid)
+            self.pid_filters[pid] = pid_filter
+            self.poller.register(pid_filter.demux.fileno(),
+                                 poll_loop.POLLIN | poll_loop.POLLERR,
+                                 self.dispatch, pid_filter)
+        shared.pid_filter = pid_filter
+        pid_filter.shared.append(shared)
+        pid_filter.update()
+
+    def detach(self, shared):
+        pid_filter = shared.pid_filter
+        if (pid_filter is None):
+            return
+        shared.stop()
+        shared.pid_filter = None
+        pid_filter.shared.remove(shared)
+        if (len(pid_filter.shared)):
+            pid_filter.update()
+            return
+        # the last one on the PID
+        del self.pid_filters[pid_filter.pid]
+        self.poller.unregister(pid_filter.demux.fileno())
+        pid_filter.demux.stop()
+
+    def dispatch(self, fd, mode, pid_filter):
+        # the device filter has no timeout: POLLERR is an overflow of its
+        # buffer, which the next read() reports with EOVERFLOW and clears.
+        # The timeouts of the tables are kept by the SharedDemuxes.
+        demux = pid_filter.demux
+        ready = []
+        num = 0
+        while (num < self.read_budget):
+            try:
+                raw = demux.read()
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if (e.errno == errno.EOVERFLOW):
+                    # every table of the PID may have lost sections
+                    self.num_overflows += 1
+                    for shared in pid_filter.running:
+                        shared.overflowed = True
+                        if (shared not in ready):
+                            ready.append(shared)
+                    continue
+                break
+            if (not raw):
+                break
+            num += 1
+            # a oneshot filter stops on its section
+            for shared in list(pid_filter.running):
+                section_filter = shared.filter
+                if (not section_filter.match(raw)):
+                    continue
+                section_filter.queue.append(raw)
+                if (shared not in ready):
+                    ready.append(shared)
+                if (section_filter.flags & dvbsi.DMX_ONESHOT):
+                    section_filter.stop()
+        self.num_sections += num
+        if (len(ready) == 0):
+            return
+        now = time.monotonic()
+        for shared in ready:
+            shared.last_time = now
+        for shared in ready:
+            shared.notify(poll_loop.POLLIN)
+
+
+# one FilterManager per demux device
+managers = {}
+
+def get_manager(card, dev):
+    'returns the FilterManager of demux device dev of card'
+    manager = managers.get((card, dev))
+    if (manager is None):
+        manager = FilterManager(card, dev)
+        managers[(card, dev)] = manager
+    return manager
@@ -7,9 +7,18 @@ import logging
 import observer
 import dvbsi
 import install
+import poll_loop
 import dvb
 
 
+# sections of the EITs kept over restarts, next to events.db
+EIT_LOG = "eit.slog"
+# events saved at once, unless a sub_table is completed before
+EVENT_BATCH_SIZE = 256
+# longest time the events wait in the batch
+EVENT_BATCH_MSEC = 1000
+
+
 class StreamSaver:
     def __init__(self):
         self.db = db_center.DbCenter()
@@ -90,11 +99,12 @@ class StreamSaver:
         self.db.commit()
 
     def find_component_tag(self, stream):
-        for raw_dsc in stream.descriptors:
-            if (raw_dsc.tag == dvbsi.DTAG_STREAM_IDENTIFIER):
-                dsc = dvbsi.StreamIdentifierDescriptor(raw_dsc.data)
-                return dsc.component_tag
-        return -1
+        raw_dsc = stream.descriptors.find(dvbsi.DTAG_STREAM_IDENTIFIER)
+        if (raw_dsc is None):
+            return -1
+        dsc = dvbsi.decode_descriptor(raw_dsc,
+                                      dvbsi.StreamIdentifierDescriptor)
+        return dsc.component_tag
 
     def save_audio_stream(self, strm_key, stream):
         codec, num_channel = self.guess_audio_info(stream)
@@ -103,7 +113,8 @@ class StreamSaver:
         editorial_classification = 0    # TODO
         for raw_dsc in stream.descriptors:
             if (raw_dsc.tag == dvbsi.DTAG_ISO_639_LANGUAGE):
-                dsc = dvbsi.Iso639LanguageDescriptor(raw_dsc.data)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.Iso639LanguageDescriptor)
                 for entry in dsc.entries:
                     lang_codes.append(entry)
 
@@ -129,7 +140,8 @@ class StreamSaver:
     def save_dvb_subtitle_stream(self, strm_key, stream):
         for raw_dsc in stream.descriptors:
             if (raw_dsc.tag == dvbsi.DTAG_SUBTITLING):
-                dsc = dvbsi.SubtitlingDescriptor(raw_dsc.data)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.SubtitlingDescriptor)
                 for entry in dsc.entries:
                     self.db.save_dvb_subtitle_stream(strm_key,
                                                      entry.language_code,
@@ -140,7 +152,8 @@ class StreamSaver:
     def save_teletext_stream(self, strm_key, stream):
         for raw_dsc in stream.descriptors:
             if (raw_dsc.tag == dvbsi.DTAG_TELETEXT):
-                dsc = dvbsi.TeletextDescriptor(raw_dsc.data)
+                dsc = dvbsi.decode_descriptor(raw_dsc,
+                                              dvbsi.TeletextDescriptor)
                 for entry in dsc.entries:
                     self.db.save_teletext_stream(strm_key,
                                                  entry.language_code,
@@ -159,6 +172,14 @@ class Monitor(observer.SiObserver, observer.EitObserver, observer.SvcObserver):
         self.si_collector.register_observer(self)
         self.eit_collector = collector.EitCollector()
         self.eit_collector.register_observer(self)
+        # unlike the SI tables of the tuned TS, the EITs are of every TS
+        self.eit_log = dvbsi.SectionLog(EIT_LOG)
+        num = self.eit_collector.restore(self.eit_log)
+        self.eit_log.compact(self.eit_collector.get_tables())
+        self.logger.info("%d EIT sections restored" % num)
+        self.eit_collector.set_section_log(self.eit_log)
+        self.poller = poll_loop.PollLoop()
+        self.event_batch = db_center.EventBatch()
         self.svc_list = svc_list
         self.svc_list.register_observer(self)
         self.cur_service = None
@@ -181,6 +202,10 @@ class Monitor(observer.SiObserver, observer.EitObserver, observer.SvcObserver):
         self.logger.info("stop monitor")
         self.si_collector.stop()
         self.eit_collector.stop()
+        self.flush_events()
+        self.logger.debug("key caches (hits, misses, keys): svc_key %s, "
+                          "ts_key %s, default authority %s" %
+                          self.db.get_cache_stats())
         self.working = False
 
     def tune(self, service):
@@ -198,6 +223,10 @@ class Monitor(observer.SiObserver, observer.EitObserver, observer.SvcObserver):
     def update(self, svc_list, services, cur_service):
         if (self.cur_service != cur_service):
             self.cur_service = cur_service
+            if (cur_service is None):
+                self.eit_collector.set_context(None)
+            else:
+                self.eit_collector.set_context(cur_service.src_key)
             self.start_pmt()
 
     def start_pmt(self):
@@ -248,6 +277,9 @@ class Monitor(observer.SiObserver, observer.EitObserver, observer.SvcObserver):
             self.logger.debug("EIT timeout")
             return
 
+        if (result < 0):
+            return
+
         if (result & (dvbsi.NEW_SECTION | dvbsi.VERSION_CHANGED)):
             tsid = section.transport_stream_id
             onid = section.original_network_id
@@ -274,10 +306,43 @@ class Monitor(observer.SiObserver, observer.EitObserver, observer.SvcObserver):
                 svc_name = self.get_service_name(svc_key)
                 self.logger.debug("%s: EITsch complete svc_table" % svc_name)
 
-            # update events
-            for event in section.events:
-                self.db.save_event(onid, tsid, svid, svc_key,
-                                   section.version_number, event)
+            # update events, unless they are decoded by the parse pool
+            self.start_batch()
+            self.db.add_events(self.event_batch, onid, tsid, svid, svc_key,
+                               section.version_number, section.events)
+            if (result & dvbsi.COMPLETE_SUB_TABLE or
+                len(self.event_batch) >= EVENT_BATCH_SIZE):
+                self.flush_events()
+
+    def start_batch(self):
+        if (len(self.event_batch) == 0):
+            self.poller.register_timer(self.flush_events, EVENT_BATCH_MSEC, 0)
+
+    def flush_events(self):
+        'saves the events in the batch and flushes the EIT log'
+        self.poller.unregister_timer(self.flush_events)
+        if (len(self.event_batch)):
+            self.db.save_event_batch(self.event_batch)
+            self.db.commit()
+            self.event_batch = db_center.EventBatch()
+        self.eit_log.flush()
+
+    def on_eit_records(self, eit_collector, section, records, svc_table,
+                       src_key):
+        # src_key is of the current service when the section was received
+        if (src_key is None):
+            return
+        tsid = section.transport_stream_id
+        onid = section.original_network_id
+        svid = section.service_id
+        svc_key = self.db.get_svc_key(tsid, onid, svid, src_key)
+        if (svc_key is None):
+            return
+        self.start_batch()
+        self.db.add_event_records(self.event_batch, onid, tsid, svid, svc_key,
+                                  section.version_number, records)
+        if (len(self.event_batch) >= EVENT_BATCH_SIZE):
+            self.flush_events()
 
     def on_section(self, si_collector, result, section, sub_table, table):
         if (result == dvbsi.RECEIVING_TIMED_OUT):
@@ -297,19 +362,17 @@ class Monitor(observer.SiObserver, observer.EitObserver, observer.SvcObserver):
                 ts_key = self.cur_service.ts_key
                 time_offset_in_db = self.db.read_time_offset(ts_key)
                 time_offset = 0
-                for dsc in section.descriptors:
-                    if dsc.tag == dvbsi.DTAG_LOCAL_TIME_OFFSET:
-                        # TODO: check country code and region id
-                        lto_dsc = dvbsi.LocalTimeOffsetDescriptor(dsc.data)
-                        if (len(lto_dsc.entries) == 0):
-                            break
+                dsc = section.descriptors.find(dvbsi.DTAG_LOCAL_TIME_OFFSET)
+                if (dsc is not None):
+                    # TODO: check country code and region id
+                    lto_dsc = dvbsi.LocalTimeOffsetDescriptor(dsc.data)
+                    if (len(lto_dsc.entries) != 0):
                         lto = lto_dsc.entries[0]
                         hour = dvbsi.bcd_to_integer(lto.local_time_offset[0])
                         minute = dvbsi.bcd_to_integer(lto.local_time_offset[1])
                         time_offset = (hour * 60 + minute) * 60
                         if (lto.local_time_offset_polarity == 1):
                             time_offset = -time_offset
-                        break
                 if (time_offset != time_offset_in_db):
                     self.db.save_time_offset(ts_key, time_offset)
 
@@ -31,6 +31,8 @@ MONWIN_WIDTH = 20
 FEWIN_WIDTH = 20
 FEWIN_HEIGHT = 2
 SVCWIN_WIDTH = 24
+# the events saved are committed and checkpointed into events.db so often
+CHECKPOINT_MSEC = 30 * 1000
 
 
 class LogContainer(logging.handlers.MemoryHandler, observer.Observable):
@@ -65,7 +67,12 @@ class CursorNavigator():
     def __init__(self):
         self.db = db_center.DbCenter()
         self.poller = poll_loop.PollLoop()
+        # the timers of the scanner and the reservations do not move when
+        # the wall clock is set
+        self.poller.set_monotonic()
         self.poller.register_timer(self.check_status, 1000, 1000)
+        self.poller.register_timer(self.db.checkpoint, CHECKPOINT_MSEC,
+                                   CHECKPOINT_MSEC)
         self.init_logger()
 
         self.fe_list = install.FeList()
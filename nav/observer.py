@@ -27,6 +27,10 @@ class EitObserver():
                        sub_table, svc_table, table):
         pass
 
+    def on_eit_records(self, eit_collector, section, records, svc_table,
+                       context):
+        pass
+
     def on_eit_warning(self, eit_collector, section, string):
         pass
 
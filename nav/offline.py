@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+
+import dvbsi
+import poll_loop
+
+
+class OfflineDemux:
+    '''Demux on a recorded TS file.
+
+    It has the interface of demux.Demux the collectors use, over a section
+    filter of the TsDemux of an OfflineSource. fileno() is a negative
+    number which only identifies the filter; it is not a file descriptor.'''
+    def __init__(self, source, fd):
+        self.source = source
+        self.fd = fd
+        self.filter = source.demux.open_filter()
+        self.pid = -1
+
+    def fileno(self):
+        return self.fd
+
+    def set_blocking(self, blocking):
+        pass
+
+    def start(self):
+        self.filter.start()
+
+    def stop(self):
+        self.filter.stop()
+
+    def set_filter(self, pid, _filter, mask, mode, timeout, flags):
+        self.pid = pid
+        self.filter.set_filter(pid, _filter, mask, mode, timeout, flags)
+
+    def set_buffer_size(self, size):
+        pass
+
+    def read(self, length=4096):
+        section = self.filter.read()
+        if (section is None):
+            raise BlockingIOError()
+        return section
+
+
+class OfflineSource:
+    '''Feeds collectors from a recorded TS file at disk speed.
+
+    The file is memory-mapped and indexed by dvbsi.TsIndex. Collectors
+    given this source with set_ts_source() open OfflineDemuxes instead of
+    demux devices and register them here instead of on the PollLoop.
+    run() walks the file step bytes at a time, reads only the packets of
+    the PIDs some filter is set on, and calls the callbacks of the filters
+    which received sections, as PollLoop would have on POLLIN. Filters
+    started by a callback, e.g. the PMT after the PAT, see the packets
+    from the current step on. At the end of the file every filter still
+    registered gets POLLERR, as on a timeout of the demux device.'''
+    def __init__(self, path, step=188 * 4096):
+        self.index = dvbsi.TsIndex(path)
+        self.demux = dvbsi.TsDemux()
+        self.step = step
+        self.position = 0
+        self.handlers = {}
+        self.last_fd = 0
+        self.stopped = False
+
+    def close(self):
+        self.index.close()
+
+    def open_demux(self):
+        self.last_fd -= 1
+        return OfflineDemux(self, self.last_fd)
+
+    def register(self, demux, callback, *args):
+        self.handlers[demux.fileno()] = (demux, callback, args)
+
+    def unregister(self, demux):
+        self.handlers.pop(demux.fileno(), None)
+
+    def stop(self):
+        self.stopped = True
+
+    def dispatch(self):
+        for fd, (demux, callback, args) in list(self.handlers.items()):
+            while (len(demux.filter.queue) and
+                   self.handlers.get(fd) is not None):
+                callback(fd, poll_loop.POLLIN, demux, *args)
+
+    def run(self):
+        'returns True if the whole file was read'
+        size = self.index.size
+        while (self.stopped is False and self.position < size):
+            end = self.position + self.step
+            self.index.feed(self.demux, self.position, end)
+            self.position = end
+            self.dispatch()
+        if (self.stopped):
+            return False
+        for fd, (demux, callback, args) in list(self.handlers.items()):
+            if (self.handlers.get(fd) is not None):
+                callback(fd, poll_loop.POLLERR, demux, *args)
+        return True
@@ -1,13 +1,20 @@
+import os
 import select
 import sys
 import errno
 import time
 import copy
+import collections
+import heapq
 
 POLLIN = select.POLLIN
 POLLOUT = select.POLLOUT
 POLLERR = select.POLLERR
 
+# index of the fields of a timer in the heap
+_EXPIRE = 0
+_CALLBACK = 2
+
 class PollLoop:
     class __impl:
         """ Implementation of the singleton interface """
@@ -16,11 +23,20 @@ class PollLoop:
             self.pollfds = select.poll()
             self.stopped = False
             self.callbacks = {}
-            self.timers = []
-            self.cur_time = time.time()
+            # a timer is [expire, seq, callback, interval_msec, args, kwargs]
+            # in timer_heap, ordered by expire; timers maps callback to it.
+            # A cancelled timer stays in the heap with callback None.
+            self.timers = {}
+            self.timer_heap = []
+            self.timer_seq = 0
+            self.num_cancelled = 0
+            self.clock = time.time
+            self.cur_time = self.clock()
             self.current_timer = None
             self.timer_changed = False
             self.resizer = None
+            # (read fd, write fd) of the pipe stop() wakes run() up with
+            self.wakeup = None
 
         def register_resizer(self, resizer):
             self.resizer = resizer
@@ -36,70 +52,133 @@ class PollLoop:
                 callback, args, kwargs = self.callbacks.pop(fd)
                 del callback, args, kwargs
 
+        def set_monotonic(self, monotonic=True):
+            '''measures timers with time.monotonic(), which does not jump
+            when the wall clock is set, instead of time.time()'''
+            if (monotonic):
+                clock = time.monotonic
+            else:
+                clock = time.time
+            if (clock is self.clock):
+                return
+            # shifting every timer keeps the heap in order
+            offset = clock() - self.clock()
+            for timer in self.timer_heap:
+                timer[_EXPIRE] += offset
+            self.clock = clock
+            self.cur_time = clock()
+
+        def _push_timer(self, callback, expire, interval_msec, args, kwargs):
+            self.timer_seq += 1
+            timer = [expire, self.timer_seq, callback, interval_msec,
+                     args, kwargs]
+            self.timers[callback] = timer
+            heapq.heappush(self.timer_heap, timer)
+
+        def _cancel_timer(self, callback):
+            timer = self.timers.pop(callback, None)
+            if (timer is None):
+                return False
+            timer[_CALLBACK] = None
+            self.num_cancelled += 1
+            if (self.num_cancelled > 64 and
+                self.num_cancelled > len(self.timer_heap) // 2):
+                # in place, as run_timer() may be looping over the heap
+                heap = self.timer_heap
+                heap[:] = [t for t in heap if t[_CALLBACK] is not None]
+                heapq.heapify(heap)
+                self.num_cancelled = 0
+            return True
+
         def register_timer(self, callback, after_msec, interval_msec,
                            *args, **kwargs):
             if (after_msec <= 0):
                 return
-            next_expire = time.time() + after_msec / 1000
-            new_timer = (callback, next_expire, interval_msec, args, kwargs)
-            for i in range(0, len(self.timers)):
-                timer = self.timers[i]
-                if (timer is None):
-                    continue
-                if (callback == timer[0]):
-                    self.timers[i] = new_timer
-                    if (callback == self.current_timer):
-                        self.timer_changed = True
-                    return
-            self.timers.append(new_timer)
+            self._cancel_timer(callback)
+            if (callback == self.current_timer):
+                self.timer_changed = True
+            self._push_timer(callback, self.clock() + after_msec / 1000,
+                             interval_msec, args, kwargs)
 
         def unregister_timer(self, callback):
-            for i in range(0, len(self.timers)):
-                timer = self.timers[i]
-                if (timer is None):
-                    continue
-                if (callback == timer[0]):
-                    self.timers.pop(i)
-                    if (callback == self.current_timer):
-                        self.timer_changed = True
-                    return
+            if (callback == self.current_timer):
+                self.timer_changed = True
+            self._cancel_timer(callback)
+
+        def _drop_cancelled(self):
+            heap = self.timer_heap
+            while (heap and heap[0][_CALLBACK] is None):
+                heapq.heappop(heap)
+                self.num_cancelled -= 1
+
+        def get_poll_timeout(self):
+            '''returns msec to wait in poll until the next timer expires,
+            -1 if there is no timer'''
+            self._drop_cancelled()
+            if (len(self.timer_heap) == 0):
+                return -1
+            delay = self.timer_heap[0][_EXPIRE] - self.clock()
+            if (delay <= 0):
+                return 0
+            # round up not to wake before the timer expires
+            return int(delay * 1000) + 1
+
+        def open_wakeup(self):
+            '''registers the pipe stop() writes to. A signal handler does
+            not end a wait in poll, which is resumed after it, so stop()
+            from a signal handler needs it'''
+            if (self.wakeup is not None):
+                return
+            self.wakeup = os.pipe()
+            for fd in self.wakeup:
+                os.set_blocking(fd, False)
+            self.register(self.wakeup[0], POLLIN, self.drain_wakeup)
+
+        def drain_wakeup(self, fd, mode):
+            try:
+                while (os.read(fd, 64)):
+                    pass
+            except BlockingIOError:
+                pass
 
         def run_timer(self):
-            cur_time = time.time()
-            run = True
-            while (run):
-                run = False
-                for i in range(0, len(self.timers)):
-                    timer = self.timers[i]
-                    callback, next_expire, interval_msec, args, kwargs = timer
-                    if (next_expire <= cur_time):
-                        self.timer_changed = False
-                        self.current_timer = callback
-                        callback(*args, **kwargs)
-                        self.current_timer = None
-                        run = True
-                        if (self.timer_changed == False):
-                            if (interval_msec):
-                                self.timers[i] = timer
-                                cur_time = time.time()
-                                next_expire = cur_time + interval_msec / 1000
-                                timer = (callback, next_expire, interval_msec,
-                                         args, kwargs)
-                                self.timers[i] = timer
-                            else:
-                                self.timers.pop(i)
-                        break
+            # the timers expired by now run once each, even if rearmed
+            # with an interval shorter than the time they take
+            cur_time = self.clock()
+            self.cur_time = cur_time
+            heap = self.timer_heap
+            while (heap):
+                timer = heap[0]
+                if (timer[_CALLBACK] is None):
+                    heapq.heappop(heap)
+                    self.num_cancelled -= 1
+                    continue
+                if (timer[_EXPIRE] > cur_time):
+                    break
+                heapq.heappop(heap)
+                expire, seq, callback, interval_msec, args, kwargs = timer
+                del self.timers[callback]
+                self.timer_changed = False
+                self.current_timer = callback
+                callback(*args, **kwargs)
+                self.current_timer = None
+                if (self.timer_changed == False and interval_msec):
+                    self._push_timer(callback,
+                                     self.clock() + interval_msec / 1000,
+                                     interval_msec, args, kwargs)
 
         def run(self):
+            self.open_wakeup()
             while (self.stopped == False):
                 try:
-                    ready = self.pollfds.poll(100)
-                    if (len(ready) != 0):
-                        # process only the first one
-                        fd, mode = ready[0]
-                        callback, args, kwargs = self.callbacks.get(fd)
-                        if (callback):
-                            callback(fd, mode, *args, **kwargs)
+                    ready = self.pollfds.poll(self.get_poll_timeout())
+                    for fd, mode in ready:
+                        handler = self.callbacks.get(fd)
+                        if (handler is None):
+                            # unregistered by a callback before
+                            continue
+                        callback, args, kwargs = handler
+                        callback(fd, mode, *args, **kwargs)
 
                     self.run_timer()
                 except select.error:
@@ -109,10 +188,124 @@ class PollLoop:
 
         def stop(self):
             self.stopped = True
+            if (self.wakeup is not None):
+                try:
+                    os.write(self.wakeup[1], b"\0")
+                except BlockingIOError:
+                    # the pipe is full of wakeups already
+                    pass
+
+    class __epoll_impl(__impl):
+        '''Implementation on an edge-triggered select.epoll.
+
+        A wakeup costs the number of ready fds, not the number of fds
+        registered, which matters with a section filter per table and
+        service. An fd is reported again only after new data comes, so
+        after its callback the fd is probed with a poll(0) of its own and
+        queued again if the callback left something to read, e.g. when
+        a collector stopped at its read budget. Ready fds are dispatched
+        round robin, one callback each per turn, so that a busy filter
+        does not starve the others.'''
+
+        def __init__(self):
+            super().__init__()
+            self.pollfds = select.epoll()
+            self.probes = {}
+            self.ready = collections.deque()
+            # fd to the mode it is queued in ready with
+            self.modes = {}
+
+        def register(self, fd, mode, callback, *args, **kwargs):
+            try:
+                self.pollfds.register(fd, mode | select.EPOLLET)
+            except FileExistsError:
+                self.pollfds.modify(fd, mode | select.EPOLLET)
+            probe = select.poll()
+            probe.register(fd, mode)
+            self.probes[fd] = probe
+            self.callbacks[fd] = (callback, args, kwargs)
+            return fd
+
+        def unregister(self, fd):
+            if (self.callbacks.get(fd)):
+                try:
+                    self.pollfds.unregister(fd)
+                except OSError:
+                    # closed before, epoll has forgotten it
+                    pass
+                callback, args, kwargs = self.callbacks.pop(fd)
+                del callback, args, kwargs
+                del self.probes[fd]
+                self.modes.pop(fd, None)
+
+        def queue(self, fd, probe):
+            'queues fd if probe finds it ready'
+            ready = probe.poll(0)
+            if (ready and fd not in self.modes):
+                self.modes[fd] = ready[0][1]
+                self.ready.append(fd)
+
+        def dispatch(self):
+            'calls the callbacks of the fds queued before this call'
+            ready = self.ready
+            modes = self.modes
+            for n in range(len(ready)):
+                fd = ready.popleft()
+                mode = modes.pop(fd, None)
+                if (mode is None):
+                    # unregistered by a callback before
+                    continue
+                callback, args, kwargs = self.callbacks[fd]
+                callback(fd, mode, *args, **kwargs)
+                probe = self.probes.get(fd)
+                if (probe is not None and
+                    mode & (POLLIN | POLLOUT)):
+                    self.queue(fd, probe)
+
+        def run(self):
+            ready = self.ready
+            modes = self.modes
+            self.open_wakeup()
+            while (self.stopped == False):
+                try:
+                    if (ready):
+                        timeout = 0
+                    else:
+                        timeout = self.get_poll_timeout()
+                        if (timeout < 0):
+                            timeout = None
+                        else:
+                            timeout /= 1000
+                    for fd, mode in self.pollfds.poll(timeout):
+                        if (fd in modes):
+                            modes[fd] |= mode
+                        elif (fd in self.callbacks):
+                            modes[fd] = mode
+                            ready.append(fd)
+                    self.dispatch()
+
+                    self.run_timer()
+                except select.error:
+                    if (self.resizer):
+                        self.resizer()
+                    continue
 
     # storage for the instance reference
     __instance = None
 
+    @staticmethod
+    def set_instance(impl):
+        '''makes impl, e.g. aio_loop.AsyncioLoop, the implementation of
+        every PollLoop() made after this call'''
+        PollLoop.__instance = impl
+
+    @staticmethod
+    def use_epoll():
+        '''makes every PollLoop() made after this call run on an
+        edge-triggered epoll, for many fds. returns the implementation'''
+        PollLoop.__instance = PollLoop.__epoll_impl()
+        return PollLoop.__instance
+
     def __init__(self):
         """ Create singleton instance """
         # Check whether we already have an instance
@@ -176,7 +176,7 @@ class Scanner(observer.SiObserver):
     def create_tp(self, dsc, ts_key, src_key):
         if (dsc.tag == dvbsi.DTAG_SATELLITE_DELIVERY_SYSTEM):
             tp = dvb.TsSat(ts_key, src_key)
-        elif (dsc.tag == dvbsi.DTAG_SATELLITE_DELIVERY_SYSTEM):
+        elif (dsc.tag == dvbsi.DTAG_TERRESTRIAL_DELIVERY_SYSTEM):
             tp = dvb.TsTer(ts_key, src_key)
         else:
             return None
@@ -198,8 +198,11 @@ class Scanner(observer.SiObserver):
                         if (dsc_parser is None):
                             continue
                         dsc = dsc_parser(raw_dsc.data)
-                        dsc.src_key = self.cur_tp.src_key
-                        if (self.cur_tp.is_the_same_as(dsc)):
+                        tp = self.create_tp(dsc, 0, self.cur_tp.src_key)
+                        if (tp is None):
+                            continue
+                        tp.copy_tuning_param(dsc)
+                        if (self.cur_tp.is_the_same_as(tp)):
                             need_to_check = True
                             break
         if (need_to_check is False):
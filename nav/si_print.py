@@ -20,11 +20,10 @@ def hexdump(indent, prefix, src, length=16):
 def print_descriptors(indent, descriptors):
     space = "    " * indent
     for raw_dsc in descriptors:
-        dsc_parser = dvbsi.DESCRIPTOR_MAP.get(raw_dsc.tag)
-        if (dsc_parser is None):
+        dsc = dvbsi.decode_descriptor(raw_dsc)
+        if (dsc is None):
             print(space + raw_dsc.__str__())
         else:
-            dsc = dsc_parser(raw_dsc.data)
             for line in dsc.__str__().splitlines():
                 print(space + line)
         print(hexdump(indent, " ", raw_dsc.data))
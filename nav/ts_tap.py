@@ -0,0 +1,213 @@
+#! /usr/bin/env python3
+
+import errno
+import time
+
+import dvbsi
+import poll_loop
+from demux import Demux
+from offline import OfflineDemux
+
+
+# values of linux/dvb/dmx.h
+DMX_IN_FRONTEND = 0
+DMX_OUT_TSDEMUX_TAP = 3
+DMX_PES_OTHER = 20
+# PID of a PES filter passing every packet of the TS
+WHOLE_TS_PID = 0x2000
+
+TS_BUFFER_SIZE = dvbsi.TS_PACKET_SIZE * 8192
+READ_SIZE = dvbsi.TS_PACKET_SIZE * 512
+# reads of a tap at most on a wakeup
+READ_BUDGET = 16
+
+
+class TapDemux(OfflineDemux):
+    '''OfflineDemux of a TapSource.
+
+    The timeout of set_filter() is kept with a timer of the PollLoop, as
+    on the demux device: POLLERR comes when no section passed the filter
+    for timeout msec after start().'''
+    def __init__(self, source, fd):
+        OfflineDemux.__init__(self, source, fd)
+        self.timeout = 0
+        self.last_time = 0
+
+    def set_filter(self, pid, _filter, mask, mode, timeout, flags):
+        if (pid != self.pid):
+            self.source.add_pid(pid)
+            if (self.pid >= 0):
+                self.source.remove_pid(self.pid)
+        self.timeout = timeout
+        self.pid = pid
+        self.filter.set_filter(pid, _filter, mask, mode, timeout,
+                               flags & ~dvbsi.DMX_IMMEDIATE_START)
+        if (flags & dvbsi.DMX_IMMEDIATE_START):
+            self.start()
+
+    def start(self):
+        self.filter.start()
+        self.last_time = time.monotonic()
+        if (self.timeout):
+            self.source.poller.register_timer(self.check_timeout,
+                                              self.timeout, 0)
+
+    def stop(self):
+        self.filter.stop()
+        self.filter.queue.clear()
+        if (self.timeout):
+            self.source.poller.unregister_timer(self.check_timeout)
+
+    def check_timeout(self):
+        if (not self.filter.running):
+            # a oneshot filter got its section
+            return
+        left = self.timeout - (time.monotonic() - self.last_time) * 1000
+        if (left > 0):
+            self.source.poller.register_timer(self.check_timeout,
+                                              int(left) + 1, 0)
+            return
+        self.source.notify(self, poll_loop.POLLERR)
+
+
+class TapSource:
+    '''Feeds collectors from TS packets tapped from the demux device.
+
+    Instead of a section filter of the device per table, a PES filter
+    passes the TS packets of each PID some filter is set on, or of the
+    whole TS with whole_ts, to the demux fd. The sections are
+    reassembled and filtered here by dvbsi.TsDemux, with the filter, mask
+    and mode of Demux.set_filter(), so one process can watch every SI
+    table of a mux however few filters the adapter has. Give it to the
+    collectors with set_ts_source(); they open TapDemuxes on it.
+
+    A whole TS tap costs the reading of every packet of the mux, most of
+    which are skipped; taps per PID cost a filter of the device per PID.'''
+    def __init__(self, card=0, dev=0, whole_ts=False):
+        self.card = card
+        self.dev = dev
+        self.whole_ts = whole_ts
+        self.poller = poll_loop.PollLoop()
+        self.demux = dvbsi.TsDemux()
+        self.handlers = {}
+        self.last_fd = 0
+        self.pids = {}          # PID to number of filters set on it
+        self.taps = {}          # PID to Demux tapping it
+        self.rests = {}         # fd of tap to bytes of a partial packet
+        self.num_overflows = 0
+
+    def close(self):
+        for pid in list(self.taps):
+            self.close_tap(pid)
+        self.pids = {}
+
+    def open_tap(self, pid):
+        tap = Demux(self.card, self.dev, False)
+        tap.set_buffer_size(TS_BUFFER_SIZE)
+        tap.set_pes_filter(pid, DMX_IN_FRONTEND, DMX_OUT_TSDEMUX_TAP,
+                           DMX_PES_OTHER, dvbsi.DMX_IMMEDIATE_START)
+        self.taps[pid] = tap
+        self.rests[tap.fileno()] = b""
+        self.poller.register(tap.fileno(),
+                             poll_loop.POLLIN | poll_loop.POLLERR,
+                             self.process_tap, tap)
+
+    def close_tap(self, pid):
+        tap = self.taps.pop(pid)
+        self.poller.unregister(tap.fileno())
+        del self.rests[tap.fileno()]
+        tap.stop()
+
+    def add_pid(self, pid):
+        num = self.pids.get(pid, 0)
+        self.pids[pid] = num + 1
+        if (self.whole_ts):
+            pid = WHOLE_TS_PID
+        if (pid not in self.taps):
+            self.open_tap(pid)
+
+    def remove_pid(self, pid):
+        num = self.pids.pop(pid) - 1
+        if (num):
+            self.pids[pid] = num
+        elif (not self.whole_ts):
+            self.close_tap(pid)
+        if (len(self.pids) == 0 and WHOLE_TS_PID in self.taps):
+            self.close_tap(WHOLE_TS_PID)
+
+    def open_demux(self):
+        self.last_fd -= 1
+        return TapDemux(self, self.last_fd)
+
+    def register(self, demux, callback, *args):
+        self.handlers[demux.fileno()] = (demux, callback, args)
+
+    def unregister(self, demux):
+        self.handlers.pop(demux.fileno(), None)
+        demux.stop()
+        if (demux.pid >= 0):
+            self.remove_pid(demux.pid)
+            demux.pid = -1
+
+    def notify(self, demux, mode):
+        handler = self.handlers.get(demux.fileno())
+        if (handler is not None):
+            demux, callback, args = handler
+            callback(demux.fileno(), mode, demux, *args)
+
+    def process_tap(self, fd, mode, tap):
+        if (mode & poll_loop.POLLERR and not mode & poll_loop.POLLIN):
+            return
+        chunks = []
+        num_sections = 0
+        for n in range(READ_BUDGET):
+            try:
+                chunk = tap.read(READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if (e.errno == errno.EOVERFLOW):
+                    # packets are lost after the chunks read so far; drop
+                    # the sections being reassembled on the PIDs of the tap
+                    self.num_overflows += 1
+                    num_sections += self.feed(fd, chunks)
+                    chunks = []
+                    self.rests[fd] = b""
+                    self.demux.reset(self.get_tap_pids(tap))
+                    continue
+                break
+            if (not chunk):
+                break
+            chunks.append(chunk)
+        num_sections += self.feed(fd, chunks)
+        if (num_sections):
+            self.dispatch()
+
+    def feed(self, fd, chunks):
+        '''feeds the chunks read from the tap of fd to the demux. returns
+        the number of sections delivered'''
+        data = self.rests[fd] + b"".join(chunks)
+        # keep a partial packet for the next read of this tap
+        end = len(data) - len(data) % dvbsi.TS_PACKET_SIZE
+        self.rests[fd] = data[end:]
+        if (end == 0):
+            return 0
+        return self.demux.feed(data[:end])
+
+    def get_tap_pids(self, tap):
+        '''returns the PIDs tapped by tap, or None for the whole TS, i.e.
+        every PID'''
+        pids = [pid for pid, t in self.taps.items() if t is tap]
+        if (WHOLE_TS_PID in pids):
+            return None
+        return pids
+
+    def dispatch(self):
+        now = time.monotonic()
+        for fd, (demux, callback, args) in list(self.handlers.items()):
+            if (len(demux.filter.queue) == 0):
+                continue
+            demux.last_time = now
+            while (len(demux.filter.queue) and
+                   self.handlers.get(fd) is not None):
+                callback(fd, poll_loop.POLLIN, demux, *args)
@@ -0,0 +1,165 @@
+"""Query plans and latency of the hot queries of db_center on a large EPG.
+
+Makes the databases of nav in a temporary directory and loads a synthetic
+EPG of num_events events with texts, program and series CRIDs, over 200
+services, and a few schedules. Each hot method is run once with its
+statements recorded, and EXPLAIN QUERY PLAN of every one of them must
+search the tables with an index, not scan them. Then the median time of
+a call must be within the budget of the method.
+
+    python bench_db_index.py [num_events]
+"""
+
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+NAV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../nav")
+sys.path.insert(0, NAV_PATH)
+
+import db_center
+import db_index
+import evtwin
+
+
+NUM_TRANSPORTS = 20
+SVCS_PER_TS = 10
+# events of a program CRID, i.e. its alternatives
+EVENTS_PER_PROGRAM = 8
+EVENTS_PER_SERIES = 40
+START_TIME = 1500000000
+DURATION = 1800
+NUM_CALLS = 50
+
+# median msec a call may take
+BUDGETS = {
+    "read_events_of_service": 2.0,
+    "get_ts_key": 0.2,
+    "get_svc_key": 0.2,
+    "get_alternatives_of_program": 2.0,
+    "get_prog_crid_list_of_series": 2.0,
+    "read_schedule_of_period": 1.0,
+    "is_moment_scheduled": 0.2,
+}
+
+
+def load_epg(db, num_events):
+    "fills the databases of db with a synthetic EPG"
+    c = db.connection.cursor()
+    # src_key 1 is of the sources the schema makes
+    c.execute("insert or ignore into networks (nid, net_name) "
+              "values (1, 'bench')")
+    for ts in range(NUM_TRANSPORTS):
+        c.execute("insert into transports (ts_key, nid, tsid, onid, src_key) "
+                  "values (?, 1, ?, 1, 1)", [ts + 1, ts + 1])
+        for n in range(SVCS_PER_TS):
+            svc_key = ts * SVCS_PER_TS + n + 1
+            c.execute("insert into services (svc_key, ts_key, svid, type, "
+                      "svc_name) values (?, ?, ?, 1, ?)",
+                      [svc_key, ts + 1, n + 1, "Service %d" % svc_key])
+    num_services = NUM_TRANSPORTS * SVCS_PER_TS
+    per_service = num_events // num_services
+
+    def events():
+        for evt_key in range(1, num_events + 1):
+            svc_key = (evt_key - 1) // per_service + 1
+            start_time = START_TIME + ((evt_key - 1) % per_service) * DURATION
+            yield (evt_key, svc_key, evt_key & 0xffff, start_time,
+                   start_time + DURATION)
+    c.executemany("insert into events (evt_key, svc_key, evid, start_time, "
+                  "end_time, version_number) values (?, ?, ?, ?, ?, 0)",
+                  events())
+    c.executemany("insert into event_texts (evt_key, lang, evt_name, "
+                  "short_text) values (?, 'eng', ?, ?)",
+                  ((evt_key, "Programme %d" % evt_key,
+                    "Synopsis of programme %d" % evt_key)
+                   for evt_key in range(1, num_events + 1)))
+    num_programs = num_events // EVENTS_PER_PROGRAM
+    c.executemany("insert into programs (evt_key, prog_crid, imi, season, "
+                  "episode, total_episodes) values (?, ?, '', 0, 0, 0)",
+                  ((evt_key, "bench/p%d" % (evt_key % num_programs))
+                   for evt_key in range(1, num_events + 1)))
+    c.executemany("insert into series_crids (evt_key, series_crid) "
+                  "values (?, ?)",
+                  ((evt_key, "bench/s%d" % (evt_key % num_programs //
+                                            EVENTS_PER_SERIES))
+                   for evt_key in range(1, num_events + 1)))
+    c.executemany("insert into schedules (sched_name, action, start_time, "
+                  "end_time, svc_key) values ('bench', 1, ?, ?, ?)",
+                  ((START_TIME + n * DURATION, START_TIME + (n + 1) * DURATION,
+                    n % num_services + 1) for n in range(1000)))
+    db.commit()
+    db.checkpoint()
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tmp_dir = tempfile.mkdtemp()
+    for name in ("install", "services", "events", "settings"):
+        shutil.copy(os.path.join(NAV_PATH, name + ".sql"), tmp_dir)
+    cwd = os.getcwd()
+    os.chdir(tmp_dir)
+    try:
+        db = db_center.DbCenter()
+        t = time.perf_counter()
+        load_epg(db, num_events)
+        print("%d events loaded in %.1f s" % (num_events,
+                                              time.perf_counter() - t))
+        failed = run(db)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir)
+    sys.exit(1 if failed else 0)
+
+
+def run(db):
+    service = db.read_all_services()[77]
+    view = types.SimpleNamespace(connection=db.connection,
+                                 left_sec=START_TIME + 100 * DURATION,
+                                 width=120)
+    moment = START_TIME + 500 * DURATION + 60
+    calls = {
+        "read_events_of_service":
+            lambda: evtwin.EvtWin.read_events_of_service(view, service),
+        "get_ts_key": lambda: db.get_ts_key(13, 1, 1, 1),
+        "get_svc_key": lambda: db.get_svc_key(13, 1, 7, 1),
+        "get_alternatives_of_program":
+            lambda: db.get_alternatives_of_program("bench/p1234"),
+        "get_prog_crid_list_of_series":
+            lambda: db.get_prog_crid_list_of_series("bench/s123"),
+        "read_schedule_of_period":
+            lambda: db.read_schedule_of_period(
+                1, 101, START_TIME + 500 * DURATION,
+                START_TIME + 501 * DURATION),
+        "is_moment_scheduled":
+            lambda: db.is_moment_scheduled(1, 101, moment),
+    }
+    failed = False
+    print("%-30s %10s %10s" % ("query", "msec", "budget"))
+    for name, call in calls.items():
+        with db_index.QueryRecorder(db.connection) as recorder:
+            call()
+        for statement, steps in recorder.get_full_scans():
+            print("%s scans: %s\n    %s" % (name, ", ".join(steps),
+                                           " ".join(statement.split())))
+            failed = True
+        times = []
+        for n in range(NUM_CALLS):
+            t = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - t)
+        msec = statistics.median(times) * 1000
+        budget = BUDGETS[name]
+        print("%-30s %10.3f %10.3f%s" % (name, msec, budget,
+                                         "" if msec <= budget else " OVER"))
+        if (msec > budget):
+            failed = True
+    return failed
+
+
+if __name__ == "__main__":
+    main()
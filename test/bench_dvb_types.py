@@ -0,0 +1,125 @@
+"""Speed of the DVB time conversions.
+
+Converts the start time and duration of every event of a synthetic corpus
+(8 days of 30 minute events from many services, as start_time + duration
+records of the EIT event loop) with the table based functions of
+dvbsi.dvb_types and with the nibble loop implementation they replaced.
+
+    python bench_dvb_types.py [num_events]
+"""
+
+import datetime
+import struct
+import sys
+import time
+
+sys.path.append("..")
+
+import dvbsi
+
+
+MJD_START = 0xdc2e
+
+
+# the implementation before the BCD table and the mjd memo
+def old_bcd_to_integer(bcdval):
+    val = 0
+    for i in range(28, -1, -4):
+        val += ((bcdval >> i) & 0x0f)
+        if (i != 0):
+            val *= 10
+    return val
+
+def old_dvbduration_to_seconds(dvbduration):
+    seconds = 0
+    seconds += old_bcd_to_integer(dvbduration[0]) * 60 * 60
+    seconds += old_bcd_to_integer(dvbduration[1]) * 60
+    seconds += old_bcd_to_integer(dvbduration[2])
+    return seconds
+
+def old_mjd_to_ymdwd(mjd):
+    return dvbsi.dvb_types._mjd_to_ymdwd(mjd)
+
+def old_dvbdate_to_datetime(dvbdate):
+    mjd = (dvbdate[0] << 8) | dvbdate[1]
+    year, month, day, wday = old_mjd_to_ymdwd(mjd)
+    year += 1900
+    hour = old_bcd_to_integer(dvbdate[2])
+    if (hour > 23):
+        hour = 23
+    minute = old_bcd_to_integer(dvbdate[3])
+    if (minute > 59):
+        minute = 59
+    second = old_bcd_to_integer(dvbdate[4])
+    if (second > 59):
+        second = 59
+    return datetime.datetime(year, month, day, hour, minute, second)
+
+def old_dvbdate_to_unixtime(dvbdate):
+    mjd = (dvbdate[0] << 8) | dvbdate[1]
+    hour = old_bcd_to_integer(dvbdate[2])
+    minute = old_bcd_to_integer(dvbdate[3])
+    second = old_bcd_to_integer(dvbdate[4])
+    return ((mjd - 40587) * 86400 + hour * 3600 + minute * 60 + second)
+
+
+def make_corpus(num_events):
+    "makes num_events start_time + duration records"
+    records = []
+    for n in range(8 * 48):
+        hour, minute = (n % 48) // 2, (n % 2) * 30
+        records.append(struct.pack(">HBBBBBB", MJD_START + n // 48,
+                                   (hour // 10) << 4 | hour % 10,
+                                   (minute // 10) << 4 | minute % 10, 0,
+                                   0x00, 0x30, 0x00))
+    return [records[n % len(records)] for n in range(num_events)]
+
+
+def run(name, func, corpus):
+    t = time.perf_counter()
+    func(corpus)
+    elapsed = time.perf_counter() - t
+    print("%-34s %7.2f s, %5.2f us/event" % (
+          name, elapsed, elapsed * 1e6 / len(corpus)))
+    return elapsed
+
+
+def old_unixtime(corpus):
+    for rec in corpus:
+        start = old_dvbdate_to_unixtime(rec[0:5])
+        end = start + old_dvbduration_to_seconds(rec[5:8])
+
+def new_unixtime(corpus):
+    for rec in corpus:
+        start = dvbsi.dvbdate_to_unixtime(rec[0:5])
+        end = start + dvbsi.dvbduration_to_seconds(rec[5:8])
+
+def new_start_duration(corpus):
+    parse_start_duration = dvbsi.parse_start_duration
+    for rec in corpus:
+        start, end = parse_start_duration(rec, 0)
+
+def old_datetime(corpus):
+    for rec in corpus:
+        old_dvbdate_to_datetime(rec)
+
+def new_datetime(corpus):
+    for rec in corpus:
+        dvbsi.dvbdate_to_datetime(rec)
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    corpus = make_corpus(num_events)
+    print("%d events" % num_events)
+    old = run("dvbdate_to_unixtime (old)", old_unixtime, corpus)
+    new = run("dvbdate_to_unixtime", new_unixtime, corpus)
+    fast = run("parse_start_duration", new_start_duration, corpus)
+    print("    x%.1f, x%.1f" % (old / new, old / fast))
+    old = run("dvbdate_to_datetime (old)", old_datetime, corpus)
+    new = run("dvbdate_to_datetime", new_datetime, corpus)
+    print("    x%.1f" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Memory footprint of a parsed full EIT schedule.
+
+Builds a synthetic EIT schedule corpus (every service, 8 days, 30 minute
+events with a short event descriptor each), parses every section, decodes
+every event and its short event descriptor, and reports the memory held by
+the resulting objects as measured by tracemalloc.
+
+The same corpus is parsed once more by a copy of dvbsi with the __slots__
+declarations stripped, so the two numbers show what the slots save.
+
+    python bench_memory.py [num_services]
+"""
+
+import os
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.environ.get("DVBSI_PATH", ".."))
+
+import dvbsi
+
+
+NUM_DAYS = 8
+EVENTS_PER_SECTION = 2
+MJD_START = 0xdc2e
+
+
+def make_schedule(service_id, table_id, events):
+    "makes EIT schedule sections of one service"
+    sections = []
+    num_sections = ((len(events) + EVENTS_PER_SECTION - 1) //
+                    EVENTS_PER_SECTION)
+    last_section_number = min(num_sections, 256) - 1
+    for section_number in range(last_section_number + 1):
+        first = section_number * EVENTS_PER_SECTION
+        body = b"".join(events[first:first + EVENTS_PER_SECTION])
+        length = 11 + len(body) + 4
+        buf = struct.pack(">BHHBBBHHBB", table_id, 0xb000 | length,
+                          service_id, 0xc3, section_number,
+                          last_section_number, 0x0001, 0x0002,
+                          section_number | 0x07, table_id) + body
+        sections.append(buf + struct.pack(">I", dvbsi.crc32(buf)))
+    return sections
+
+
+def make_event(event_id, mjd, hour, minute):
+    "makes one event loop entry with a short event descriptor"
+    name = b"Programme %5d" % event_id
+    text = b"Synopsis of programme %d, lorem ipsum dolor sit amet" % event_id
+    dsc = struct.pack(">BB3sB", 0x4d, 5 + len(name) + len(text), b"eng",
+                      len(name)) + name + struct.pack("B", len(text)) + text
+    start = struct.pack(">HBBB", mjd, (hour // 10) << 4 | hour % 10,
+                        (minute // 10) << 4 | minute % 10, 0)
+    return struct.pack(">H5s3sH", event_id, start, b"\x00\x30\x00",
+                       0x8000 | len(dsc)) + dsc
+
+
+def make_corpus(num_services):
+    "makes EIT schedule sections of num_services services"
+    corpus = []
+    for service_id in range(1, num_services + 1):
+        events = []
+        for day in range(NUM_DAYS):
+            for half_hour in range(48):
+                events.append(make_event(len(events), MJD_START + day,
+                                         half_hour // 2, (half_hour % 2) * 30))
+        # 4 days per table_id as in the real schedule
+        per_table = 4 * 48
+        for t in range(NUM_DAYS // 4):
+            corpus += make_schedule(service_id, 0x50 + t,
+                                    events[t * per_table:(t + 1) * per_table])
+    return corpus
+
+
+def parse(corpus):
+    "parses every section, event and short event descriptor of corpus"
+    sections = []
+    dscs = []
+    for buf in corpus:
+        sec = dvbsi.EitSection(buf)
+        sec.decode()
+        for event in sec.events:
+            dscs += [dvbsi.ShortEventDescriptor(raw.data)
+                     for raw in event.descriptors]
+        sections.append(sec)
+    return sections, dscs
+
+
+def measure(num_services):
+    corpus = make_corpus(num_services)
+    tracemalloc.start()
+    sections, dscs = parse(corpus)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    num_events = sum([len(sec.events) for sec in sections])
+    return len(sections), num_events, current
+
+
+def strip_slots(dst):
+    "copies dvbsi to dst with the __slots__ declarations removed"
+    src = os.path.dirname(os.path.abspath(dvbsi.__file__))
+    pkg = os.path.join(dst, "dvbsi")
+    shutil.copytree(src, pkg, ignore=shutil.ignore_patterns("__pycache__"))
+    for name in os.listdir(pkg):
+        if (not name.endswith(".py")):
+            continue
+        path = os.path.join(pkg, name)
+        with open(path) as f:
+            text = f.read()
+        text = re.sub(r"^[ \t]*__slots__ = \([^)]*\)\n", "", text,
+                      flags=re.M)
+        with open(path, "w") as f:
+            f.write(text)
+
+
+def main():
+    num_services = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    if (os.environ.get("DVBSI_PATH")):
+        print("%d %d %d" % measure(num_services))
+        return
+
+    num_sections, num_events, current = measure(num_services)
+    print("%d services, %d sections, %d events" % (
+          num_services, num_sections, num_events))
+    print("slots    : %8.1f KiB, %5d bytes/event" % (
+          current / 1024., current / num_events))
+
+    tmp = tempfile.mkdtemp()
+    try:
+        strip_slots(tmp)
+        env = dict(os.environ, DVBSI_PATH=tmp)
+        out = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__),
+                 str(num_services)], env=env)
+        base = int(out.split()[2])
+    finally:
+        shutil.rmtree(tmp)
+    print("no slots : %8.1f KiB, %5d bytes/event" % (
+          base / 1024., base / num_events))
+    print("saved    : %5.1f %%" % (100. * (base - current) / base))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Cost of a dispatched event of PollLoop on poll and on epoll.
+
+Many section filters are open while few of them are ready at a time:
+registers num_fds pipes, each standing for a section filter, and passes
+a few tokens around them. The callback of a pipe reads its token and
+writes it to another pipe picked at random, so that every wakeup has a
+few ready fds among all the registered ones. poll() looks at every
+registered fd on every wakeup, epoll only at the ready ones.
+
+A last run floods one pipe, the callback reading at most 8 bytes per
+call like a collector at its read budget, and counts the tokens passed
+meanwhile among the other pipes.
+
+    python bench_poll_loop.py [num_events]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, "../nav")
+
+import poll_loop
+
+
+NUM_TOKENS = 4
+
+
+class Ring:
+    def __init__(self, poller, num_fds, num_events):
+        self.poller = poller
+        self.pipes = [os.pipe() for n in range(num_fds)]
+        for r, w in self.pipes:
+            os.set_blocking(r, False)
+            poller.register(r, poll_loop.POLLIN, self.on_read)
+        self.writer = {r: w for r, w in self.pipes}
+        self.num_events = num_events
+        self.num = 0
+        self.random = random.Random(1)
+
+    def close(self):
+        for r, w in self.pipes:
+            self.poller.unregister(r)
+            os.close(r)
+            os.close(w)
+
+    def on_read(self, fd, mode):
+        try:
+            tokens = os.read(fd, 64)
+        except BlockingIOError:
+            return
+        for token in tokens:
+            self.num += 1
+            if (self.num >= self.num_events):
+                self.poller.stop()
+                return
+            r, w = self.random.choice(self.pipes)
+            os.write(w, b"t")
+
+    def start(self):
+        for n in range(NUM_TOKENS):
+            os.write(self.pipes[n][1], b"t")
+
+
+def make_poller(backend):
+    poll_loop.PollLoop.set_instance(None)
+    if (backend == "epoll"):
+        poll_loop.PollLoop.use_epoll()
+    return poll_loop.PollLoop()
+
+
+def run(backend, num_fds, num_events):
+    poller = make_poller(backend)
+    ring = Ring(poller, num_fds, num_events)
+    ring.start()
+    t = time.perf_counter()
+    poller.run()
+    elapsed = time.perf_counter() - t
+    ring.close()
+    return elapsed * 1e6 / ring.num
+
+
+class Flood(Ring):
+    "one pipe always full, read a little per callback"
+    def __init__(self, poller, num_fds, num_events):
+        Ring.__init__(self, poller, num_fds, num_events)
+        self.flood_r, self.flood_w = os.pipe()
+        os.set_blocking(self.flood_r, False)
+        os.set_blocking(self.flood_w, False)
+        poller.register(self.flood_r, poll_loop.POLLIN, self.on_flood)
+        self.num_flood = 0
+
+    def on_flood(self, fd, mode):
+        self.num_flood += len(os.read(fd, 8))
+        try:
+            os.write(self.flood_w, b"f" * 8)
+        except BlockingIOError:
+            pass
+
+    def start(self):
+        Ring.start(self)
+        os.write(self.flood_w, b"f" * 4096)
+
+
+def run_flood(backend, num_fds, num_events):
+    poller = make_poller(backend)
+    flood = Flood(poller, num_fds, num_events)
+    flood.start()
+    poller.run()
+    poller.unregister(flood.flood_r)
+    os.close(flood.flood_r)
+    os.close(flood.flood_w)
+    flood.close()
+    return flood.num_flood
+
+
+def main():
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("%d events, %d tokens, us per event" % (num_events, NUM_TOKENS))
+    print("%6s %8s %8s" % ("fds", "poll", "epoll"))
+    for num_fds in (8, 64, 256, 1000):
+        print("%6d %8.2f %8.2f" % (num_fds,
+                                   run("poll", num_fds, num_events),
+                                   run("epoll", num_fds, num_events)))
+    print("bytes read from a flooded fd while passing %d tokens among 64:"
+          % num_events)
+    for backend in ("poll", "epoll"):
+        print("%6s %8d" % (backend, run_flood(backend, 64, num_events)))
+
+
+if __name__ == "__main__":
+    main()
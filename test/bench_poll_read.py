@@ -0,0 +1,147 @@
+"""Sections per second with one read per wakeup and with batched reads.
+
+Replays a synthetic EIT schedule capture at several rates into 8 section
+filters. Each filter is emulated by an AF_UNIX SOCK_SEQPACKET socket
+pair, which, like a demux device, hands out one section per read and
+drops what does not fit in its buffer. A producer process writes the
+sections in bursts; the main process reads them the way the collectors
+did before, handling only the first ready fd of a poll and reading one
+section, and the way they do now, handling every ready fd and reading
+until EAGAIN up to a budget, saving the batch with
+Table.save_raw_sections().
+
+    python bench_poll_read.py [num_services]
+"""
+
+import multiprocessing
+import os
+import select
+import socket
+import sys
+import time
+
+sys.path.insert(0, "..")
+
+import dvbsi
+import bench_memory
+
+
+NUM_FILTERS = 8
+READ_BUDGET = 64
+RCVBUF = 64 * 1024
+
+
+def produce(socks, corpus, rate):
+    '''writes corpus round robin to socks at rate sections per second, in
+    bursts every 10 ms, dropping sections not fitting'''
+    dropped = 0
+    burst = max(1, rate // 100)
+    t = time.perf_counter()
+    for n, raw in enumerate(corpus):
+        if (n % burst == 0):
+            t += burst / rate
+            delay = t - time.perf_counter()
+            if (delay > 0):
+                time.sleep(delay)
+        try:
+            socks[n % len(socks)].send(raw)
+        except BlockingIOError:
+            dropped += 1
+    for sock in socks:
+        sock.setblocking(True)
+        sock.send(b"")      # end of the stream
+    os._exit(dropped & 0xff)
+
+
+def old_strategy(pollfds, socks, table, parser, done):
+    "one section of the first ready fd per poll"
+    ready = pollfds.poll(100)
+    if (len(ready) == 0):
+        return 0
+    fd, mode = ready[0]
+    try:
+        raw = socks[fd].recv(4096)
+    except BlockingIOError:
+        return 0
+    if (not raw):
+        done.add(fd)
+        pollfds.unregister(fd)
+        return 0
+    header = dvbsi.peek_header(raw)
+    if (header is not None and table.test_header(header) == 0):
+        return 1
+    section = parser(raw)
+    if (section.table_id != -1):
+        table.save(section)
+    return 1
+
+def new_strategy(pollfds, socks, table, parser, done):
+    "every ready fd, sections until EAGAIN up to READ_BUDGET"
+    num = 0
+    for fd, mode in pollfds.poll(100):
+        sock = socks[fd]
+        raws = []
+        while (len(raws) < READ_BUDGET):
+            try:
+                raw = sock.recv(4096)
+            except BlockingIOError:
+                break
+            if (not raw):
+                done.add(fd)
+                pollfds.unregister(fd)
+                break
+            raws.append(raw)
+        for result, section in table.save_raw_sections(raws, parser):
+            pass
+        num += len(raws)
+    return num
+
+
+def run(name, strategy, corpus, rate):
+    readers = {}
+    writers = []
+    pollfds = select.poll()
+    for n in range(NUM_FILTERS):
+        r, w = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        r.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+        w.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, RCVBUF)
+        r.setblocking(False)
+        w.setblocking(False)
+        readers[r.fileno()] = r
+        writers.append(w)
+        pollfds.register(r.fileno(), select.POLLIN)
+    table = dvbsi.TableEit(True)
+    parser = dvbsi.EitSection
+
+    t = time.perf_counter()
+    cpu = time.process_time()
+    producer = multiprocessing.Process(target=produce,
+                                       args=(writers, corpus, rate))
+    producer.start()
+    num = 0
+    done = set()
+    while (len(done) < NUM_FILTERS):
+        num += strategy(pollfds, readers, table, parser, done)
+    elapsed = time.perf_counter() - t
+    cpu = time.process_time() - cpu
+    producer.join()
+    print("%-22s %6d of %d sections read (%5.1f%%), %7.0f sections/s, "
+          "%5.1f us cpu/section" % (name, num, len(corpus),
+                                    num * 100.0 / len(corpus), num / elapsed,
+                                    cpu * 1e6 / max(num, 1)))
+    for sock in list(readers.values()) + writers:
+        sock.close()
+
+
+def main():
+    num_services = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    corpus = bench_memory.make_corpus(num_services) * 2
+    for rate in (20000, 80000, 160000):
+        print("%d sections to %d filters at %d sections/s" % (
+              len(corpus), NUM_FILTERS, rate))
+        run("one read per wakeup", old_strategy, corpus, rate)
+        run("batched reads", new_strategy, corpus, rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import struct
+
+import dvbsi
+
+
+def make_section(table_id, table_id_ext, payload, version=0,
+                 section_number=0, last_section_number=0):
+    "makes a long section with CRC"
+    length = 5 + len(payload) + 4
+    buf = struct.pack(">BHHBBB", table_id, 0xb000 | length, table_id_ext,
+                      0xc1 | (version << 1), section_number,
+                      last_section_number) + payload
+    return buf + struct.pack(">I", dvbsi.crc32(buf))
+
+
+def make_eit_section(events, section_number=0, version=1, service_id=0x1234,
+                     last_section_number=None):
+    '''makes EIT schedule section of transport_stream_id 1 and
+    original_network_id 2 with events [(event_id, start_time, duration,
+    dscs)]. last_section_number is section_number if not given'''
+    if (last_section_number is None):
+        last_section_number = section_number
+    payload = struct.pack(">HHBB", 0x0001, 0x0002, last_section_number, 0x50)
+    for event_id, start_time, duration, dscs in events:
+        payload += struct.pack(">H5s3sH", event_id, start_time, duration,
+                               0x8000 | len(dscs)) + dscs
+    return make_section(0x50, service_id, payload, version, section_number,
+                        last_section_number)
+
+
+def make_sdt(tsid, section_number=0, last_section_number=0, version=0):
+    "makes SDT actual section of original_network_id 1 without services"
+    return make_section(0x42, tsid, struct.pack(">HB", 0x0001, 0xff), version,
+                        section_number, last_section_number)
+
+
+def make_nit(nid):
+    "makes NIT actual section without descriptors and transports"
+    return make_section(0x40, nid, struct.pack(">HH", 0xf000, 0xf000))
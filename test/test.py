@@ -6,6 +6,13 @@ def suite():
                    'test_section',
                    'test_table',
                    'test_descriptor',
+                   'test_ts',
+                   'test_parse_pool',
+                   'test_section_log',
+                   'test_poll_loop',
+                   'test_aio_loop',
+                   'test_filter_manager',
+                   'test_db_center',
                   )
     return unittest.defaultTestLoader.loadTestsFromNames(test_suites)
 
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import os
+import sys
+
+sys.path.append("../nav")
+
+import poll_loop
+import aio_loop
+import collector
+from sections import make_sdt
+
+
+class PipeDemux:
+    "demux reading the sections written to a pipe"
+    def __init__(self, source):
+        self.source = source
+        self.rfd, self.wfd = os.pipe()
+        os.set_blocking(self.rfd, False)
+
+    def close(self):
+        os.close(self.rfd)
+        os.close(self.wfd)
+
+    def fileno(self):
+        return self.rfd
+
+    def set_filter(self, pid, _filter, mask, mode, timeout, flags):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def write(self, raw):
+        os.write(self.wfd, raw)
+
+    def read(self, length=4096):
+        header = os.read(self.rfd, 3)
+        length = ((header[1] & 0x0f) << 8) | header[2]
+        return header + os.read(self.rfd, length)
+
+
+class PipeSource:
+    "ts_source of the collectors opening PipeDemuxes on the PollLoop"
+    def __init__(self):
+        self.poller = poll_loop.PollLoop()
+        self.demuxes = []
+
+    def close(self):
+        for demux in self.demuxes:
+            demux.close()
+
+    def open_demux(self):
+        demux = PipeDemux(self)
+        self.demuxes.append(demux)
+        return demux
+
+    def register(self, demux, callback, *args):
+        self.poller.register(demux.fileno(), poll_loop.POLLIN,
+                             callback, demux, *args)
+
+    def unregister(self, demux):
+        self.poller.unregister(demux.fileno())
+
+
+class AsyncioLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.source = None
+
+    def tearDown(self):
+        if (self.source is not None):
+            self.source.close()
+        poll_loop.PollLoop.set_instance(None)
+
+    def test_010(self):
+        "AsyncioLoop - fd and timer callbacks feeding Collector.sections()"
+        raws = [make_sdt(1, 0, 1), make_sdt(1, 0, 1), make_sdt(1, 1, 1)]
+
+        async def main():
+            poller = aio_loop.install(asyncio.get_running_loop())
+            self.assertIs(poll_loop.PollLoop()._PollLoop__instance, poller)
+            self.source = PipeSource()
+            si_collector = collector.SiCollector()
+            si_collector.set_ts_source(self.source)
+            si_collector.start_sdt_act()
+            demux = si_collector.sdt_act.demux
+
+            def feed():
+                if (raws):
+                    demux.write(raws.pop(0))
+                else:
+                    # the sections written are read by now
+                    poller.unregister_timer(feed)
+                    si_collector.stop()
+
+            poller.register_timer(feed, 10, 10)
+            sections = []
+            async for section in si_collector.sections(si_collector.sdt_act):
+                sections.append(section)
+            self.assertEqual(poller.timers, {})
+            return sections
+
+        sections = asyncio.run(asyncio.wait_for(main(), 5))
+        # the repeated section 0 is not new
+        self.assertEqual([section.section_number for section in sections],
+                         [0, 1])
+        self.assertEqual(sections[1].table_id, 0x42)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import sys
 import struct
+import random
 
 sys.path.append("..")
 
@@ -18,6 +19,25 @@ class Crc32Test(unittest.TestCase):
                 ((crc >> 0) & 0xff))
         self.assertEqual(dvbsi.crc32(buf2), 0)
 
+    def test_020(self):
+        "checking crc32 implementations give the same result"
+        rand = random.Random(0)
+        for length in range(0, 40):
+            buf = bytes(rand.randrange(256) for i in range(length))
+            for init in (dvbsi.CRC32_INIT, 0, 0x12345678):
+                crc = dvbsi.crc32_bytewise(buf, init)
+                self.assertEqual(dvbsi.crc32_slicing(buf, init), crc)
+                self.assertEqual(dvbsi.crc32(buf, init), crc)
+
+    def test_030(self):
+        "checking verify_sections"
+        buf1 = b"\x16\x75\xa8\xf0\x2e\x79\x9b\x47"
+        good = buf1 + struct.pack(">I", dvbsi.crc32(buf1))
+        bad = buf1 + struct.pack(">I", dvbsi.crc32(buf1) ^ 1)
+        self.assertEqual(dvbsi.verify_sections([]), 0)
+        self.assertEqual(dvbsi.verify_sections([good, bad, good]), 0x5)
+        self.assertEqual(dvbsi.verify_sections([bad, b"", good]), 0x4)
+
 
 if __name__ == "__main__":
     unittest.main(argv=('', '-v'))
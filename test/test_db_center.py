@@ -0,0 +1,140 @@
+import unittest
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+NAV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../nav")
+sys.path.append(NAV_PATH)
+
+import dvbsi
+from sections import make_eit_section
+try:
+    import db_center
+except ImportError:
+    # dvb of nav needs linuxdvb
+    db_center = None
+
+
+START_TIME = 1500000000
+
+
+def short_event(lang, name, text):
+    "makes short_event_descriptor"
+    body = lang + bytes([len(name)]) + name + bytes([len(text)]) + text
+    return bytes([dvbsi.DTAG_SHORT_EVENT, len(body)]) + body
+
+
+def content(*nibbles):
+    "makes content_descriptor of (content_nibble, user_byte)"
+    body = b"".join(struct.pack(">BB", n, u) for n, u in nibbles)
+    return bytes([dvbsi.DTAG_CONTENT, len(body)]) + body
+
+
+def parental_rating(country_code, rating):
+    "makes parental_rating_descriptor"
+    return bytes([dvbsi.DTAG_PARENTAL_RATING, 4]) + country_code + \
+        bytes([rating])
+
+
+@unittest.skipIf(db_center is None, "linuxdvb is not installed")
+class DbCenterEventTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.TemporaryDirectory()
+        for name in ("install", "services", "events", "settings"):
+            shutil.copy(os.path.join(NAV_PATH, name + ".sql"), self.dir.name)
+        os.chdir(self.dir.name)
+        db_center.DbSqlite3.singleton = None
+        self.db = db_center.DbCenter()
+
+    def tearDown(self):
+        self.db.connection.close()
+        db_center.DbSqlite3.singleton = None
+        os.chdir(self.cwd)
+        self.dir.cleanup()
+
+    def add_event(self, batch, evid, start_time, descriptors):
+        self.db.add_event(batch, 2, 1, 0x1234, 7, 3, evid, start_time,
+                          start_time + 1800, dvbsi.DescriptorLoop(descriptors))
+
+    def query(self, sql):
+        c = self.db.connection.cursor()
+        c.execute(sql)
+        return [tuple(row) for row in c.fetchall()]
+
+    def test_010(self):
+        "DbCenter - saving an EventBatch through the staging tables"
+        batch = db_center.EventBatch()
+        self.add_event(batch, 10, START_TIME,
+                       short_event(b"eng", b"News", b"Today") +
+                       content((0x20, 1), (0x21, 2)) +
+                       parental_rating(b"gbr", 8))
+        self.add_event(batch, 11, START_TIME + 1800,
+                       short_event(b"eng", b"Film", b""))
+        self.assertEqual(len(batch), 2)
+        self.db.save_event_batch(batch)
+        self.assertEqual(self.query('''select svc_key, evid, start_time,
+                                    end_time, version_number from events
+                                    order by evid'''),
+                         [(7, 10, START_TIME, START_TIME + 1800, 3),
+                          (7, 11, START_TIME + 1800, START_TIME + 3600, 3)])
+        self.assertEqual(self.query('''select evid, lang, evt_name, short_text
+                                    from event_texts join events
+                                    using (evt_key) order by evid'''),
+                         [(10, "eng", "News", "Today"),
+                          (11, "eng", "Film", "")])
+        self.assertEqual(self.query('''select level_1, level_2, user_byte
+                                    from event_genres'''),
+                         [(2, 0, 1), (2, 1, 2)])
+        self.assertEqual(self.query('''select country_code, rating
+                                    from event_parental_ratings'''),
+                         [(b"gbr", 8)])
+
+        # an event saved again is updated in place, its genres replaced
+        batch = db_center.EventBatch()
+        self.add_event(batch, 10, START_TIME + 60,
+                       short_event(b"eng", b"News", b"Tonight") +
+                       content((0x40, 0)))
+        self.db.save_event_batch(batch)
+        self.assertEqual(self.query('''select evt_key, start_time from events
+                                    where evid = 10'''),
+                         [(1, START_TIME + 60)])
+        self.assertEqual(self.query('''select short_text from event_texts
+                                    where evt_key = 1'''), [("Tonight",)])
+        self.assertEqual(self.query('''select level_1, level_2, user_byte
+                                    from event_genres'''), [(4, 0, 0)])
+
+    def test_020(self):
+        "EventBatch - rows of an event added again are of the last one"
+        batch = db_center.EventBatch()
+        self.add_event(batch, 10, START_TIME,
+                       short_event(b"fre", b"Journal", b"") +
+                       content((0x20, 0)))
+        self.add_event(batch, 10, START_TIME,
+                       short_event(b"eng", b"News", b""))
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(batch.genres, {})
+        self.db.save_event_batch(batch)
+        self.assertEqual(self.query('''select lang, evt_name
+                                    from event_texts'''), [("eng", "News")])
+        self.assertEqual(self.query('select * from event_genres'), [])
+
+    def test_030(self):
+        "DbCenter - saving an event of an EitSection"
+        section = dvbsi.EitSection(make_eit_section([
+            (5, b"\xdc\x2e\x12\x30\x00", b"\x01\x45\x00",
+             short_event(b"eng", b"Quiz", b"Questions"))]))
+        section.decode()
+        self.db.save_event(2, 1, 0x1234, 7, 1, section.events[0])
+        start_time = dvbsi.dvbdate_to_unixtime(b"\xdc\x2e\x12\x30\x00")
+        self.assertEqual(self.query('''select evid, start_time, end_time,
+                                    evt_name, short_text from events
+                                    join event_texts using (evt_key)'''),
+                         [(5, start_time, start_time + 6300, "Quiz",
+                           "Questions")])
+
+
+if __name__ == "__main__":
+    unittest.main()
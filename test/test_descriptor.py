@@ -83,6 +83,124 @@ class DescriptorLoopTest(unittest.TestCase):
             num_dsc += 1
         self.assertEqual(num_dsc, 3)
 
+    def test_050(self):
+        "DescriptorLoop - zero-copy loop over memoryview"
+        buf = (b"\x00\x01\x03\x05\x00\x00\x02\x04" +
+               b"\x01\x02\x03\x04\x03\x02\x05\x06")
+        view = memoryview(buf)
+        dscs = list(dvbsi.DescriptorLoop(view, 1, 11))
+        self.assertEqual(len(dscs), 2)
+        self.assertIs(dscs[1].buf, view)
+        self.assertEqual(dscs[1].offset, 6)
+        self.assertEqual(dscs[1].data, buf[6:12])
+        self.assertIsInstance(dscs[1].data, bytes)
+        self.assertEqual(dscs[1].tobytes(), buf[6:12])
+
+    def test_060(self):
+        "DescriptorLoop - descriptor overrunning the loop"
+        buf = (b"\x00\x01\x03\x05\x00\x00\x02\x04" +
+               b"\x01\x02\x03\x04\x03\x02\x05\x06")
+        self.assertEqual(len(list(dvbsi.DescriptorLoop(buf, 1, 10))), 1)
+        self.assertEqual(len(list(dvbsi.DescriptorLoop(buf, 1, 0))), 0)
+
+    def test_070(self):
+        "DescriptorLoop - find and find_all"
+        buf = (b"\x00\x01\x03\x05\x00\x00\x02\x04" +
+               b"\x01\x02\x03\x04\x03\x02\x05\x06")
+        loop = dvbsi.DescriptorLoop(buf, 1, 15)
+        self.assertEqual(loop.find(2).offset, 6)
+        self.assertEqual(loop.find(2).data, buf[6:12])
+        self.assertIsNone(loop.find(4))
+        self.assertEqual([dsc.tag for dsc in loop.find_all((1, 3))], [1, 3])
+        self.assertEqual([dsc.offset for dsc in loop.find_all(3)], [12])
+        self.assertEqual(loop.find_all([]), [])
+        # truncated loop
+        loop = dvbsi.DescriptorLoop(buf, 1, 10)
+        self.assertIsNone(loop.find(2))
+        self.assertEqual(len(loop.descriptors), 1)
+
+    def test_080(self):
+        "DescriptorLoop - iterating twice"
+        buf = (b"\x01\x03\x05\x00\x00\x02\x04" +
+               b"\x01\x02\x03\x04\x03\x02\x05\x06")
+        loop = dvbsi.DescriptorLoop(buf)
+        self.assertEqual([dsc.tag for dsc in loop], [1, 2, 3])
+        self.assertEqual([dsc.tag for dsc in loop], [1, 2, 3])
+
+
+class FixedRecordDescriptorTest(unittest.TestCase):
+    def test_010(self):
+        "ServiceListDescriptor - decoding services and service columns"
+        buf = b"\x41\x09\x00\x01\x01\x12\x34\x02\xab\xcd\x19"
+        dsc = dvbsi.ServiceListDescriptor(buf)
+        self.assertEqual([(s.service_id, s.service_type)
+                          for s in dsc.services],
+                         [(1, 1), (0x1234, 2), (0xabcd, 0x19)])
+        self.assertEqual(list(dsc.service_ids_array()), [1, 0x1234, 0xabcd])
+        self.assertEqual(list(dsc.service_types_array()), [1, 2, 0x19])
+        # truncated last entry is dropped
+        dsc = dvbsi.ServiceListDescriptor(b"\x41\x04\x00\x01\x01\x12")
+        self.assertEqual(len(dsc.services), 1)
+        self.assertEqual(len(dsc.service_ids_array()), 1)
+
+    def test_020(self):
+        "LogicalChannelDescriptor - decoding entries and entry columns"
+        buf = b"\x83\x08\x10\x01\xfc\x01\x10\x02\x7f\xff"
+        dsc = dvbsi.UkDttLogicalChannelDescriptor(buf)
+        self.assertEqual([(e.service_id, e.logical_channel_number)
+                          for e in dsc.entries], [(0x1001, 1), (0x1002, 0x3ff)])
+        self.assertEqual(list(dsc.service_ids_array()), [0x1001, 0x1002])
+        self.assertEqual(list(dsc.logical_channel_numbers_array()), [1, 0x3ff])
+
+        dsc = dvbsi.NorDigLogicalChannelDescriptor(buf)
+        self.assertEqual([(e.visible_service_flag, e.logical_channel_number)
+                          for e in dsc.entries], [(1, 0x3c01), (0, 0x3fff)])
+        self.assertEqual(list(dsc.logical_channel_numbers_array()),
+                         [0x3c01, 0x3fff])
+        self.assertEqual(list(dsc.visible_service_flags_array()), [1, 0])
+
+        dsc = dvbsi.EacemLogicalChannelDescriptor(buf)
+        self.assertEqual([(e.visible_service_flag, e.logical_channel_number)
+                          for e in dsc.entries], [(1, 1), (0, 0x3ff)])
+        self.assertEqual(list(dsc.logical_channel_numbers_array()), [1, 0x3ff])
+        self.assertEqual(list(dsc.visible_service_flags_array()), [1, 0])
+
+
+class DescriptorCacheTest(unittest.TestCase):
+    def test_010(self):
+        "DescriptorCache - hit and miss"
+        buf = b"\x4d\x0beng\x04news\x02hi" + b"\x52\x01\x05"
+        raw_dscs = list(dvbsi.DescriptorLoop(buf))
+        cache = dvbsi.DescriptorCache(dvbsi.DESCRIPTOR_MAP)
+        dsc1 = cache.decode(raw_dscs[0])
+        self.assertIsInstance(dsc1, dvbsi.ShortEventDescriptor)
+        self.assertEqual(dsc1.event_name, b"news")
+        self.assertEqual(cache.get_stats(), (0, 1, 1))
+        dsc2 = cache.decode(list(dvbsi.DescriptorLoop(bytes(buf)))[0])
+        self.assertIs(dsc1, dsc2)
+        self.assertEqual(cache.get_stats(), (1, 1, 1))
+        dsc3 = cache.decode(raw_dscs[1], dvbsi.StreamIdentifierDescriptor)
+        self.assertEqual(dsc3.component_tag, 5)
+        self.assertEqual(cache.get_stats(), (1, 2, 2))
+        self.assertIsNone(cache.decode(dvbsi.Descriptor(b"\xfe\x00")))
+
+    def test_020(self):
+        "DescriptorCache - bounded size"
+        cache = dvbsi.DescriptorCache(dvbsi.DESCRIPTOR_MAP, 2)
+        raw_dscs = [dvbsi.Descriptor(bytes([0x52, 1, n])) for n in range(3)]
+        for raw_dsc in raw_dscs:
+            cache.decode(raw_dsc)
+        self.assertEqual(cache.get_stats(), (0, 3, 2))
+        # the least recently used one was dropped
+        cache.decode(raw_dscs[0])
+        self.assertEqual(cache.get_stats(), (0, 4, 2))
+        cache.decode(raw_dscs[2])
+        self.assertEqual(cache.get_stats(), (1, 4, 2))
+        cache.set_size(0)
+        self.assertEqual(cache.get_stats(), (1, 4, 0))
+        cache.decode(raw_dscs[2])
+        self.assertEqual(cache.get_stats(), (1, 5, 0))
+
 
 if __name__ == "__main__":
     unittest.main(argv=('', '-v'))
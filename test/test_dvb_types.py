@@ -22,6 +22,11 @@ class DvbTypesTest(unittest.TestCase):
         bcd_val = 0x98765432
         int_val = dvbsi.bcd_to_integer(bcd_val)
         self.assertEqual(int_val, 98765432)
+        bcd_val = 0x123456
+        int_val = dvbsi.bcd_to_integer(bcd_val)
+        self.assertEqual(int_val, 123456)
+        self.assertEqual(dvbsi.bcd_to_integer(0), 0)
+        self.assertEqual(dvbsi.bcd_to_integer(0x99), 99)
 
     def test_020_dvbduration_to_seconds(self):
         "dvbduration_to_seconds"
@@ -43,6 +48,7 @@ class DvbTypesTest(unittest.TestCase):
         self.assertEqual(month, 9)
         self.assertEqual(day, 6)
         self.assertEqual(wday, 1)
+        self.assertIs(dvbsi.mjd_to_ymdwd(mjd), dvbsi.mjd_to_ymdwd(mjd))
 
     def test_040_dvbdate_to_datetime(self):
         "dvbdate_to_datetime"
@@ -95,6 +101,19 @@ class DvbTypesTest(unittest.TestCase):
         unixtime = dvbsi.dvbdate_to_unixtime(buf)
         self.assertEqual(unixtime, 1218800703)
 
+    def test_055_parse_start_duration(self):
+        "parse_start_duration"
+        mjd = 54693
+        buf = struct.pack(">BHBBBBBB", 0xff, mjd, 0x11, 0x45, 0x03,
+                          0x01, 0x30, 0x15)
+        start, end = dvbsi.parse_start_duration(buf, 1)
+        self.assertEqual(start, 1218800703)
+        self.assertEqual(end, start + 5415)
+        self.assertEqual(start, dvbsi.dvbdate_to_unixtime(buf[1:6]))
+        self.assertEqual(end - start, dvbsi.dvbduration_to_seconds(buf[6:9]))
+        self.assertEqual(dvbsi.parse_start_duration(memoryview(buf)[1:]),
+                         (start, end))
+
     def test_060_dvb_charset(self):
         "dvb_charset"
         # default_charset = "ISO6937" # XXX
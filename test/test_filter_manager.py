@@ -0,0 +1,145 @@
+import unittest
+import errno
+import os
+import sys
+
+sys.path.append("../nav")
+
+import dvbsi
+import poll_loop
+import filter_manager
+from sections import make_section
+
+
+class FakeDevice:
+    "demux device reading the sections, or errors, of reads"
+    def __init__(self):
+        self.rfd, self.wfd = os.pipe()
+        self.reads = []
+        self.filter = None
+        self.num_starts = 0
+
+    def close(self):
+        os.close(self.rfd)
+        os.close(self.wfd)
+
+    def fileno(self):
+        return self.rfd
+
+    def set_buffer_size(self, size):
+        pass
+
+    def set_filter(self, pid, _filter, mask, mode, timeout, flags):
+        self.filter = (pid, _filter, mask, timeout)
+
+    def start(self):
+        self.num_starts += 1
+
+    def stop(self):
+        pass
+
+    def read(self, length=4096):
+        if (len(self.reads) == 0):
+            raise BlockingIOError()
+        raw = self.reads.pop(0)
+        if (isinstance(raw, Exception)):
+            raise raw
+        return raw
+
+
+class FakeManager(filter_manager.FilterManager):
+    def __init__(self):
+        filter_manager.FilterManager.__init__(self)
+        self.devices = []
+
+    def open_device(self):
+        device = FakeDevice()
+        self.devices.append(device)
+        return device
+
+
+class FilterManagerTest(unittest.TestCase):
+    def setUp(self):
+        poll_loop.PollLoop.set_instance(None)
+        self.manager = FakeManager()
+        self.results = []
+
+    def tearDown(self):
+        for device in self.manager.devices:
+            device.close()
+        poll_loop.PollLoop.set_instance(None)
+
+    def open_demux(self, pid, table_id, mask, name):
+        demux = self.manager.open_demux()
+        self.manager.register(demux, self.on_demux, name)
+        demux.set_filter(pid, [table_id], [mask], None, 0,
+                         dvbsi.DMX_IMMEDIATE_START)
+        return demux
+
+    def on_demux(self, fd, mode, demux, name):
+        if (mode & poll_loop.POLLERR):
+            self.results.append((name, "timeout"))
+            return
+        while True:
+            try:
+                raw = demux.read()
+            except BlockingIOError:
+                break
+            except OSError as e:
+                self.results.append((name, errno.errorcode[e.errno]))
+                continue
+            self.results.append((name, raw[0]))
+
+    def test_010(self):
+        "PidFilter - device filter passing the table_ids of every table"
+        pf = self.open_demux(0x12, 0x4e, 0xff, "pf")
+        device = self.manager.devices[0]
+        self.assertEqual(device.filter, (0x12, [0x4e], [0xff], 0))
+        sch = self.open_demux(0x12, 0x50, 0xf0, "sch")
+        self.assertEqual(device.filter, (0x12, [0x40], [0xe0], 0))
+        self.assertEqual(device.num_starts, 2)
+        # no change, the device filter is not set again
+        self.assertEqual(pf.pid_filter.update(), False)
+        self.open_demux(0x11, 0x42, 0xff, "sdt")
+        self.assertEqual(self.manager.get_num_filters(), 2)
+        self.manager.unregister(sch)
+        self.assertEqual(device.filter, (0x12, [0x4e], [0xff], 0))
+        self.manager.unregister(pf)
+        self.assertEqual(self.manager.get_num_filters(), 1)
+
+    def test_020(self):
+        "FilterManager - handing out sections and overflows of the device"
+        pf = self.open_demux(0x12, 0x4e, 0xff, "pf")
+        self.open_demux(0x12, 0x50, 0xf0, "sch")
+        device = self.manager.devices[0]
+        device.reads = [make_section(0x4e, 1, b""),
+                        make_section(0x51, 1, b""),
+                        make_section(0x60, 1, b"")]
+        self.manager.dispatch(device.fileno(), poll_loop.POLLIN,
+                              pf.pid_filter)
+        self.assertEqual(self.results, [("pf", 0x4e), ("sch", 0x51)])
+        self.assertEqual(self.manager.num_sections, 3)
+
+        # an overflow comes as POLLERR, and is read as EOVERFLOW
+        del self.results[:]
+        device.reads = [OSError(errno.EOVERFLOW, "Value too large"),
+                        make_section(0x50, 2, b"")]
+        self.manager.dispatch(device.fileno(),
+                              poll_loop.POLLIN | poll_loop.POLLERR,
+                              pf.pid_filter)
+        self.assertEqual(self.results, [("pf", "EOVERFLOW"),
+                                        ("sch", "EOVERFLOW"), ("sch", 0x50)])
+        self.assertEqual(self.manager.num_overflows, 1)
+        self.assertEqual(device.reads, [])
+
+        del self.results[:]
+        device.reads = [OSError(errno.EOVERFLOW, "Value too large")]
+        self.manager.dispatch(device.fileno(), poll_loop.POLLERR,
+                              pf.pid_filter)
+        self.assertEqual(self.results, [("pf", "EOVERFLOW"),
+                                        ("sch", "EOVERFLOW")])
+        self.assertEqual(self.manager.num_overflows, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import struct
+import sys
+
+sys.path.append("..")
+
+import dvbsi
+from sections import make_eit_section
+
+
+# 2008-10-18 12:30:00, 1:45:00
+START_TIME = b"\xdc\x2e\x12\x30\x00"
+DURATION = b"\x01\x45\x00"
+
+
+class ParsePoolTest(unittest.TestCase):
+    def test_010(self):
+        "eit_event_records - decoding EIT section into records"
+        dsc = struct.pack(">BB3sB2sB", 0x4d, 7, b"eng", 2, b"Hi", 0)
+        raw = make_eit_section([(1, START_TIME, DURATION, dsc),
+                                (2, START_TIME, DURATION, b"")], service_id=7)
+        records = dvbsi.eit_event_records(raw)
+        start = dvbsi.dvbdate_to_unixtime(START_TIME)
+        self.assertEqual(records, (
+            (1, start, start + 6300, 4, 0, dsc),
+            (2, start, start + 6300, 4, 0, b"")))
+        loop = dvbsi.DescriptorLoop(records[0][5])
+        self.assertEqual(loop.find(dvbsi.DTAG_SHORT_EVENT).data, dsc)
+        self.assertIsNone(dvbsi.eit_event_records(raw[:12]))
+
+    def test_020(self):
+        "ParsePool - calling back in the order of submission"
+        pool = dvbsi.ParsePool(dvbsi.eit_event_records, 3)
+        results = []
+        raws = [make_eit_section([(n, START_TIME, DURATION,
+                                   b"\x00" * (n % 7))], service_id=n)
+                for n in range(1, 50)]
+        raws.insert(10, b"\x50\x00")
+        for n, raw in enumerate(raws):
+            pool.submit(raw, lambda records, n: results.append((n, records)),
+                        n)
+        self.assertEqual(pool.get_num_pending(), 50)
+        self.assertTrue(pool.wait(10))
+        pool.close()
+        self.assertEqual([n for n, records in results], list(range(50)))
+        self.assertIsNone(results[10][1])
+        self.assertEqual(results[11][1][0][0], 11)
+        self.assertEqual(pool.num_collected, 50)
+
+
+if __name__ == "__main__":
+    unittest.main(argv=('', '-v'))
@@ -0,0 +1,95 @@
+import unittest
+import os
+import signal
+import sys
+import time
+
+sys.path.append("../nav")
+
+import poll_loop
+
+
+class PollLoopTest(unittest.TestCase):
+    def setUp(self):
+        poll_loop.PollLoop.set_instance(None)
+        self.loop = poll_loop.PollLoop()
+        self.now = 1000.0
+        self.loop._PollLoop__instance.clock = lambda: self.now
+        self.called = []
+
+    def tearDown(self):
+        if (self.loop.wakeup is not None):
+            for fd in self.loop.wakeup:
+                os.close(fd)
+        poll_loop.PollLoop.set_instance(None)
+
+    def far_timer(self, n):
+        self.called.append(n)
+
+    def cancel_timers(self):
+        self.called.append("cancel")
+        for timer in self.far_timers:
+            self.loop.unregister_timer(timer)
+
+    def one_shot(self):
+        self.called.append("one_shot")
+
+    def test_010(self):
+        "PollLoop - timers run in order of expiry, cancelled ones do not run"
+        self.loop.register_timer(self.one_shot, 20, 0)
+        self.loop.register_timer(self.cancel_timers, 10, 0)
+        self.far_timers = []
+        self.loop.run_timer()
+        self.assertEqual(self.called, [])
+        self.now += 0.015
+        self.loop.run_timer()
+        self.assertEqual(self.called, ["cancel"])
+        self.now += 0.015
+        self.loop.run_timer()
+        self.assertEqual(self.called, ["cancel", "one_shot"])
+        # no timer, poll waits for an fd or stop()
+        self.assertEqual(self.loop.get_poll_timeout(), -1)
+
+    def test_020(self):
+        "PollLoop - compacting the heap while run_timer() loops over it"
+        # distinct callbacks, as timers are keyed by their callback
+        self.far_timers = [(lambda n=n: self.far_timer(n)) for n in range(100)]
+        for timer in self.far_timers:
+            self.loop.register_timer(timer, 60000, 0)
+        self.loop.register_timer(self.cancel_timers, 10, 0)
+        self.loop.register_timer(self.one_shot, 10, 0)
+        self.now += 1
+        self.loop.run_timer()
+        self.assertEqual(self.called, ["cancel", "one_shot"])
+        self.now += 100
+        self.loop.run_timer()
+        self.assertEqual(self.called, ["cancel", "one_shot"])
+        self.assertEqual(len(self.loop.timer_heap), 0)
+        self.assertEqual(self.loop.timers, {})
+
+    def test_030(self):
+        "PollLoop - poll timeout of the next timer, exact to the msec"
+        self.loop.register_timer(self.one_shot, 2500, 0)
+        self.assertEqual(self.loop.get_poll_timeout(), 2501)
+        self.now += 2.4
+        self.assertEqual(self.loop.get_poll_timeout(), 101)
+        self.now += 0.2
+        self.assertEqual(self.loop.get_poll_timeout(), 0)
+
+    def test_040(self):
+        "PollLoop - stop() from a signal handler ends a wait with no timer"
+        self.loop.set_monotonic()
+        handler = signal.signal(signal.SIGALRM,
+                                lambda signum, frame: self.loop.stop())
+        try:
+            signal.setitimer(signal.ITIMER_REAL, 0.05)
+            t = time.monotonic()
+            self.loop.run()
+            self.assertLess(time.monotonic() - t, 1)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ import sys
 sys.path.append("../src")
 
 import dvbsi
+from sections import make_eit_section
 
 
 class SectionTest(unittest.TestCase):
@@ -84,6 +85,137 @@ class SectionExtTest(unittest.TestCase):
         sec = dvbsi.SectionExt(buf)
         self.assertEqual(sec.table_id, -1)
 
+    def test_060(self):
+        "SectionExt - verifying CRC32"
+        buf = struct.pack("BBBBBBBB", 2, 0x80, 9, 0xf1, 0x5a, 0x11, 0x0, 0x0)
+        buf += struct.pack(">I", dvbsi.crc32(buf))
+        sec = dvbsi.SectionExt(buf)
+        self.assertEqual(sec.verify_crc(), True)
+        buf = buf[:-1] + bytes([buf[-1] ^ 0xff])
+        sec = dvbsi.SectionExt(buf)
+        self.assertEqual(sec.verify_crc(), False)
+
+
+class PatSectionTest(unittest.TestCase):
+    def test_010(self):
+        "PatSection - decoding programs and program columns"
+        body = struct.pack(">HHHHHH", 0, 0xe010, 0x101, 0xe100, 0x102, 0xff01)
+        buf = struct.pack(">BHHBBB", 0, 0xb000 | (5 + len(body) + 4), 0x4321,
+                          0xc1, 0, 0) + body
+        buf += struct.pack(">I", dvbsi.crc32(buf))
+        sec = dvbsi.PatSection(buf)
+        self.assertEqual(sec.transport_stream_id, 0x4321)
+        sec.decode()
+        self.assertEqual([(p.program_number, p.pid) for p in sec.programs],
+                         [(0, 0x10), (0x101, 0x100), (0x102, 0x1f01)])
+        self.assertEqual(sec.program_numbers_array().typecode, 'H')
+        self.assertEqual(list(sec.program_numbers_array()), [0, 0x101, 0x102])
+        self.assertEqual(list(sec.pids_array()), [0x10, 0x100, 0x1f01])
+
+        sec = dvbsi.PatSection(b"aa")
+        sec.decode()
+        self.assertEqual(sec.programs, [])
+        self.assertEqual(len(sec.pids_array()), 0)
+
+
+class EitSectionTest(unittest.TestCase):
+    def test_010(self):
+        "EitSection - decoding events out of memoryview"
+        dsc = b"\x4d\x0beng\x04news\x02hi"
+        buf = make_eit_section([
+            (0x100, b"\xc0\x79\x12\x45\x00", b"\x01\x30\x00", dsc),
+            (0x101, b"\xc0\x79\x14\x15\x00", b"\x00\x30\x00", b"")])
+        sec = dvbsi.EitSection(memoryview(buf))
+        self.assertEqual(sec.verify_crc(), True)
+        self.assertEqual(sec.service_id, 0x1234)
+        self.assertEqual(sec.tobytes(), buf)
+        sec.decode()
+        self.assertEqual(len(sec.events), 2)
+        event = sec.events[0]
+        self.assertEqual(event.event_id, 0x100)
+        self.assertEqual(dvbsi.dvbduration_to_seconds(event.duration), 5400)
+        raw_dscs = list(event.descriptors)
+        self.assertEqual(len(raw_dscs), 1)
+        self.assertEqual(raw_dscs[0].data, dsc)
+        short = dvbsi.ShortEventDescriptor(raw_dscs[0].data)
+        self.assertEqual(short.event_name, b"news")
+        self.assertEqual(short.text, b"hi")
+        self.assertEqual(len(list(sec.events[1].descriptors)), 0)
+
+    def test_020(self):
+        "EitSection - checking parsed objects carry no __dict__"
+        dsc = b"\x4d\x0beng\x04news\x02hi"
+        buf = make_eit_section([
+            (0x100, b"\xc0\x79\x12\x45\x00", b"\x01\x30\x00", dsc)])
+        sec = dvbsi.EitSection(buf)
+        sec.decode()
+        event = sec.events[0]
+        raw_dsc = event.descriptors.find(dvbsi.DTAG_SHORT_EVENT)
+        short = dvbsi.ShortEventDescriptor(raw_dsc.data)
+        for obj in [sec, event, event.descriptors, raw_dsc, short]:
+            self.assertFalse(hasattr(obj, "__dict__"))
+        self.assertRaises(AttributeError, setattr, event, "foo", 1)
+
+    def test_030(self):
+        "EitSection - decoding events into columns"
+        dsc = b"\x4d\x0beng\x04news\x02hi"
+        buf = make_eit_section([
+            (0x100, b"\xc0\x79\x12\x45\x00", b"\x01\x30\x00", dsc),
+            (0x101, b"\xc0\x79\x14\x15\x00", b"\x00\x30\x00", b"")])
+        sec = dvbsi.EitSection(buf)
+        columns = sec.decode_columns()
+        sec.decode()
+        self.assertEqual(list(columns.event_id), [0x100, 0x101])
+        self.assertEqual(list(columns.start_time),
+                [dvbsi.dvbdate_to_unixtime(e.start_time) for e in sec.events])
+        self.assertEqual(list(columns.duration), [5400, 1800])
+        self.assertEqual(list(columns.running_status), [4, 4])
+        self.assertEqual(list(columns.free_ca_mode), [0, 0])
+        self.assertEqual(list(columns.section_index), [0, 0])
+        self.assertEqual(list(columns.descriptors_length), [len(dsc), 0])
+        offset = columns.descriptors_offset[0]
+        self.assertEqual(buf[offset:offset + len(dsc)], dsc)
+
+        sec2 = dvbsi.EitSection(make_eit_section([
+            (0x102, b"\xc0\x79\x14\x45\x00", b"\x00\x15\x00", b"")], 1))
+        columns = dvbsi.decode_eit_columns([sec, dvbsi.EitSection(b""), sec2])
+        self.assertEqual(list(columns.event_id), [0x100, 0x101, 0x102])
+        self.assertEqual(list(columns.section_index), [0, 0, 2])
+        self.assertEqual(columns.duration[2], 900)
+        self.assertEqual(len(dvbsi.EitSection(b"").decode_columns().event_id),
+                         0)
+
+
+class PeekHeaderTest(unittest.TestCase):
+    def test_010(self):
+        "peek_header - extracting header fields"
+        buf = struct.pack("BBBBBBBB", 2, 0x80, 5, 0xf1, 0x5a, 0x11, 0x5, 0x88)
+        header = dvbsi.peek_header(buf)
+        sec = dvbsi.SectionExt(buf)
+        self.assertEqual(header.table_id, sec.table_id)
+        self.assertEqual(header.table_id_ext, sec.table_id_ext)
+        self.assertEqual(header.version_number, sec.version_number)
+        self.assertEqual(header.current_next_indicator,
+                         sec.current_next_indicator)
+        self.assertEqual(header.section_number, sec.section_number)
+        self.assertEqual(header.last_section_number, sec.last_section_number)
+        self.assertEqual(header.crc_32, sec.crc_32)
+        self.assertIs(header.data, buf)
+
+    def test_020(self):
+        "peek_header - invalid sections"
+        self.assertIsNone(dvbsi.peek_header(b"aaaa"))
+        # syntax_indicator
+        buf = struct.pack("BBBBBBBB", 2, 0x00, 5, 0xf1, 0x5a, 0x11, 0x5, 0x88)
+        self.assertIsNone(dvbsi.peek_header(buf))
+        # length
+        buf = struct.pack("BBBBBBBB", 2, 0x80, 6, 0xf1, 0x5a, 0x11, 0x5, 0x88)
+        self.assertIsNone(dvbsi.peek_header(buf))
+        # section_number
+        buf = struct.pack("BBBBBBBB", 2, 0x80, 5, 0xf1, 0x5a, 0x11, 0x5, 0x4)
+        self.assertIsNone(dvbsi.peek_header(buf))
+
+
 class PsiStateTest(unittest.TestCase):
     def test_010(self):
         "PsiState - single number of section"
@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append("..")
+
+import dvbsi
+from sections import make_sdt, make_nit
+
+
+class SectionLogTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "si.slog")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_010(self):
+        "SectionLog - restoring tables and dropping torn record"
+        log = dvbsi.SectionLog(self.path)
+        log.append(make_sdt(1, 0, 1))
+        log.append(make_nit(5))
+        log.append(make_sdt(1, 1, 1))
+        log.append(make_sdt(1, 0, 1, 1))
+        log.close()
+        with open(self.path, "ab") as f:
+            f.write(b"\x42\x01\x00")
+
+        log = dvbsi.SectionLog(self.path)
+        records = list(log.records())
+        self.assertEqual([r[:5] for r in records], [
+            (0x42, 1, 0, 0, dvbsi.peek_header(make_sdt(1, 0, 1)).crc_32),
+            (0x40, 5, 0, 0, dvbsi.peek_header(make_nit(5)).crc_32),
+            (0x42, 1, 0, 1, dvbsi.peek_header(make_sdt(1, 1, 1)).crc_32),
+            (0x42, 1, 1, 0, dvbsi.peek_header(make_sdt(1, 0, 1, 1)).crc_32)])
+        self.assertEqual(records[1][5], make_nit(5))
+
+        sdt = dvbsi.TableSdt(dvbsi.STAG_SERVICE_DESCRIPTION_ACTUAL)
+        nit = dvbsi.Table(dvbsi.STAG_NETWORK_INFORMATION_ACTUAL)
+        self.assertEqual(log.restore({0x42: sdt, 0x40: nit}), 4)
+        self.assertEqual(nit.is_complete(), True)
+        # section 1 is of the old version
+        self.assertEqual(sdt.is_complete(), False)
+        self.assertEqual(sdt.save(dvbsi.SdtSection(make_sdt(1, 1, 1, 1))) &
+                         dvbsi.COMPLETE_TABLE, dvbsi.COMPLETE_TABLE)
+        # already known after restart
+        self.assertEqual(sdt.save(dvbsi.SdtSection(make_sdt(1, 0, 1, 1))), 0)
+        log.close()
+
+    def test_020(self):
+        "SectionLog - compacting to sections of containers"
+        log = dvbsi.SectionLog(self.path)
+        for version in range(3):
+            log.append(make_sdt(1, 0, 0, version))
+        sdt = dvbsi.TableSdt(dvbsi.STAG_SERVICE_DESCRIPTION_ACTUAL)
+        log.restore({0x42: sdt})
+        self.assertEqual(log.compact({0x42: sdt}), 1)
+        log.append(make_nit(5))
+        log.close()
+
+        log = dvbsi.SectionLog(self.path)
+        self.assertEqual([r[5] for r in log.records()],
+                         [make_sdt(1, 0, 0, 2), make_nit(5)])
+        log.close()
+
+        # not a section log
+        with open(self.path, "wb") as f:
+            f.write(b"garbage")
+        log = dvbsi.SectionLog(self.path)
+        self.assertEqual(list(log.records()), [])
+        log.close()
+
+
+if __name__ == "__main__":
+    unittest.main(argv=('', '-v'))
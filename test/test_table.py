@@ -6,6 +6,7 @@ import sys
 sys.path.append("..")
 
 import dvbsi
+from sections import make_eit_section
 
 
 class TableTest(unittest.TestCase):
@@ -406,6 +407,103 @@ class TableTest(unittest.TestCase):
                                        dvbsi.COMPLETE_TABLE))
         self.assertEqual(table.is_complete(), True)
 
+    def test_060(self):
+        "Table - rejecting section with wrong CRC32"
+        buf = struct.pack("BBBBBBBB", 2, 0x80, 9, 0xf1, 0x5a, 0x0d, 0x0, 0x0)
+        good = dvbsi.SectionExt(buf + struct.pack(">I", dvbsi.crc32(buf)))
+        bad = dvbsi.SectionExt(buf + struct.pack(">I", dvbsi.crc32(buf) ^ 1))
+
+        table = dvbsi.Table(good.table_id, True)
+        self.assertEqual(table.save(bad), dvbsi.ERROR_ON_CRC)
+        self.assertEqual(len(table.get_sections()), 0)
+        self.assertEqual(table.save(good), (dvbsi.NEW_SECTION |
+                                            dvbsi.NEW_VERSION |
+                                            dvbsi.NEW_SUB_TABLE |
+                                            dvbsi.COMPLETE_SUB_TABLE |
+                                            dvbsi.COMPLETE_TABLE))
+
+        # not checked by default
+        table = dvbsi.Table(bad.table_id)
+        self.assertNotEqual(table.save(bad), dvbsi.ERROR_ON_CRC)
+
+
+    def test_070(self):
+        "Table - testing header before parsing"
+        buf6_0 = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x0, 0x1)
+        buf6_1 = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x1, 0x1)
+        buf7_0 = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0f, 0x0, 0x1)
+        table = dvbsi.Table(2)
+
+        header = dvbsi.peek_header(buf6_0)
+        self.assertEqual(table.test_header(header), dvbsi.NOT_TESTED)
+        table.save(dvbsi.SectionExt(buf6_0))
+        self.assertEqual(table.test_header(header), 0)
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf6_1)),
+                         dvbsi.NOT_TESTED)
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf7_0)),
+                         dvbsi.NOT_TESTED)
+        # different CRC
+        buf = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x0, 0x2)
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf)),
+                         dvbsi.NOT_TESTED)
+        # different table
+        buf = struct.pack("8B", 3, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x0, 0x1)
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf)),
+                         dvbsi.NOT_MONITORING_TABLE)
+
+    def test_080(self):
+        "Table - saving raw sections read at once"
+        buf0 = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x0, 0x1)
+        buf1 = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x1, 0x1)
+        bad = struct.pack("8B", 2, 0x80, 5, 0xf1, 0x5a, 0x0d, 0x2, 0x1)
+        table = dvbsi.Table(2)
+        results = table.save_raw_sections([buf0, buf0, bad, buf1, buf0],
+                                          dvbsi.SectionExt)
+        # nothing is saved before the results are taken
+        self.assertEqual(len(table.get_sections()), 0)
+        results = list(results)
+        self.assertEqual([r for r, s in results], [
+            dvbsi.NEW_SECTION | dvbsi.NEW_VERSION | dvbsi.NEW_SUB_TABLE,
+            dvbsi.ERROR_ON_PARSING,
+            dvbsi.NEW_SECTION | dvbsi.COMPLETE_SUB_TABLE |
+            dvbsi.COMPLETE_TABLE])
+        self.assertEqual([s.data for r, s in results], [buf0, bad, buf1])
+        self.assertEqual(len(table.get_sections()), 2)
+
+    def test_090(self):
+        "Table - progress kept over version change and sub_tables added"
+        def section(ext, version, sn, lsn):
+            return dvbsi.SectionExt(struct.pack("8B", 2, 0x80, 5, 0, ext,
+                                                0xc1 | (version << 1),
+                                                sn, lsn))
+        table = dvbsi.Table(2)
+        table.save(section(1, 3, 0, 2))
+        table.save(section(1, 3, 2, 2))
+        table.new_sub_table((2, 2))
+        self.assertEqual(table.get_progress(), (2, 4))
+        self.assertEqual(table.save(section(1, 3, 1, 2)) &
+                         dvbsi.COMPLETE_SUB_TABLE, dvbsi.COMPLETE_SUB_TABLE)
+        self.assertEqual(table.is_complete(), False)
+        self.assertEqual(table.save(section(2, 0, 0, 0)) &
+                         dvbsi.COMPLETE_TABLE, dvbsi.COMPLETE_TABLE)
+        self.assertEqual(table.get_progress(), (4, 4))
+
+        # new version of 2 sections: section 2 is dropped, and section 1
+        # of the old version still counts in the progress, which counts the
+        # sections kept, but not in the received bitset completion is on
+        table.save(section(1, 4, 0, 1))
+        self.assertEqual(table.is_complete(), False)
+        self.assertEqual(table.get_progress(), (3, 3))
+        sub_table = table.get_sub_table((2, 1))
+        self.assertEqual((sub_table.received, sub_table.expected), (1, 3))
+        self.assertEqual(table.save(section(1, 4, 1, 1)) &
+                         dvbsi.COMPLETE_TABLE, dvbsi.COMPLETE_TABLE)
+        self.assertEqual(table.get_progress(), (3, 3))
+
+        table.reset()
+        self.assertEqual(table.get_progress(), (0, 0))
+        self.assertEqual(table.is_complete(), False)
+
 
 class TableSdtTest(unittest.TestCase):
     def test_010(self):
@@ -764,6 +862,20 @@ class TableSdtTest(unittest.TestCase):
         self.assertEqual(table.is_complete(), True)
 
 
+    def test_060(self):
+        "TableSdt - testing header before parsing"
+        buf = struct.pack("16B",
+                0x42, 0x80, 0x0d, 0xf1, 0x5a, 0x11, 0x00, 0x00,
+                0x12, 0x34, 0x56, 0x78, 0xc1, 0xc2, 0xc3, 0xc4)
+        table = dvbsi.TableSdt(0x42)
+        table.save(dvbsi.SdtSection(buf))
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf)), 0)
+        # different original_network_id
+        buf = buf[:8] + b"\x12\x35" + buf[10:]
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf)),
+                         dvbsi.NOT_TESTED)
+
+
 class TableEitTest(unittest.TestCase):
     def test_010(self):
         """TableEit - 1 segment, not sparse"""
@@ -1283,6 +1395,30 @@ class TableEitTest(unittest.TestCase):
         self.assertEqual(save_result, dvbsi.NOT_MONITORING_TABLE)
 
 
+    def test_100(self):
+        """TableEit - testing header before parsing"""
+        buf = struct.pack("18B",
+                0x60, 0x80, 0x0f, 0xf1, 0x5a, 0x11, 0x00, 0x00,
+                0x12, 0x34, 0x56, 0x78, 0x00, 0x60,
+                0xc1, 0xc2, 0xc3, 0xc4)
+        table = dvbsi.TableEit()
+        header = dvbsi.peek_header(buf)
+        self.assertEqual(table.test_header(header), dvbsi.NOT_TESTED)
+        table.save(dvbsi.EitSection(buf))
+        self.assertEqual(table.test_header(header), 0)
+        # the same section on EIT schedule other 0x61
+        buf1 = b"\x61" + buf[1:]
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf1)),
+                         dvbsi.NOT_TESTED)
+        # different transport_stream_id
+        buf1 = buf[:8] + b"\x12\x35" + buf[10:]
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf1)),
+                         dvbsi.NOT_TESTED)
+        buf1 = b"\x42" + buf[1:]
+        self.assertEqual(table.test_header(dvbsi.peek_header(buf1)),
+                         dvbsi.NOT_MONITORING_TABLE)
+
+
 class TableEitSvcTest(unittest.TestCase):
     def test_010(self):
         """TableEit - different service"""
@@ -1675,5 +1811,86 @@ class TableEitSvcTest(unittest.TestCase):
         self.assertEqual(table.save(sec0_1), 0)
 
 
+
+def make_eit(service_id, section_number, last_section_number, hour,
+             version=0):
+    "makes EitSection of make_eit_section() with an event of an hour from hour"
+    event = (1, b"\xdc\x2e" + bytes([hour, 0, 0]), b"\x01\x00\x00", b"")
+    return dvbsi.EitSection(make_eit_section([event], section_number, version,
+                                             service_id, last_section_number))
+
+
+class BoundedTableEitTest(unittest.TestCase):
+    def test_010(self):
+        "BoundedTableEit - evicting over budget and spilling"
+        table = dvbsi.BoundedTableEit(max_svc_sections=2)
+        for n in range(4):
+            table.save(make_eit(1, n, 3, 20 - n))
+        # the sections ending first are evicted and forgotten
+        self.assertEqual(table.get_stats()[0:3], (2, 2 * 30, 0))
+        sub_table = table.svc_tables[(1, 1, 2)].sub_tables[(0x50, (1, 1, 2))]
+        self.assertEqual(sorted(sub_table.sections), [0, 1])
+        self.assertEqual(table.get_progress(), (2, 4))
+        self.assertEqual(table.is_complete(), False)
+
+        table = dvbsi.BoundedTableEit(max_sections=3, spill=True)
+        for service_id in (1, 2):
+            for n in range(2):
+                table.save(make_eit(service_id, n, 1, n))
+        # service 1 is spilled, not forgotten
+        self.assertEqual(table.get_stats(), (2, 60, 2, 60, 2))
+        self.assertEqual(table.is_complete(), True)
+        self.assertEqual(table.save(make_eit(1, 0, 1, 0)), 0)
+        # looking it up does not parse it again
+        table.get_svc_table((1, 1, 2))
+        self.assertEqual(table.get_stats(), (2, 60, 2, 60, 2))
+        svc_table = table.load_svc_table((1, 1, 2))
+        # and service 2 is spilled to the budget
+        self.assertEqual(table.get_stats(), (2, 60, 2, 60, 4))
+        self.assertEqual([s.events[0].start_time[2] for s in
+                          svc_table.get_sections()], [0, 1])
+
+    def test_020(self):
+        "BoundedTableEit - evicting past sections"
+        table = dvbsi.BoundedTableEit()
+        for n in range(4):
+            table.save(make_eit(1, n, 3, n * 6))
+        now = (0xdc2e - 40587) * 86400 + 12 * 3600
+        self.assertEqual(table.evict_past(now), 2)
+        self.assertEqual(table.get_stats(), (2, 60, 0, 0, 2))
+        svc_table = table.get_svc_table((1, 1, 2))
+        self.assertEqual(len(svc_table.get_sections()), 2)
+        # the past sections are still known as received
+        self.assertEqual(table.save(make_eit(1, 0, 3, 0)), 0)
+        self.assertEqual(table.is_complete(), True)
+        self.assertEqual(table.get_progress(), (4, 4))
+        # but not a new version
+        self.assertNotEqual(table.save(make_eit(1, 0, 3, 0, 1)), 0)
+        self.assertEqual(table.get_stats(), (3, 90, 0, 0, 2))
+
+    def test_030(self):
+        "BoundedTableEit - keeping the budget when saved as by a collector"
+        table = dvbsi.BoundedTableEit(max_sections=8, spill=True)
+        for n in range(64):
+            section = make_eit(n % 8 + 1, n // 8, 7, n // 8)
+            if (table.save(section) > 0):
+                # as EitCollector.process_saved_eit()
+                table.get_svc_table(table.get_svc_table_key(section))
+            self.assertLessEqual(table.get_stats()[0], 8)
+        self.assertEqual(table.get_stats()[0:4], (8, 240, 56, 1680))
+        self.assertEqual(table.is_complete(), True)
+        # a reader of the whole schedule of a service
+        svc_table = table.load_svc_table((1, 1, 2))
+        self.assertEqual(len(svc_table.get_sections()), 8)
+        self.assertEqual(table.get_stats()[0:3], (8, 240, 56))
+        # over the budget of a service, it is trimmed on the next save
+        table.set_svc_budget((1, 1, 2), max_sections=2)
+        table.load_svc_table((2, 1, 2))
+        table.load_svc_table((1, 1, 2))
+        self.assertEqual(table.get_stats()[0], 8)
+        table.save(make_eit(3, 0, 7, 0, 1))
+        self.assertEqual(len(table.get_resident_sections((1, 1, 2))), 2)
+
+
 if __name__ == "__main__":
     unittest.main(argv=('', '-v'))
@@ -0,0 +1,244 @@
+import unittest
+import struct
+import io
+import os
+import sys
+import tempfile
+
+sys.path.append("..")
+
+import dvbsi
+from sections import make_section
+
+
+def packetize(pid, sections, cc=0):
+    "makes TS packets carrying sections back to back, returns (data, cc)"
+    stream = b"".join(sections)
+    packets = []
+    # offsets where a section starts
+    starts = []
+    offset = 0
+    for section in sections:
+        starts.append(offset)
+        offset += len(section)
+    i = 0
+    while (i < len(stream)):
+        starting = [s for s in starts if i <= s < i + 183]
+        if (starting):
+            header = struct.pack(">BHBB", 0x47, 0x4000 | pid, 0x10 | cc,
+                                 starting[0] - i)
+            room = 183
+        else:
+            header = struct.pack(">BHB", 0x47, pid, 0x10 | cc)
+            room = 184
+        chunk = stream[i:i + room]
+        i += room
+        packets.append(header + chunk + b"\xff" * (room - len(chunk)))
+        cc = (cc + 1) & 0xf
+    return b"".join(packets), cc
+
+
+class TsDemuxTest(unittest.TestCase):
+    def test_010(self):
+        "TsDemux - reassembling sections spanning packets"
+        sections = [make_section(0x42, n, bytes(range(200)) * n)
+                    for n in range(1, 4)]
+        data, cc = packetize(0x11, sections)
+        demux = dvbsi.TsDemux()
+        flt = demux.open_filter()
+        flt.set_filter(0x11, [0x42], [0xff], None, 0,
+                       dvbsi.DMX_IMMEDIATE_START | dvbsi.DMX_CHECK_CRC)
+        # feed in odd sized chunks
+        for i in range(0, len(data), 100):
+            demux.feed(data[i:i + 100])
+        self.assertEqual([flt.read() for n in range(3)], sections)
+        self.assertIsNone(flt.read())
+        self.assertEqual(demux.get_stats(), (len(data) // 188, 0, 3, 0))
+
+    def test_020(self):
+        "TsDemux - pointer_field and several sections in a packet"
+        sections = [make_section(0x4e, n, b"\x00" * 30) for n in range(10)]
+        data, cc = packetize(0x12, sections)
+        demux = dvbsi.TsDemux()
+        flt = demux.open_filter()
+        flt.set_filter(0x12, [0x4e], [0xff], None, 0,
+                       dvbsi.DMX_IMMEDIATE_START)
+        demux.feed(data)
+        self.assertEqual(list(flt.queue), sections)
+
+    def test_030(self):
+        "TsDemux - filter, mask and mode"
+        sections = [make_section(0x4e, n, b"\x00", version=n % 4)
+                    for n in range(8)]
+        data, cc = packetize(0x12, sections)
+        demux = dvbsi.TsDemux()
+        # table_id_ext 0x0003
+        flt1 = demux.open_filter()
+        flt1.set_filter(0x12, [0x4e, 0x00, 0x03], [0xff, 0xff, 0xff], None,
+                        0, dvbsi.DMX_IMMEDIATE_START)
+        # version_number other than 1
+        flt2 = demux.open_filter()
+        flt2.set_filter(0x12, [0x4e, 0, 0, 0x01 << 1], [0xff, 0, 0, 0x3e],
+                        [0, 0, 0, 0xff], 0, dvbsi.DMX_IMMEDIATE_START)
+        # other table_id
+        flt3 = demux.open_filter()
+        flt3.set_filter(0x12, [0x50], [0xf0], None, 0,
+                        dvbsi.DMX_IMMEDIATE_START)
+        demux.feed(data)
+        self.assertEqual(list(flt1.queue), [sections[3]])
+        self.assertEqual(list(flt2.queue),
+                         [s for n, s in enumerate(sections) if n % 4 != 1])
+        self.assertEqual(len(flt3.queue), 0)
+        self.assertRaises(IOError, flt3.set_filter, 0x12, [0x50], [], None,
+                          0, 0)
+
+    def test_040(self):
+        "TsDemux - continuity counter errors drop partial sections"
+        sections = [make_section(0x42, n, bytes(300)) for n in range(3)]
+        data, cc = packetize(0x11, sections)
+        packets = [data[i:i + 188] for i in range(0, len(data), 188)]
+        demux = dvbsi.TsDemux()
+        flt = demux.open_filter()
+        flt.set_filter(0x11, [0x42], [0xff], None, 0,
+                       dvbsi.DMX_IMMEDIATE_START)
+        # packet 1 lost, packet 2 repeated
+        demux.feed(packets[0] + packets[2] + packets[2] +
+                   b"".join(packets[3:]))
+        self.assertEqual(demux.num_cc_errors, 1)
+        self.assertEqual(list(flt.queue), sections[2:])
+
+    def test_050(self):
+        "TsDemux - resynchronising, other PIDs and CRC check"
+        section = make_section(0x42, 1, b"abc")
+        bad = section[:-1] + bytes([section[-1] ^ 1])
+        data, cc = packetize(0x11, [section, bad])
+        other, cc = packetize(0x10, [make_section(0x40, 1, b"")])
+        demux = dvbsi.TsDemux()
+        flt = demux.open_filter()
+        flt.set_filter(0x11, [0x42], [0xff], None, 0,
+                       dvbsi.DMX_IMMEDIATE_START | dvbsi.DMX_CHECK_CRC)
+        demux.feed(b"\x00\x47\x01" + other + data)
+        self.assertEqual(list(flt.queue), [section])
+        self.assertEqual(demux.num_sync_losses, 2)
+        self.assertEqual(demux.num_sections, 2)
+
+    def test_060(self):
+        "TsDemux - yielding sections read out of a file object"
+        sections = [make_section(0x42 + n % 2, n, b"\x01" * 250)
+                    for n in range(6)]
+        data, cc = packetize(0x11, sections)
+        demux = dvbsi.TsDemux()
+        flt1 = demux.open_filter()
+        flt1.set_filter(0x11, [0x42], [0xff], None, 0,
+                        dvbsi.DMX_IMMEDIATE_START)
+        flt2 = demux.open_filter()
+        flt2.set_filter(0x11, [0x43], [0xff], None, 0,
+                        dvbsi.DMX_IMMEDIATE_START | dvbsi.DMX_ONESHOT)
+        result = list(demux.sections(io.BytesIO(data), 500))
+        self.assertEqual([s for f, s in result],
+                         [sections[0], sections[1], sections[2], sections[4]])
+        self.assertEqual([f for f, s in result], [flt1, flt2, flt1, flt1])
+        self.assertEqual(flt2.running, False)
+        self.assertIsNone(flt1.read())
+
+    def test_070(self):
+        "TsDemux - resetting the sections being reassembled on some PIDs"
+        sections = [make_section(0x42, n, bytes(300)) for n in range(2)]
+        data1, cc = packetize(0x11, sections)
+        data2, cc = packetize(0x12, sections)
+        demux = dvbsi.TsDemux()
+        flt1 = demux.open_filter()
+        flt1.set_filter(0x11, [0x42], [0xff], None, 0,
+                        dvbsi.DMX_IMMEDIATE_START)
+        flt2 = demux.open_filter()
+        flt2.set_filter(0x12, [0x42], [0xff], None, 0,
+                        dvbsi.DMX_IMMEDIATE_START)
+        demux.feed(data1[:188] + data2[:188])
+        demux.reset([0x11, 0x13])
+        # the rest of section 0 on 0x11 is dropped, section 1 starts anew
+        demux.feed(data1[188:] + data2[188:])
+        self.assertEqual(list(flt1.queue), sections[1:])
+        self.assertEqual(list(flt2.queue), sections)
+        self.assertEqual(demux.num_cc_errors, 0)
+
+        demux.feed(data1[:100])
+        demux.reset([0x11])
+        self.assertEqual(demux.rest, data1[:100])
+        demux.reset()
+        self.assertEqual(demux.rest, b"")
+
+
+class TsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cap.ts")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def make_file(self):
+        "writes EIT and SDT packets interleaved with video packets"
+        eit = [make_section(0x50, n, b"\x02" * 300) for n in range(4)]
+        sdt = [make_section(0x42, 1, b"\x03" * 20)]
+        eit_data, cc = packetize(0x12, eit)
+        sdt_data, cc = packetize(0x11, sdt)
+        video = struct.pack(">BHB", 0x47, 0x100, 0x10) + b"\x00" * 184
+        packets = [eit_data[i:i + 188] for i in range(0, len(eit_data), 188)]
+        data = b"\x00\x01"     # garbage before the first packet
+        for packet in packets[:3]:
+            data += video * 2 + packet
+        data += sdt_data
+        for packet in packets[3:]:
+            data += packet + video
+        with open(self.path, "wb") as f:
+            f.write(data)
+        return eit, sdt
+
+    def test_010(self):
+        "TsIndex - indexing PIDs and feeding a demux"
+        eit, sdt = self.make_file()
+        index = dvbsi.TsIndex(self.path)
+        self.assertEqual(index.get_pids(), [0x11, 0x12, 0x100])
+        self.assertEqual(index.get_num_packets(0x11), 1)
+        self.assertEqual(index.get_num_packets(0x12), 7)
+        self.assertEqual(index.get_num_packets(0x100), 10)
+        self.assertEqual(index.offsets[0x100][0], 2)
+        self.assertTrue(os.path.exists(self.path + dvbsi.PID_INDEX_SUFFIX))
+
+        demux = dvbsi.TsDemux()
+        flt = demux.open_filter()
+        flt.set_filter(0x12, [0x50], [0xf0], None, 0,
+                       dvbsi.DMX_IMMEDIATE_START)
+        self.assertEqual(index.feed(demux), 4)
+        self.assertEqual(list(flt.queue), eit)
+        # the video packets are not read at all
+        self.assertEqual(demux.num_packets, 7)
+        index.close()
+
+    def test_020(self):
+        "TsIndex - loading saved index and rebuilding stale one"
+        self.make_file()
+        index = dvbsi.TsIndex(self.path)
+        offsets = index.offsets
+        index.close()
+
+        index = dvbsi.TsIndex(self.path)
+        self.assertEqual(index.offsets, offsets)
+        self.assertIsNot(index.offsets, offsets)
+        # first half of the file in 2 steps
+        half = index.size // 2
+        first = index.get_offsets([0x11, 0x12], 0, half)
+        second = index.get_offsets([0x11, 0x12], half)
+        self.assertEqual(list(first) + list(second),
+                         sorted(list(offsets[0x11]) + list(offsets[0x12])))
+        index.close()
+
+        with open(self.path, "ab") as f:
+            f.write(struct.pack(">BHB", 0x47, 0x11, 0x11) + b"\xff" * 184)
+        index = dvbsi.TsIndex(self.path)
+        self.assertEqual(index.get_num_packets(0x11), 2)
+        index.close()
+
+
+if __name__ == "__main__":
+    unittest.main(argv=('', '-v'))